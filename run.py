@@ -1,4 +1,40 @@
+import atexit
+import logging
 import optparse
+import os
+import shutil
+import tempfile
+
+
+def PreloadShared(app):
+    """Load everything which pre-forked workers can share.
+
+    This is the plant catalog (with its indexes) and the compiled templates.
+    """
+    from smgm.models.plant_catalog import GetCatalog
+
+    catalog = GetCatalog().Snapshot()
+    catalog.companions
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+
+def StartSampleProfiler(path, interval):
+    """Start the sampling profiler, which is stopped when the process exits."""
+    from smgm.models.metrics import SamplingProfiler
+
+    profiler = SamplingProfiler(path, interval)
+    profiler.Start()
+    atexit.register(profiler.Stop)
+
+
+def StartMetricsWriter(directory):
+    """Share this process's metrics through directory, until it exits."""
+    from smgm.models.metrics import MetricsWriter
+
+    writer = MetricsWriter(directory)
+    writer.Start()
+    atexit.register(writer.Stop)
 
 
 def flaskrun(app, default_host="127.0.0.1",
@@ -18,6 +54,31 @@ def flaskrun(app, default_host="127.0.0.1",
                       help="Port for the Flask app " +
                            "[default %s]" % default_port,
                       default=default_port)
+    parser.add_option("--sample-profile", metavar="FILE",
+                      help="Sample the stacks of running requests and " +
+                           "write them to FILE (in folded stacks format)")
+    parser.add_option("--sample-interval", type="float", default=0.01,
+                      help="Seconds between samples for --sample-profile " +
+                           "[default %default]")
+    parser.add_option("-w", "--workers", type="int",
+                      default=int(os.environ.get("WEB_CONCURRENCY", 0)),
+                      help="Serve from this many pre-forked worker " +
+                           "processes, rather than the development server; " +
+                           "caches are per worker " +
+                           "[default $WEB_CONCURRENCY or %default]")
+    parser.add_option("--metrics-dir", metavar="DIR",
+                      help="With --workers, the directory where workers " +
+                           "share their metrics, so /metrics reports all of " +
+                           "them [default a new temporary directory]")
+    parser.add_option("-t", "--threads", type="int", default=4,
+                      help="Threads per worker, with --workers " +
+                           "[default %default]")
+    parser.add_option("--max-requests", type="int", default=0,
+                      help="Recycle each worker after about this many " +
+                           "requests; 0 to never recycle [default %default]")
+    parser.add_option("--graceful-timeout", type="float", default=30,
+                      help="Seconds workers get to finish their requests " +
+                           "when stopping [default %default]")
 
     # Two options useful for debugging purposes, but
     # a bit dangerous so not exposed in the help message.
@@ -40,6 +101,50 @@ def flaskrun(app, default_host="127.0.0.1",
                                           restrictions=[30])
         options.debug = True
 
+    if options.workers > 0:
+        from smgm.models.metrics import ClearMetrics
+        from smgm.prefork import PreforkServer
+
+        if options.workers > 1:
+            # Each worker would have its own garden cache, and could save
+            # gardens over changes made by the others.
+            app.config.setdefault('GARDEN_CACHE_TTL', 0)
+
+        # Counts start again from zero each time the server starts.
+        metrics_dir = options.metrics_dir
+        if metrics_dir:
+            ClearMetrics(metrics_dir)
+        else:
+            metrics_dir = tempfile.mkdtemp(prefix='smgm-metrics-')
+        app.config['METRICS_DIR'] = metrics_dir
+
+        def PostFork():
+            StartMetricsWriter(metrics_dir)
+            # Each worker has its own profile, as only it can sample itself.
+            if options.sample_profile:
+                StartSampleProfiler(
+                    '%s.%d' % (options.sample_profile, os.getpid()),
+                    options.sample_interval)
+
+        logging.basicConfig(level=logging.INFO)
+        master_pid = os.getpid()
+        try:
+            PreforkServer(app, options.host, int(options.port),
+                          options.workers, threads=options.threads,
+                          max_requests=options.max_requests,
+                          graceful_timeout=options.graceful_timeout,
+                          preload=lambda: PreloadShared(app),
+                          post_fork=PostFork).Serve()
+        finally:
+            # Workers exit through here too, and must leave the directory.
+            if os.getpid() == master_pid and not options.metrics_dir:
+                shutil.rmtree(metrics_dir, ignore_errors=True)
+        return
+
+    # The sampling profiler is cheap enough to leave running in production.
+    if options.sample_profile:
+        StartSampleProfiler(options.sample_profile, options.sample_interval)
+
     app.run(
         debug=options.debug,
         host=options.host,
@@ -47,5 +152,5 @@ def flaskrun(app, default_host="127.0.0.1",
     )
 
 if __name__ == '__main__':
-    from smgm import app
-    flaskrun(app)
+    from smgm import create_app
+    flaskrun(create_app())
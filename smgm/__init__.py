@@ -1,5 +1,7 @@
+import os
+import threading
+
 from flask import Flask
-from flask_stormpath import StormpathManager
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'super secret'
@@ -11,9 +13,81 @@ app.config[
     'STORMPATH_API_KEY_SECRET'] = 'JSucwgxmRec03OV7D91+fLVg700JGAR8PvljlK2k3t4'
 app.config['STORMPATH_APPLICATION'] = 'Square Metre Garden Manager'
 
-stormpath_manager = StormpathManager(app)
+# Where gardens are stored; either 'stormpath' or an SQLAlchemy database URI.
+app.config['GARDEN_STORE_URI'] = os.environ.get('GARDEN_STORE_URI', 'stormpath')
+
+## The Stormpath manager, once it has been set up (see create_app()).
+stormpath_manager = None
+
+_setup_lock = threading.Lock()
+_created = False
+
+
+class _SetupOnFirstRequest(object):
+    """WSGI middleware which finishes setting up the app on the first request.
+
+    This runs before Flask sees the request, so setup can still add routes.
+    """
+
+    def __init__(self, wsgi_app, setup):
+        self.wsgi_app = wsgi_app
+        self._setup = setup
+        self._done = False
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        if not self._done:
+            with self._lock:
+                if not self._done:
+                    self._setup()
+                    self._done = True
+        return self.wsgi_app(environ, start_response)
+
+
+def init_stormpath():
+    """Set up Stormpath for the app, if it hasn't been already.
+
+    Creating the manager checks the settings with Stormpath, which takes a few
+    round trips, so by default this is done on the first request rather than
+    at startup.
+    """
+    global stormpath_manager
+    with _setup_lock:
+        if stormpath_manager is None:
+            from flask_stormpath import StormpathManager
+            stormpath_manager = StormpathManager(app)
+    return stormpath_manager
+
+
+def create_app(lazy=True):
+    """Register the views and APIs with the app, and return it.
+
+    Importing this package only creates the app; this is what makes it
+    servable. It is cheap to call: slow imports (NumPy, SQLAlchemy, icalendar,
+    dateutil) are deferred until the code which needs them first runs.
+
+    Args:
+        lazy: bool, If True, Stormpath is set up on the first request (see
+              init_stormpath()). Otherwise it is set up now.
+
+    Returns:
+        Flask, The app. Calling this again returns the same app.
+    """
+    global _created
+    with _setup_lock:
+        if not _created:
+            # Imported first, so that request timing wraps everything else.
+            import smgm.models.metrics_api
+
+            import smgm.views
+
+            # APIs
+            import smgm.models.garden_api
+            import smgm.models.plant_api
 
-import smgm.views
+            app.wsgi_app = _SetupOnFirstRequest(app.wsgi_app, init_stormpath)
+            _created = True
 
-# APIs
-import smgm.models.garden_api
+    if not lazy:
+        init_stormpath()
+    return app
@@ -0,0 +1,316 @@
+"""Companion planting: which plants should (and shouldn't) grow side by side.
+
+The catalog's companion field is free text scraped from gardenate, e.g.
+"Compatible with (can grow in same bed): Carrots, Onions, Dwarf (bush) beans".
+It is parsed into a symmetric matrix indexed by plant id (the position of the
+plant's name in the sorted list of names):
+
+     1: the plants are listed as compatible.
+     0: nothing is known.
+    -1: the plants are incompatible: the text says to keep one away from the
+        other ("Best grown away from tomatoes"). Text which only says to grow
+        a plant on its own ("Best in separate bed") names no plants, so it
+        doesn't make the plant incompatible with anything.
+
+Gardens are checked by comparing every pair of plantings in horizontally or
+vertically adjacent slots at once, as NumPy arrays.
+"""
+
+import collections
+import re
+
+import numpy
+
+
+## The text before the list of companions in the catalog.
+_COMPANION_PREFIX = 'Compatible with (can grow in same bed):'
+
+## Matches the part of companion text which names plants to keep the plant
+## away from (up to the end of the sentence).
+_AVOID_RE = re.compile(r'\b(?:away|separate|apart) from\b([^.;]*)', re.I)
+
+## Names and groups used in the companion text which aren't (or aren't only)
+## the name of a plant in the catalog. Keys are stemmed (see _Stem()).
+_ALIASES = {
+    'allium': ['Chives', 'Garlic', 'Leeks', 'Onion', 'Shallots',
+               'Spring onions'],
+    'aubergine': ['Eggplant'],
+    'beet': ['Beetroot'],
+    'brassica': ['Broccoli', 'Brussels sprouts', 'Cabbage', 'Cauliflower',
+                 'Chinese cabbage', 'Collards', 'Kale', 'Kohlrabi',
+                 'Mustard greens', 'Pak Choy'],
+    'bush bean': ['Beans - dwarf'],
+    'chili': ['Chilli peppers'],
+    'corn': ['Sweet corn'],
+    'dwarf bush bean': ['Beans - dwarf'],
+    'egg plant': ['Eggplant'],
+    'kohl rabi': ['Kohlrabi'],
+    'melon': ['Rockmelon', 'Watermelon'],
+    'pepper': ['Capsicum', 'Chilli peppers'],
+    'strawberry': ['Strawberries (from seeds)', 'Strawberry Plants'],
+    'sweetcorn': ['Sweet corn'],
+    'swiss chard': ['Silverbeet'],
+}
+
+## The most pairs of plantings compared at once by FindNeighbourConflicts(),
+## which bounds the memory it uses.
+_MAX_PAIRS_PER_BATCH = 1 << 20
+
+## A pair of plantings in adjacent slots whose plants shouldn't be neighbours,
+## and which would be in the ground at the same time.
+NeighbourConflict = collections.namedtuple(
+    'NeighbourConflict', ['slot_idx', 'plant', 'neighbour_idx', 'neighbour'])
+
+
+def _Stem(word):
+    """Reduce a plural word to its singular form (roughly)."""
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('oes', 'shes')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def _Words(text):
+    """Split text into lowercase, stemmed words."""
+    return tuple(_Stem(word) for word in re.findall(r'[a-z]+', text.lower()))
+
+
+def _PhraseIndex(names):
+    """Map each phrase (tuple of words) which refers to plants to their names.
+
+    Catalog names like "Beans - dwarf" or "Choko/Chayote" are also known by
+    their parts ("dwarf beans", "beans", "choko").
+    """
+    phrases = collections.defaultdict(set)
+    for name in names:
+        phrases[_Words(name)].add(name)
+
+        # "Artichokes (Globe)" and "Choko/Chayote".
+        for part in re.split(r'[/()]', name):
+            if part.strip():
+                phrases[_Words(part)].add(name)
+
+        # "Beans - climbing" is "climbing beans", and one of the "beans".
+        if ' - ' in name:
+            group, kinds = name.split(' - ', 1)
+            group_words = _Words(group)
+            phrases[group_words].add(name)
+            for kind in kinds.split(','):
+                kind_words = _Words(kind)
+                if group_words[-1] not in kind_words:
+                    kind_words += group_words
+                phrases[kind_words].add(name)
+
+    for alias, alias_names in _ALIASES.iteritems():
+        phrases[_Words(alias)].update(
+            alias_name for alias_name in alias_names if alias_name in names)
+    return phrases
+
+
+def ParseCompanionText(text, phrases):
+    """Find the plants named in a companion field.
+
+    Args:
+        text: str, The companion field of a catalog entry.
+        phrases: dict of tuple of str --> set of str, See _PhraseIndex().
+
+    Returns:
+        set of str, The names of the plants mentioned.
+    """
+    if text.startswith(_COMPANION_PREFIX):
+        text = text[len(_COMPANION_PREFIX):]
+
+    longest = max(len(phrase) for phrase in phrases) if phrases else 0
+    names = set()
+    for item in re.split(r'[,.;]|\band\b', text.lower()):
+        words = _Words(item)
+        i = 0
+        while i < len(words):
+            # Prefer the longest phrase, e.g. "sweet potato" over "potato".
+            for length in xrange(min(longest, len(words) - i), 0, -1):
+                matches = phrases.get(words[i:i + length])
+                if matches:
+                    names.update(matches)
+                    i += length
+                    break
+            else:
+                i += 1
+    return names
+
+
+class Companions(object):
+    """The compatibility of every pair of plants in the catalog."""
+
+    def __init__(self, plants, names):
+        """Parse the companion fields of the catalog.
+
+        Args:
+            plants: dict of str --> dict, The plant catalog.
+            names: list of str, The sorted plant names; plant ids are indices
+                   into this list.
+        """
+        self.ids = {name: i for i, name in enumerate(names)}
+        self.matrix = numpy.zeros((len(names), len(names)), dtype=numpy.int8)
+
+        phrases = _PhraseIndex(set(names))
+        avoided = []
+        for name, plant in plants.iteritems():
+            text = plant.get('companion', '')
+            i = self.ids[name]
+            avoid = _AVOID_RE.search(text)
+            if avoid is not None:
+                avoided.extend((i, self.ids[other]) for other in
+                               ParseCompanionText(avoid.group(1), phrases))
+                text = text[:avoid.start()] + text[avoid.end():]
+            for other in ParseCompanionText(text, phrases):
+                self.matrix[i, self.ids[other]] = 1
+                self.matrix[self.ids[other], i] = 1
+
+        # Being kept apart wins over being listed as compatible.
+        for i, other in avoided:
+            self.matrix[i, other] = -1
+            self.matrix[other, i] = -1
+        numpy.fill_diagonal(self.matrix, 0)
+
+    def Compatibility(self, name, other):
+        """Get the compatibility (1, 0 or -1) of two plants, by name."""
+        i = self.ids.get(name)
+        j = self.ids.get(other)
+        if i is None or j is None:
+            return 0
+        return int(self.matrix[i, j])
+
+    def Compatible(self, name):
+        """Get the names of the plants listed as compatible with a plant."""
+        return self._Names(name, 1)
+
+    def Incompatible(self, name):
+        """Get the names of the plants which shouldn't grow with a plant."""
+        return self._Names(name, -1)
+
+    def _Names(self, name, value):
+        i = self.ids.get(name)
+        if i is None:
+            return []
+        names = sorted(self.ids, key=self.ids.get)
+        return [names[j] for j in numpy.flatnonzero(self.matrix[i] == value)]
+
+
+def _AdjacentSlots(garden, slot_indices=None):
+    """Get the pairs of horizontally or vertically adjacent slots.
+
+    Args:
+        garden: Garden, The garden.
+        slot_indices: iterable of int, If given, only pairs including one of
+                      these slots.
+
+    Returns:
+        (numpy array, numpy array), The indices of the first and second slot of
+        each pair, where the first is above or left of the second.
+    """
+    grid = numpy.arange(garden.width * garden.height).reshape(
+        garden.height, garden.width)
+    first = numpy.concatenate([grid[:, :-1].ravel(), grid[:-1, :].ravel()])
+    second = numpy.concatenate([grid[:, 1:].ravel(), grid[1:, :].ravel()])
+    if slot_indices is not None:
+        wanted = numpy.zeros(len(garden.slots), dtype=bool)
+        wanted[list(slot_indices)] = True
+        keep = wanted[first] | wanted[second]
+        first, second = first[keep], second[keep]
+    return first, second
+
+
+def FindNeighbourConflicts(garden, companions, slot_indices=None):
+    """Find incompatible plants in adjacent slots at overlapping times.
+
+    Args:
+        garden: Garden, The garden to check.
+        companions: Companions, The compatibility of the catalog's plants.
+        slot_indices: iterable of int, If given, only check the neighbours of
+                      these slots.
+
+    Returns:
+        list of NeighbourConflict, ordered by slot and then plant date.
+    """
+    # Flatten the plantings (only those in the catalog), grouped by slot.
+    plants = []
+    plant_ids = []
+    counts = numpy.zeros(len(garden.slots), dtype=numpy.int64)
+    for slot_idx, slot in enumerate(garden.slots):
+        for plant in slot:
+            plant_id = companions.ids.get(plant.name)
+            if plant_id is not None:
+                plants.append(plant)
+                plant_ids.append(plant_id)
+                counts[slot_idx] += 1
+    if not plants:
+        return []
+
+    plant_ids = numpy.array(plant_ids)
+    starts = numpy.array([plant.plant_ordinal for plant in plants])
+    ends = numpy.array([plant.harvest_ordinal for plant in plants])
+    slot_of = numpy.repeat(numpy.arange(len(garden.slots)), counts)
+    offsets = numpy.cumsum(counts) - counts
+
+    first, second = _AdjacentSlots(garden, slot_indices)
+    sizes = counts[first] * counts[second]
+    keep = sizes > 0
+    first, second, sizes = first[keep], second[keep], sizes[keep]
+
+    found_i = []
+    found_j = []
+    batch_start = 0
+    while batch_start < len(first):
+        # Take as many slot pairs as fit in a batch (at least one).
+        totals = numpy.cumsum(sizes[batch_start:])
+        batch_end = batch_start + max(
+            1, numpy.searchsorted(totals, _MAX_PAIRS_PER_BATCH, 'right'))
+        a = first[batch_start:batch_end]
+        b = second[batch_start:batch_end]
+        batch_sizes = sizes[batch_start:batch_end]
+        batch_start = batch_end
+
+        # Every planting in slot a against every planting in slot b.
+        pair = numpy.repeat(numpy.arange(len(a)), batch_sizes)
+        within = (numpy.arange(batch_sizes.sum()) -
+                  numpy.repeat(numpy.cumsum(batch_sizes) - batch_sizes,
+                               batch_sizes))
+        b_counts = counts[b][pair]
+        i = offsets[a][pair] + within // b_counts
+        j = offsets[b][pair] + within % b_counts
+
+        bad = ((starts[i] < ends[j]) & (ends[i] > starts[j]) &
+               (companions.matrix[plant_ids[i], plant_ids[j]] < 0))
+        found_i.append(i[bad])
+        found_j.append(j[bad])
+
+    if not found_i:
+        return []
+    found_i = numpy.concatenate(found_i)
+    found_j = numpy.concatenate(found_j)
+    order = numpy.lexsort((starts[found_j], found_j, starts[found_i],
+                           slot_of[found_i]))
+    return [NeighbourConflict(int(slot_of[plant_idx]), plants[plant_idx],
+                              int(slot_of[neighbour_idx]),
+                              plants[neighbour_idx])
+            for plant_idx, neighbour_idx in zip(found_i[order],
+                                                found_j[order])]
+
+
+def NeighbourConflictMessage(conflict, width):
+    """Get a human readable description of a neighbour conflict.
+
+    Args:
+        conflict: NeighbourConflict, The conflict.
+        width: int, The width of the garden (to find the slot coordinates).
+    """
+    return ('Plant "%s" (planted on %s) at (%d, %d) shouldn\'t grow next to '
+            '"%s" (planted on %s) at (%d, %d).') % (
+                conflict.plant.name, conflict.plant.plant_date,
+                conflict.slot_idx % width, conflict.slot_idx // width,
+                conflict.neighbour.name, conflict.neighbour.plant_date,
+                conflict.neighbour_idx % width,
+                conflict.neighbour_idx // width)
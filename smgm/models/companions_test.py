@@ -0,0 +1,161 @@
+"""A set of tests for companion planting."""
+
+import datetime
+import random
+import unittest
+
+import companions
+import garden
+
+
+_PLANTS = {
+    'Beans - dwarf': dict(companion='Compatible with (can grow in same bed): '
+                                    'Sweetcorn, carrots, brassicas'),
+    'Beans - climbing': dict(companion=''),
+    'Cabbage': dict(companion='Compatible with (can grow in same bed): '
+                              'Dwarf (bush) beans, aromatic herbs (sage)'),
+    'Carrot': dict(companion='Compatible with (can grow in same bed): '
+                             'Onions, Leeks and Sage'),
+    'Onion': dict(companion=''),
+    'Sage': dict(companion=''),
+    'Sweet corn': dict(companion='Compatible with (can grow in same bed): '
+                                 'All beans'),
+    'Taro': dict(companion='Compatible with (can grow in same bed): '
+                           'Best grown away from carrots and onions. '
+                           'Sage'),
+    'Yacon': dict(companion='Compatible with (can grow in same bed): '
+                            'Best in separate bed'),
+}
+
+
+class TestCompanions(unittest.TestCase):
+
+    def setUp(self):
+        self.companions = companions.Companions(_PLANTS, sorted(_PLANTS))
+
+    def testParseCompanionText(self):
+        phrases = companions._PhraseIndex(set(_PLANTS))
+        self.assertEqual(
+            {'Cabbage', 'Carrot', 'Sweet corn'},
+            companions.ParseCompanionText(
+                _PLANTS['Beans - dwarf']['companion'], phrases))
+        self.assertEqual(
+            {'Beans - dwarf', 'Sage'},
+            companions.ParseCompanionText(
+                _PLANTS['Cabbage']['companion'], phrases))
+        self.assertEqual(
+            {'Beans - dwarf', 'Beans - climbing'},
+            companions.ParseCompanionText(
+                _PLANTS['Sweet corn']['companion'], phrases))
+
+    def testCompatibility(self):
+        self.assertEqual(1, self.companions.Compatibility('Carrot', 'Onion'))
+        self.assertEqual(1, self.companions.Compatibility('Onion', 'Carrot'))
+        self.assertEqual(0, self.companions.Compatibility('Onion', 'Sage'))
+        self.assertEqual(-1, self.companions.Compatibility('Taro', 'Onion'))
+        self.assertEqual(-1, self.companions.Compatibility('Onion', 'Taro'))
+        self.assertEqual(1, self.companions.Compatibility('Taro', 'Sage'))
+        self.assertEqual(0, self.companions.Compatibility('Taro', 'Cabbage'))
+        self.assertEqual(0, self.companions.Compatibility('Taro', 'Taro'))
+        self.assertEqual(0, self.companions.Compatibility('Taro', 'Triffid'))
+
+        self.assertEqual(['Beans - dwarf', 'Onion', 'Sage'],
+                         self.companions.Compatible('Carrot'))
+        self.assertEqual(['Carrot', 'Onion'],
+                         self.companions.Incompatible('Taro'))
+        # Growing on its own names no plants to avoid.
+        self.assertEqual([], self.companions.Incompatible('Yacon'))
+        self.assertTrue((self.companions.matrix ==
+                         self.companions.matrix.T).all())
+
+
+class TestNeighbourConflicts(unittest.TestCase):
+
+    def setUp(self):
+        self.companions = companions.Companions(_PLANTS, sorted(_PLANTS))
+
+    def _RandomGarden(self, seed, width, height):
+        rand = random.Random(seed)
+        g = garden.Garden('test', width, height)
+        names = sorted(_PLANTS) + ['Triffid']
+        for slot in g.slots:
+            date = datetime.date(2017, 1, 1)
+            for _ in xrange(rand.randint(0, 6)):
+                growth = rand.randint(10, 60)
+                slot.Insert(garden.Plant(rand.choice(names), date, growth))
+                date += datetime.timedelta(days=growth)
+        return g
+
+    def _BruteForce(self, g, slot_indices=None):
+        conflicts = []
+        for slot_idx in xrange(len(g.slots)):
+            x, y = slot_idx % g.width, slot_idx // g.width
+            neighbours = []
+            if x + 1 < g.width:
+                neighbours.append(slot_idx + 1)
+            if y + 1 < g.height:
+                neighbours.append(slot_idx + g.width)
+            for neighbour_idx in neighbours:
+                if (slot_indices is not None and
+                        slot_idx not in slot_indices and
+                        neighbour_idx not in slot_indices):
+                    continue
+                for plant in g.slots[slot_idx]:
+                    for neighbour in g.slots[neighbour_idx]:
+                        if (plant.plant_ordinal < neighbour.harvest_ordinal and
+                                plant.harvest_ordinal >
+                                neighbour.plant_ordinal and
+                                self.companions.Compatibility(
+                                    plant.name, neighbour.name) < 0):
+                            conflicts.append(companions.NeighbourConflict(
+                                slot_idx, plant, neighbour_idx, neighbour))
+        return sorted(conflicts, key=lambda c: (
+            c.slot_idx, c.plant.plant_ordinal, c.neighbour_idx,
+            c.neighbour.plant_ordinal))
+
+    def testMatchesBruteForce(self):
+        for seed in xrange(5):
+            g = self._RandomGarden(seed, 5, 4)
+            expected = self._BruteForce(g)
+            self.assertTrue(expected)
+            self.assertEqual(expected, companions.FindNeighbourConflicts(
+                g, self.companions))
+
+    def testOnlyGivenSlots(self):
+        g = self._RandomGarden(0, 5, 4)
+        self.assertEqual(self._BruteForce(g, {3, 12}),
+                         companions.FindNeighbourConflicts(
+                             g, self.companions, [3, 12]))
+
+    def testSmallBatches(self):
+        g = self._RandomGarden(1, 5, 4)
+        old_batch = companions._MAX_PAIRS_PER_BATCH
+        companions._MAX_PAIRS_PER_BATCH = 7
+        try:
+            self.assertEqual(self._BruteForce(g),
+                             companions.FindNeighbourConflicts(
+                                 g, self.companions))
+        finally:
+            companions._MAX_PAIRS_PER_BATCH = old_batch
+
+    def testSingleRowAndEmptyGardens(self):
+        g = self._RandomGarden(2, 6, 1)
+        self.assertEqual(self._BruteForce(g),
+                         companions.FindNeighbourConflicts(g, self.companions))
+        self.assertEqual([], companions.FindNeighbourConflicts(
+            garden.Garden('empty', 3, 3), self.companions))
+
+    def testConflictMessage(self):
+        g = garden.Garden('test', 2, 1)
+        g.AddPlant(0, 0, garden.Plant('Taro', '2017-01-01', '2017-06-01'))
+        g.AddPlant(1, 0, garden.Plant('Carrot', '2017-02-01', '2017-04-01'))
+        conflicts = companions.FindNeighbourConflicts(g, self.companions)
+        self.assertEqual(
+            ['Plant "Taro" (planted on 2017-01-01) at (0, 0) shouldn\'t grow '
+             'next to "Carrot" (planted on 2017-02-01) at (1, 0).'],
+            [companions.NeighbourConflictMessage(c, g.width)
+             for c in conflicts])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+"""An index of which plantings in a garden are in the ground on each day.
+
+The plantings of the whole garden are sorted by plant date, and an implicit
+segment tree over them keeps the latest harvest date within each range. The
+plantings in the ground at some point in [start, end] are those planted on or
+before end (a prefix, found by bisection) which are harvested on or after start
+(found by descending only into subtrees which start within the prefix and whose
+latest harvest is late enough). Every subtree visited either holds a result or
+straddles the end of the prefix, and those which straddle it form a single
+path, so a query returning k plantings takes O((k + 1) log n) time.
+
+Indexes are cached per garden, and dropped whenever the account's gardens
+change.
+"""
+
+import array
+import bisect
+
+from garden_store import gardens_changed
+from lru_cache import LruCache
+
+
+## The maximum number of accounts whose garden indexes are cached.
+_CACHE_MAX_ACCOUNTS = 1000
+
+## How long an index stays cached, in seconds. This bounds how stale indexes
+## can get when gardens are changed through another process.
+_CACHE_TTL = 60
+
+## Indexes, keyed by account href. Each value is a dict of garden name -->
+## DayIndex.
+_cache = LruCache(max_entries=_CACHE_MAX_ACCOUNTS, ttl=_CACHE_TTL)
+
+
+class DayIndex(object):
+    """The plantings of a garden, indexed by the days they are in the ground.
+
+    The index is a snapshot; it doesn't change if the garden does.
+    """
+
+    def __init__(self, garden):
+        """Build the index for a garden.
+
+        Args:
+            garden: Garden, The garden to index.
+        """
+        entries = sorted(
+            ((plant.plant_ordinal, slot_idx, plant)
+             for slot_idx, slot in enumerate(garden.slots) for plant in slot),
+            key=lambda entry: entry[:2])
+        self._starts = array.array('l', [start for start, _, _ in entries])
+        self._slots = [slot_idx for _, slot_idx, _ in entries]
+        self._plants = [plant for _, _, plant in entries]
+
+        # _max_harvest[node] is the latest harvest ordinal of the plantings
+        # under node. The leaves start at _size; node i has children 2i and
+        # 2i + 1. Unused leaves can never match.
+        self._size = 1
+        while self._size < len(entries):
+            self._size *= 2
+        self._max_harvest = array.array('l', [-1]) * (2 * self._size)
+        for i, plant in enumerate(self._plants):
+            self._max_harvest[self._size + i] = plant.harvest_ordinal
+        for node in xrange(self._size - 1, 0, -1):
+            self._max_harvest[node] = max(self._max_harvest[2 * node],
+                                          self._max_harvest[2 * node + 1])
+
+    def __len__(self):
+        return len(self._plants)
+
+    def BetweenOrdinals(self, start, end):
+        """Get the plantings in the ground at some point in [start, end].
+
+        Args:
+            start: int, The ordinal of the first day of the range.
+            end: int, The ordinal of the last day of the range.
+
+        Returns:
+            list of (int, Plant), The slot index and plant of each planting,
+            sorted by plant date and then slot.
+        """
+        # Only the first hi plantings were planted on or before end.
+        hi = bisect.bisect_right(self._starts, end)
+        results = []
+        if hi == 0:
+            return results
+
+        # Depth first, left to right, so the results stay sorted. Each entry is
+        # (node, index of the first leaf under node, number of leaves).
+        stack = [(1, 0, self._size)]
+        while stack:
+            node, first, width = stack.pop()
+            # Subtrees past the prefix hold nothing planted in time, however
+            # late their harvests.
+            if first >= hi or self._max_harvest[node] < start:
+                continue
+            if width == 1:
+                results.append((self._slots[first], self._plants[first]))
+                continue
+
+            half = width // 2
+            stack.append((2 * node + 1, first + half, half))
+            stack.append((2 * node, first, half))
+        return results
+
+    def Between(self, start, end):
+        """Get the plantings in the ground at some point in [start, end].
+
+        Args:
+            start: datetime.date, The first day of the range.
+            end: datetime.date, The last day of the range.
+
+        Returns:
+            list of (int, Plant), See BetweenOrdinals().
+        """
+        return self.BetweenOrdinals(start.toordinal(), end.toordinal())
+
+    def At(self, date):
+        """Get the plantings in the ground on some day.
+
+        Returns:
+            list of (int, Plant), See BetweenOrdinals().
+        """
+        return self.BetweenOrdinals(date.toordinal(), date.toordinal())
+
+
+def GetDayIndex(store, account, name):
+    """Get the index of one of an account's gardens, building it if needed.
+
+    Args:
+        store: GardenStore, The store to load the garden from.
+        account: The account which owns the garden.
+        name: str, The name of the garden.
+
+    Returns:
+        DayIndex, or None if the garden doesn't exist.
+    """
+    indexes = _cache.Get(account.href)
+    if indexes is not None and name in indexes:
+        return indexes[name]
+
+    token = _cache.Token()
+    garden = store.Load(account, name)
+    if garden is None:
+        return None
+
+    index = DayIndex(garden)
+    indexes = dict(_cache.Get(account.href) or {})
+    indexes[name] = index
+    _cache.Put(account.href, indexes, token=token)
+    return index
+
+
+def _InvalidateIndexes(sender, account, **extra):
+    _cache.Invalidate(account.href)
+
+
+gardens_changed.connect(_InvalidateIndexes)
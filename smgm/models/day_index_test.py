@@ -0,0 +1,84 @@
+"""A set of tests for the day index."""
+
+import datetime
+import random
+import unittest
+
+import day_index
+import garden
+import garden_store
+import local_account
+
+
+def _Garden(seed, width=4, height=4, plantings=20):
+    rand = random.Random(seed)
+    g = garden.Garden('test', width, height)
+    for slot in g.slots:
+        date = datetime.date(2017, 1, 1)
+        for _ in xrange(plantings):
+            date += datetime.timedelta(days=rand.randint(0, 30))
+            growth = rand.randint(1, 120)
+            slot.Insert(garden.Plant('Carrot', date, growth))
+            date += datetime.timedelta(days=growth)
+    return g
+
+
+class TestDayIndex(unittest.TestCase):
+
+    def testIndexMatchesScan(self):
+        g = _Garden(0)
+        index = day_index.DayIndex(g)
+        self.assertEqual(4 * 4 * 20, len(index))
+
+        first = datetime.date(2016, 12, 1).toordinal()
+        last = datetime.date(2024, 1, 1).toordinal()
+        rand = random.Random(1)
+        for _ in xrange(200):
+            start = rand.randint(first, last)
+            end = start + rand.choice([0, 0, 1, 10, 100])
+            expected = sorted(
+                ((slot_idx, plant)
+                 for slot_idx, slot in enumerate(g.slots)
+                 for plant in slot.BetweenOrdinals(start, end)),
+                key=lambda entry: (entry[1].plant_ordinal, entry[0]))
+            self.assertEqual(expected, index.BetweenOrdinals(start, end))
+
+    def testIndexAt(self):
+        g = garden.Garden('test', 2, 1)
+        carrot = garden.Plant('Carrot', '2017-01-01', '2017-03-01')
+        beans = garden.Plant('Beans', '2017-03-01', '2017-05-01')
+        g.slots[0].Insert(carrot)
+        g.slots[0].Insert(beans)
+        index = day_index.DayIndex(g)
+
+        self.assertEqual([], index.At(datetime.date(2016, 12, 31)))
+        self.assertEqual([(0, carrot)], index.At(datetime.date(2017, 1, 1)))
+        self.assertEqual([(0, carrot), (0, beans)],
+                         index.At(datetime.date(2017, 3, 1)))
+        self.assertEqual([(0, beans)], index.At(datetime.date(2017, 5, 1)))
+        self.assertEqual([], index.At(datetime.date(2017, 5, 2)))
+        self.assertEqual([(0, carrot), (0, beans)], index.Between(
+            datetime.date(2016, 1, 1), datetime.date(2018, 1, 1)))
+
+    def testEmptyIndex(self):
+        index = day_index.DayIndex(garden.Garden('test', 1, 1))
+        self.assertEqual([], index.At(datetime.date(2017, 1, 1)))
+
+    def testGetDayIndexIsCachedUntilChanged(self):
+        store = garden_store.StormpathGardenStore()
+        account = local_account.LocalAccountDirectory().Get('accounts/index')
+        g = _Garden(2, 1, 1, 1)
+        store.Save(account, g)
+
+        index = day_index.GetDayIndex(store, account, 'test')
+        self.assertEqual(1, len(index))
+        self.assertIs(index, day_index.GetDayIndex(store, account, 'test'))
+        self.assertIsNone(day_index.GetDayIndex(store, account, 'missing'))
+
+        g.slots[0].Insert(garden.Plant('Beans', '2030-01-01', '2030-02-01'))
+        store.Save(account, g)
+        self.assertEqual(2, len(day_index.GetDayIndex(store, account, 'test')))
+
+
+if __name__ == '__main__':
+    unittest.main()
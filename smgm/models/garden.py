@@ -1,39 +1,130 @@
 """A model of a user's garden."""
 
+import array
 import bisect
 import datetime
+import hashlib
 import json
+import re
 
 from collections import defaultdict
-from dateutil.parser import parse as parse_date
-from icalendar import Event
+from garden_codec import Encode as EncodeCompact
+from garden_codec import IsCompact, IterPlantings
+from garden_validator import (Conflict, ConflictMessage, FindConflicts,
+                              Overlaps)
+from metrics import GARDEN_TIME
+
+## The number of days before today shown by the progress bars.
+_LAYOUT_DAYS_BEFORE = 30
+
+## The number of days after today shown by the progress bars.
+_LAYOUT_DAYS_AFTER = 180
+
+
+## The maximum number of date strings kept in the parse cache.
+_DATE_CACHE_SIZE = 4096
+
+## Cache of raw date string --> (ordinal, shared copy of the string). Plants in
+## the same garden tend to share a handful of dates, so most lookups hit.
+_date_cache = {}
+
+## Matches the date part of an ISO 8601 string, e.g. "2017-01-20T00:00:00+11:00"
+## as written by moment.js.
+_ISO_DATE_RE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})(?:[T ]|$)')
+
+
+def _ParseDate(date_str):
+    """Parse a date string into an (ordinal, date_str) pair.
+
+    The returned string is equal to date_str, but is shared between all plants
+    which used the same date string.
+    """
+    cached = _date_cache.get(date_str)
+    if cached is not None:
+        return cached
+
+    match = _ISO_DATE_RE.match(date_str)
+    if match:
+        date = datetime.date(*[int(part) for part in match.groups()])
+    else:
+        # dateutil is slow to import, and is rarely needed.
+        from dateutil.parser import parse as parse_date
+        date = parse_date(date_str).date()
+
+    if len(_date_cache) >= _DATE_CACHE_SIZE:
+        _date_cache.clear()
+    cached = _date_cache[date_str] = (date.toordinal(), date_str)
+    return cached
+
+## Cache of date ordinal --> ISO 8601 date string, for plants loaded from
+## ordinals.
+_iso_cache = {}
+
+
+def _IsoDate(ordinal):
+    """Get the ISO 8601 string of a date ordinal, shared between plants."""
+    iso = _iso_cache.get(ordinal)
+    if iso is None:
+        if len(_iso_cache) >= _DATE_CACHE_SIZE:
+            _iso_cache.clear()
+        iso = _iso_cache[ordinal] = datetime.date.fromordinal(
+            ordinal).isoformat()
+    return iso
+
+
+def _DateOnly(date):
+    """Strip the time from a datetime.datetime, if there is one."""
+    if isinstance(date, datetime.datetime):
+        return date.date()
+    return date
 
 
 class Plant(object):
-    """A single plant which is somewhere in a garden."""
+    """A single plant which is somewhere in a garden.
+
+    Dates are parsed once when the plant is created and stored as ordinals; the
+    original strings are only kept so that Serialize() can return them as-is.
+    """
 
-    def __init__(self, name, plant_date_str, harvest_date_str):
+    __slots__ = ('name', 'plant_ordinal', 'harvest_ordinal', '_plant_date',
+                 '_harvest_date')
+
+    def __init__(self, name, plant_date, harvest_date):
         """Create a new plant.
 
         Args:
             name: string, The name of the plant.
-            plant_date_str: str, The start date of the plant.
-            growth_time: str, The harvest date of the plant.
+            plant_date: str or datetime.date, The start date of the plant.
+            harvest_date: str, datetime.date or int, The harvest date of the
+                          plant. If an int, this is the growth time of the
+                          plant in days.
         """
         self.name = name
-        self._plant_date = plant_date_str
-        self._harvest_date = harvest_date_str
 
+        if isinstance(plant_date, datetime.date):
+            plant_date = _DateOnly(plant_date)
+            self.plant_ordinal = plant_date.toordinal()
+            self._plant_date = plant_date.isoformat()
+        else:
+            self.plant_ordinal, self._plant_date = _ParseDate(plant_date)
+
+        if isinstance(harvest_date, (int, long)):
+            harvest_date = datetime.date.fromordinal(
+                self.plant_ordinal + harvest_date)
+        if isinstance(harvest_date, datetime.date):
+            harvest_date = _DateOnly(harvest_date)
+            self.harvest_ordinal = harvest_date.toordinal()
+            self._harvest_date = harvest_date.isoformat()
+        else:
+            self.harvest_ordinal, self._harvest_date = _ParseDate(harvest_date)
 
     @property
     def plant_date(self):
-        return parse_date(self._plant_date).date()
-
+        return datetime.date.fromordinal(self.plant_ordinal)
 
     @property
     def harvest_date(self):
-        return parse_date(self._harvest_date).date()
-
+        return datetime.date.fromordinal(self.harvest_ordinal)
 
     def Serialize(self):
         """Serialize this object into a JSON dictionary."""
@@ -47,11 +138,145 @@ class Plant(object):
         """Load this object from a JSON dictionary."""
         return cls(json['name'], json['plant_date'], json['harvest_date'])
 
+    def OriginalDates(self):
+        """Get the date strings this plant was made with, if they were unusual.
+
+        Returns:
+            (str, str), The plant and harvest date strings, each None if it is
+            just the ISO 8601 date.
+        """
+        plant_date = self._plant_date
+        if plant_date == _IsoDate(self.plant_ordinal):
+            plant_date = None
+        harvest_date = self._harvest_date
+        if harvest_date == _IsoDate(self.harvest_ordinal):
+            harvest_date = None
+        return plant_date, harvest_date
+
+    @classmethod
+    def FromOrdinals(cls, name, plant_ordinal, harvest_ordinal,
+                     plant_date=None, harvest_date=None):
+        """Create a plant from its plant and harvest date ordinals.
+
+        Args:
+            plant_date: str, The original plant date string, if it isn't just
+                        the ISO 8601 date (see OriginalDates()).
+            harvest_date: str, The original harvest date string, likewise.
+        """
+        plant = cls.__new__(cls)
+        plant.name = name
+        plant.plant_ordinal = plant_ordinal
+        plant.harvest_ordinal = harvest_ordinal
+        plant._plant_date = plant_date or _IsoDate(plant_ordinal)
+        plant._harvest_date = harvest_date or _IsoDate(harvest_ordinal)
+        return plant
+
+
+class Slot(object):
+    """The plants within a single slot of a garden, sorted by plant date.
+
+    The plant date ordinals are kept in an array alongside the plants, so that
+    plants can be found by bisection. This behaves like a read-only list of
+    plants.
+    """
+
+    __slots__ = ('_plants', '_ordinals', '_max_span')
+
+    def __init__(self, plants=()):
+        self._plants = []
+        self._ordinals = array.array('l')
+
+        # An upper bound on the number of days any plant in the slot spends in
+        # the ground. Plants which are active on some day must have been planted
+        # at most this many days before it.
+        self._max_span = 0
+
+        for plant in plants:
+            self.Insert(plant)
+
+    def __len__(self):
+        return len(self._plants)
+
+    def __iter__(self):
+        return iter(self._plants)
+
+    def __getitem__(self, i):
+        return self._plants[i]
+
+    def Insert(self, plant):
+        """Insert a plant into the slot, without checking for overlaps."""
+        ordinal = plant.plant_ordinal
+        self._max_span = max(
+            self._max_span, plant.harvest_ordinal - plant.plant_ordinal)
+
+        # Plants are usually inserted in order, e.g. when loading a garden.
+        if not self._ordinals or ordinal >= self._ordinals[-1]:
+            self._plants.append(plant)
+            self._ordinals.append(ordinal)
+        else:
+            i = bisect.bisect_right(self._ordinals, ordinal)
+            self._plants.insert(i, plant)
+            self._ordinals.insert(i, ordinal)
+
+    def Add(self, plant):
+        """Add a plant to the slot.
+
+        Raises:
+            ValueError: if the plant would overlap with another in the slot.
+        """
+        for other in self.BetweenOrdinals(plant.plant_ordinal,
+                                          plant.harvest_ordinal):
+            if Overlaps(other, plant):
+                raise ValueError(
+                    ConflictMessage(Conflict(None, other, plant)))
+        self.Insert(plant)
+
+    def Find(self, name, plant_ordinal):
+        """Get the index of the named plant planted on some day (or -1)."""
+        i = bisect.bisect_left(self._ordinals, plant_ordinal)
+        while i < len(self._ordinals) and self._ordinals[i] == plant_ordinal:
+            if self._plants[i].name == name:
+                return i
+            i += 1
+        return -1
+
+    def Pop(self, i):
+        """Remove and return the plant at index i."""
+        del self._ordinals[i]
+        return self._plants.pop(i)
+
+    def BetweenOrdinals(self, start, end):
+        """Get the plants which are in the ground at some point in [start, end].
+
+        Args:
+            start: int, The ordinal of the first day of the range.
+            end: int, The ordinal of the last day of the range.
+
+        Returns:
+            list of Plant, sorted by plant date.
+        """
+        lo = bisect.bisect_left(self._ordinals, start - self._max_span)
+        hi = bisect.bisect_right(self._ordinals, end)
+        return [plant for plant in self._plants[lo:hi]
+                if plant.harvest_ordinal >= start]
+
+    def Between(self, start, end):
+        """Get the plants which are in the ground at some point in [start, end].
+
+        Args:
+            start: datetime.date, The first day of the range.
+            end: datetime.date, The last day of the range.
+
+        Returns:
+            list of Plant, sorted by plant date.
+        """
+        return self.BetweenOrdinals(start.toordinal(), end.toordinal())
+
 
 class Garden(object):
     """A Garden is a unique collection of slots in a square shape.
 
-    Each slot is a list of plants, where each plant has some plant time (the
+    Each slot is a Slot of plants, where each plant has some plant time (the
     real-life time it was (or will) be plant(ed)), with an invariant that
     subsequent plants within the same slot must have start dates later that
     previous plants.
@@ -61,121 +286,324 @@ class Garden(object):
 
     def __init__(self, name, width, height):
         self.name = name
-        self.slots = [[] for i in xrange(width*height)]
+        self.slots = [Slot() for i in xrange(width*height)]
         self.width = width
         self.height = height
 
+    @property
+    def size(self):
+        """tuple of (width, height), The size of the garden."""
+        return self.width, self.height
+
+    def _GetSlot(self, x, y):
+        """Get the slot at column x and row y.
+
+        Raises:
+            IndexError: if (x, y) is outside of the garden.
+        """
+        if not 0 <= x < self.width or not 0 <= y < self.height:
+            raise IndexError('Slot (%d, %d) is outside of the garden' % (x, y))
+        return self.slots[y*self.width + x]
+
+    def AddPlant(self, x, y, plant):
+        """Add a plant to the slot at column x and row y.
+
+        Raises:
+            IndexError: if (x, y) is outside of the garden.
+            ValueError: if the plant would overlap with another in the slot.
+        """
+        self._GetSlot(x, y).Add(plant)
+
     def Serialize(self):
         """Serialize this object into a JSON dictionary."""
-        slots = []
-        for slot in self.slots:
-            slots.append([p.Serialize() 
-                          for p in sorted(slot, key=lambda p: p.plant_date)])
+        with GARDEN_TIME.Time(operation='serialize'):
+            slots = []
+            for slot in self.slots:
+                slots.append([p.Serialize() for p in slot])
 
         return dict(
             name=self.name, width=self.width, height=self.height, slots=slots)
 
+    def SerializeCompact(self):
+        """Serialize this object compactly (see garden_codec)."""
+        with GARDEN_TIME.Time(operation='serialize'):
+            return EncodeCompact(self)
+
+    @staticmethod
+    def _DefaultLayoutWindow():
+        """Get the default (start, end) dates shown in the progress bars."""
+        now = datetime.datetime.now().date()
+        return (now - datetime.timedelta(days=_LAYOUT_DAYS_BEFORE),
+                now + datetime.timedelta(days=_LAYOUT_DAYS_AFTER))
+
+    @staticmethod
+    def _LayoutSlot(slot, start, days_total):
+        """Lay out a single slot in one pass.
+
+        Args:
+            slot: list of Plant, The (sorted) plants within the slot.
+            start: int, The ordinal of the date at the left edge of the bar.
+            days_total: float, The number of days covered by the bar.
+
+        Returns:
+            list of (whitespace_percent, plant_percent) tuples, one per plant.
+        """
+        layout = []
+        total_percent = 0
+        previous_plant = None
+        for plant in slot:
+            # The first plant is compared to the start of the window; every
+            # other plant is compared to the end of the previous plant.
+            if previous_plant is None:
+                whitespace_percent = 0
+                if plant.plant_ordinal > start:
+                    days_since_start = plant.plant_ordinal - start
+                    whitespace_percent = (
+                        float(days_since_start) / days_total)*100
+            else:
+                days_since_last_plant_end = (
+                    plant.plant_ordinal - previous_plant.harvest_ordinal)
+                whitespace_percent = (
+                    float(days_since_last_plant_end) / days_total)*100
+
+            days_of_plant = plant.harvest_ordinal - plant.plant_ordinal
+            plant_percent = (float(days_of_plant) / days_total)*100
+
+            # If the whitespace percent or plant percent goes over this limit,
+            # then set the corresponding one to this limit.
+            if total_percent + whitespace_percent > 100:
+                whitespace_percent = 100 - total_percent
+                plant_percent = 0
+            elif total_percent + whitespace_percent + plant_percent > 100:
+                plant_percent = 100 - (total_percent + whitespace_percent)
+
+            layout.append((whitespace_percent, plant_percent))
+            total_percent += whitespace_percent + plant_percent
+            previous_plant = plant
+
+        return layout
+
+    def Layout(self, start=None, end=None, slot_indices=None):
+        """Get the progress bar widths for every plant in every slot.
+
+        This is equivalent to calling ProgressFor() for each plant, but lays out
+        each slot in a single pass using one fixed view window.
+
+        Args:
+            start: datetime.date, The date at the left edge of the progress
+                   bars. Defaults to 30 days ago.
+            end: datetime.date, The date at the right edge of the progress bars.
+                 Defaults to 180 days from now.
+            slot_indices: iterable of int, If given, only lay out these slots.
+
+        Returns:
+            list of list of (whitespace_percent, plant_percent) tuples, indexed
+            by slot (or by position in slot_indices) and then by plant.
+        """
+        default_start, default_end = self._DefaultLayoutWindow()
+        start = start or default_start
+        end = end or default_end
+        days_total = float((end - start).days)
+        if slot_indices is None:
+            slot_indices = xrange(len(self.slots))
+        return [self._LayoutSlot(self.slots[slot_idx], start.toordinal(),
+                                 days_total)
+                for slot_idx in slot_indices]
+
     def ProgressFor(self, slot_idx, plant_idx):
         """Get the progress bar widths for the space before and for some plant."""
-        # The total time is 2 years; show up to 1 year in the future.
-        now = datetime.datetime.now().date()
-        start = now - datetime.timedelta(days=30)
-        end = now + datetime.timedelta(days=180)
+        start, end = self._DefaultLayoutWindow()
         days_total = float((end - start).days)
+        return self._LayoutSlot(self.slots[slot_idx][:plant_idx + 1],
+                                start.toordinal(), days_total)[plant_idx]
+
+    def IterEvents(self, start=None, end=None, uid_prefix=''):
+        """Generate the sow and harvest events for this garden, in date order.
+
+        Plants which are sown (or harvested) on the same day share an event.
+        Each event has a UID which only depends on the garden, the date and the
+        type of event, so calendar clients can sync changes incrementally.
+
+        Args:
+            start: datetime.date, If given, skip events before this date.
+            end: datetime.date, If given, skip events after this date.
+            uid_prefix: str, Included in the event UIDs; this should identify
+                        the owner of the garden.
+
+        Yields:
+            icalendar.Event
+        """
+        # icalendar is slow to import, and only needed for the calendar feed.
+        from icalendar import Event
+
+        start = (start or datetime.date.min).toordinal()
+        end = (end or datetime.date.max).toordinal()
 
-        # Get the total percent up until this plant.
-        previous_percents = [self.ProgressFor(slot_idx, i)
-                             for i in range(plant_idx)]
-        total_percent = sum([sum(p) for p in previous_percents])
-
-        # Get the current plant.
-        plant = self.slots[slot_idx][plant_idx]
-
-        # If we are looking at the first plant in a slot, compare it to the
-        # minimum.
-        whitespace_percent = 0
-        if plant_idx == 0:
-            # If one year ago was before the plant, then work out the amount of
-            # space we need to show before the plant.
-            if plant.plant_date > start:
-                days_since_start = (plant.plant_date - start).days
-                whitespace_percent = (float(days_since_start) / days_total)*100
-            else:
-                whitespace_percent = 0
-        else:
-            previous_plant = self.slots[slot_idx][plant_idx-1]
-            days_since_last_plant_end = (
-                plant.plant_date - previous_plant.harvest_date).days
-            whitespace_percent = (float(days_since_last_plant_end) / days_total)*100
-
-        days_of_plant = (plant.harvest_date - plant.plant_date).days
-        plant_percent = (float(days_of_plant) / days_total)*100
-
-        # If the whitespace percent or plant percent goes over this limit, then
-        # set the corresponding one to this limit.
-        if total_percent + whitespace_percent > 100:
-            whitespace_percent = 100 - total_percent
-            plant_percent = 0
-        elif total_percent + whitespace_percent + plant_percent > 100:
-            plant_percent = 100 - (total_percent + whitespace_percent)
-
-        return whitespace_percent, plant_percent
-
-    def AddEvents(self, cal):
-        """Modify the given calendar by adding a series of events."""
         sow_events = defaultdict(list)
         harvest_events = defaultdict(list)
-
         for slot in self.slots:
-            for plant in slot:
-                sow_events[plant.plant_date].append(plant)
-                harvest_events[plant.harvest_date].append(plant)
-
-        # Add the events to the calendar.
-        for sow_date, plants in sow_events.iteritems():
+            for plant in slot.BetweenOrdinals(start, end):
+                if start <= plant.plant_ordinal <= end:
+                    sow_events[plant.plant_ordinal].append(plant)
+                if start <= plant.harvest_ordinal <= end:
+                    harvest_events[plant.harvest_ordinal].append(plant)
+
+        events = [(ordinal, 0, 'Sow', plants)
+                  for ordinal, plants in sow_events.iteritems()]
+        events.extend((ordinal, 1, 'Harvest', plants)
+                      for ordinal, plants in harvest_events.iteritems())
+        events.sort(key=lambda e: e[:2])
+
+        uid_suffix = hashlib.sha1(
+            (u'%s/%s' % (uid_prefix, self.name)).encode('utf-8')).hexdigest()
+        for ordinal, _, action, plants in events:
+            date = datetime.date.fromordinal(ordinal)
             event = Event()
-            event['dtstart'] = sow_date
-            event['dtend'] = sow_date
-            event['summary'] = 'Sow %s' % (','.join([p.name for p in plants]))
+            event['uid'] = '%s-%s-%s@smgm' % (
+                action.lower(), date.strftime('%Y%m%d'), uid_suffix[:16])
+            event['dtstart'] = date
+            event['dtend'] = date
+            event['summary'] = '%s %s' % (
+                action, ','.join([p.name for p in plants]))
             event['location'] = self.name
-            cal.add_component(event)
+            yield event
 
-        for harvest_date, plants in harvest_events.iteritems():
-            event = Event()
-            event['dtstart'] = harvest_date
-            event['dtend'] = harvest_date
-            event['summary'] = 'Harvest %s' % (','.join([p.name for p in plants]))
-            event['location'] = self.name
-            cal.add_component(event)        
+    def AddEvents(self, cal, start=None, end=None, uid_prefix=''):
+        """Modify the given calendar by adding a series of events.
+
+        See IterEvents() for a description of the arguments.
+        """
+        for event in self.IterEvents(start, end, uid_prefix):
+            cal.add_component(event)
 
 
     @classmethod
-    def Load(cls, json):
-        """Load this object from a JSON dictionary."""
-        obj = cls(json['name'], json['width'], json['height'])
-        for slot_idx, slot_json in enumerate(json['slots']):
-            for plant_json in slot_json:
-                obj.slots[slot_idx].append(Plant.Load(plant_json))
+    def Load(cls, json, slot_indices=None):
+        """Load this object from a JSON dictionary, in either encoding.
 
-            obj.slots[slot_idx].sort(key=lambda p: p.plant_date)
+        Args:
+            json: dict, The garden JSON.
+            slot_indices: iterable of int, If given, only load the plants in
+                          these slots, and leave the rest empty. Indices
+                          outside the garden are ignored.
+
+        Raises:
+            ValueError: if the garden is in an unsupported compact encoding.
+        """
+        with GARDEN_TIME.Time(operation='load'):
+            obj = cls(json['name'], json['width'], json['height'])
+            if slot_indices is not None:
+                slot_indices = [slot_idx for slot_idx in slot_indices
+                                if 0 <= slot_idx < len(obj.slots)]
+            if IsCompact(json):
+                for (slot_idx, name, plant_ordinal, harvest_ordinal,
+                     plant_date, harvest_date) in IterPlantings(
+                         json, slot_indices):
+                    obj.slots[slot_idx].Insert(Plant.FromOrdinals(
+                        name, plant_ordinal, harvest_ordinal, plant_date,
+                        harvest_date))
+                return obj
+
+            slots_json = json['slots']
+            if slot_indices is None:
+                slot_indices = xrange(len(slots_json))
+            for slot_idx in slot_indices:
+                slot = obj.slots[slot_idx]
+                for plant_json in slots_json[slot_idx]:
+                    slot.Insert(Plant.Load(plant_json))
 
         return obj
 
-    def NotValidReason(self):
-        """Get a reason as to why the garden isn't valid."""
-        for slot in self.slots:
-            for i in range(len(slot) - 1):
-                p1 = slot[i]
-                p2 = slot[i+1]
-
-                if (p1.plant_date < p2.harvest_date and
-                    p1.harvest_date > p2.plant_date and
-                    p1.plant_date != p2.plant_date):
-                    return ('Plant "%s" (planted on %s) would overlap with "%s" '
-                            '(planted on %s).') % (p1.name, p1.plant_date,
-                                                   p2.name, p2.plant_date)
+    def Conflicts(self, slot_indices=None, first_only=False):
+        """Find every pair of plants which would overlap.
+
+        Args:
+            slot_indices: iterable of int, If given, only check these slots.
+            first_only: bool, If True, stop after finding the first conflict.
+
+        Returns:
+            list of garden_validator.Conflict.
+        """
+        return FindConflicts(self, slot_indices, first_only)
+
+    def NotValidReason(self, slot_indices=None):
+        """Get a reason as to why the garden isn't valid.
+
+        Args:
+            slot_indices: iterable of int, If given, only check these slots.
+        """
+        conflicts = self.Conflicts(slot_indices, first_only=True)
+        if conflicts:
+            return ConflictMessage(conflicts[0])
         return None
 
+    def _CheckSlotIndex(self, slot_idx):
+        """Raise a ValueError if slot_idx isn't a valid slot index."""
+        if (not isinstance(slot_idx, (int, long)) or
+                not 0 <= slot_idx < len(self.slots)):
+            raise ValueError('Unknown slot %s' % (slot_idx,))
+
+    def _RemovePlant(self, slot_idx, plant_json):
+        """Remove the plant with the given name and plant date from a slot."""
+        try:
+            name = plant_json['name']
+            plant_ordinal, _ = _ParseDate(plant_json['plant_date'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('Plants must have a name and plant_date')
+
+        slot = self.slots[slot_idx]
+        i = slot.Find(name, plant_ordinal)
+        if i >= 0:
+            return slot.Pop(i)
+
+        raise ValueError('No plant "%s" planted on %s in slot %d' % (
+            name, datetime.date.fromordinal(plant_ordinal), slot_idx))
+
+    def ApplyEdit(self, slot_idx, edit):
+        """Apply a single edit to a slot.
+
+        Edits are JSON dictionaries which look like one of:
+            {"op": "add", "plant": <plant JSON>}
+            {"op": "remove", "plant": {"name": ..., "plant_date": ...}}
+            {"op": "move", "plant": {"name": ..., "plant_date": ...},
+             "to": <slot index>}
+
+        Args:
+            slot_idx: int, The index of the slot to edit.
+            edit: dict, The edit to apply.
+
+        Returns:
+            set of int, The indices of the slots which were changed.
+
+        Raises:
+            ValueError: if the edit was malformed, or referred to a slot or
+                        plant which doesn't exist.
+        """
+        self._CheckSlotIndex(slot_idx)
+        if not isinstance(edit, dict):
+            raise ValueError('Edits must be JSON objects')
+
+        op = edit.get('op')
+        if op == 'add':
+            try:
+                plant = Plant.Load(edit['plant'])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError('Plants must have a name, plant_date and '
+                                 'harvest_date')
+            self.slots[slot_idx].Insert(plant)
+            return {slot_idx}
+        elif op == 'remove':
+            self._RemovePlant(slot_idx, edit.get('plant'))
+            return {slot_idx}
+        elif op == 'move':
+            to_idx = edit.get('to')
+            self._CheckSlotIndex(to_idx)
+            self.slots[to_idx].Insert(
+                self._RemovePlant(slot_idx, edit.get('plant')))
+            return {slot_idx, to_idx}
+
+        raise ValueError('Unknown edit operation %s' % (op,))
+
     def IsValid(self):
         """Validate the current garden."""
         # Make sure none of the plants overlap.
@@ -2,24 +2,83 @@
 
 from __future__ import print_function
 
+import datetime
+import json
+
 from garden import Plant, Garden
+from garden_codec import MIMETYPE as COMPACT_MIMETYPE
+from garden_store import GetGardenStore
+from garden_transfer import (MIMETYPE as NDJSON_MIMETYPE, ExportGardens,
+                             ImportGardens)
+from day_index import GetDayIndex
+from garden_validator import ConflictMessage
+from ics_feed import CacheToken, GetCachedFeed, ParseWindowDate, StreamFeed
+from plant_catalog import GetCatalog
 from smgm import app
-from flask import jsonify, request, abort
+from flask import Response, jsonify, request, abort, stream_with_context
 from flask_stormpath import login_required, user, StormpathManager
-from icalendar import Calendar
+
+
+def _ConflictsResponse(conflicts):
+    """Make an error response listing every conflict in a garden."""
+    errors = [ConflictMessage(conflict) for conflict in conflicts]
+    return jsonify(dict(error=errors[0], errors=errors)), 400
+
+
+def _NeighbourWarnings(garden, slot_indices=None):
+    """List the incompatible neighbours in a garden, as messages.
+
+    These don't stop a garden from being saved.
+    """
+    # The companions and planner modules use NumPy, which is slow to import,
+    # so they are only imported when first used.
+    from companions import FindNeighbourConflicts, NeighbourConflictMessage
+
+    conflicts = FindNeighbourConflicts(
+        garden, GetCatalog().companions, slot_indices)
+    return [NeighbourConflictMessage(conflict, garden.width)
+            for conflict in conflicts]
+
+
+def _WantsCompact():
+    """Check whether the client prefers gardens in the compact encoding."""
+    return request.accept_mimetypes.best_match(
+        ['application/json', COMPACT_MIMETYPE]) == COMPACT_MIMETYPE
+
+
+def _GardenResponse(garden_json, compact):
+    """Make a response containing gardens, in the negotiated encoding."""
+    if compact:
+        # Never pretty printed, unlike jsonify().
+        response = Response(json.dumps(garden_json, separators=(',', ':')),
+                            mimetype=COMPACT_MIMETYPE)
+    else:
+        response = jsonify(garden_json)
+    response.vary.add('Accept')
+    return response
 
 
 @app.route('/api/garden', methods=['GET'])
 @app.route('/api/garden/<string:name>', methods=['GET'])
 @login_required
 def get_garden(name=None):
-    gardens = user.custom_data.get('gardens', {})
+    """Get one or all of the user's gardens.
+
+    Gardens are in the compact encoding (see garden_codec) if the Accept header
+    prefers it, otherwise they are plain JSON.
+    """
+    store = GetGardenStore()
+    compact = _WantsCompact()
     if name is None:
-        return jsonify(gardens)
+        return _GardenResponse({handle.name: handle.Serialize(compact)
+                                for handle in store.Handles(user)}, compact)
 
-    if name not in garden_json:
-        return dict(error="Unknown garden %s" % name), 404
-    return garden_json[name]
+    garden = store.Load(user, name)
+    if garden is None:
+        return jsonify(dict(error="Unknown garden %s" % name)), 404
+    if compact:
+        return _GardenResponse(garden.SerializeCompact(), compact)
+    return _GardenResponse(garden.Serialize(), compact)
 
 @app.route('/api/garden', methods=['POST'])
 @login_required
@@ -41,16 +100,13 @@ def post_garden():
             error="Missing fields from request (%s)" % missing_fields)), 400
 
     # Make the garden.
-    gardens = user.custom_data.get('gardens', {})
+    store = GetGardenStore()
     garden = Garden(name, int(width), int(height))
     
-    if garden.name in gardens:
+    if store.Exists(user, garden.name):
         return jsonify(dict(error="Garden named %s already exists" % garden.name)), 400
 
-    if 'gardens' not in user.custom_data:
-        user.custom_data['gardens'] = {}
-    user.custom_data['gardens'][garden.name] = garden.Serialize()
-    user.save()
+    store.Save(user, garden)
 
     return jsonify(dict(error=None)), 200
 
@@ -58,35 +114,355 @@ def post_garden():
 @app.route('/api/garden/<string:name>', methods=['PUT'])
 @login_required
 def put_garden(name):
-    garden = Garden.Load(request.json)
-    if not garden.IsValid():
-        return jsonify(dict(error=garden.NotValidReason())), 400
+    """Replace a garden, given in either encoding."""
+    try:
+        garden = Garden.Load(request.json)
+    except ValueError as e:
+        return jsonify(dict(error=str(e))), 400
+    conflicts = garden.Conflicts()
+    if conflicts:
+        return _ConflictsResponse(conflicts)
 
     # Save the garden.
-    user.custom_data['gardens'][garden.name] = garden.Serialize()
-    user.save()
-    return jsonify(dict(error=None)), 200
+    GetGardenStore().Save(user, garden)
+    return jsonify(dict(error=None, warnings=_NeighbourWarnings(garden))), 200
+
+## The most slots get_garden_slots() returns at once.
+_MAX_SLOTS_PER_REQUEST = 1000
+
+
+@app.route('/api/garden/<string:name>/slots', methods=['GET'])
+@login_required
+def get_garden_slots(name):
+    """Get a range of the slots of a garden, and their progress bar layout.
+
+    This lets the garden page load very large gardens a chunk at a time. The
+    optional start and count query parameters pick the slots (by default, the
+    first 100).
+    """
+    try:
+        start = int(request.args.get('start', 0))
+        count = int(request.args.get('count', 100))
+    except ValueError:
+        return jsonify(dict(error="Invalid slot range")), 400
+    if start < 0 or count < 1:
+        return jsonify(dict(error="Invalid slot range")), 400
+
+    # Only the requested slots are decoded (or queried).
+    end = start + min(count, _MAX_SLOTS_PER_REQUEST)
+    garden = GetGardenStore().LoadSlots(user, name, xrange(start, end))
+    if garden is None:
+        return jsonify(dict(error="Unknown garden %s" % name)), 404
+
+    total = len(garden.slots)
+    start = min(start, total)
+    end = min(end, total)
+    slot_indices = xrange(start, end)
+    return jsonify(dict(
+        error=None, start=start, end=end, total=total,
+        slots=[[plant.Serialize() for plant in garden.slots[slot_idx]]
+               for slot_idx in slot_indices],
+        layout=garden.Layout(slot_indices=slot_indices))), 200
+
+
+@app.route('/api/garden/<string:name>/slots', methods=['PATCH'])
+@app.route('/api/garden/<string:name>/slots/<int:slot_idx>', methods=['PATCH'])
+@login_required
+def patch_garden_slots(name, slot_idx=None):
+    """Add, remove or move plants within some of the slots of a garden.
+
+    For a single slot, the request is either one edit (see Garden.ApplyEdit) or
+    {"edits": [...]}. Otherwise, the request is {"edits": [...]} where each edit
+    also has a "slot". Either all of the edits are saved, or none are.
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify(dict(error="No data provided")), 400
+
+    edits = body.get('edits', None)
+    if slot_idx is not None and edits is None:
+        edits = [body]
+    if not isinstance(edits, list):
+        return jsonify(dict(error="Missing fields from request (edits)")), 400
+
+    store = GetGardenStore()
+    garden = store.Load(user, name)
+    if garden is None:
+        return jsonify(dict(error="Unknown garden %s" % name)), 404
+
+    # Apply all of the edits, then only validate and save the changed slots.
+    changed_slots = set()
+    for i, edit in enumerate(edits):
+        edit_slot_idx = slot_idx
+        if edit_slot_idx is None and isinstance(edit, dict):
+            edit_slot_idx = edit.get('slot', None)
+
+        try:
+            changed_slots |= garden.ApplyEdit(edit_slot_idx, edit)
+        except ValueError as e:
+            return jsonify(dict(error="Edit %d: %s" % (i, e))), 400
+
+    conflicts = garden.Conflicts(sorted(changed_slots))
+    if conflicts:
+        return _ConflictsResponse(conflicts)
+
+    store.SaveSlots(user, garden, changed_slots)
+    slots = {str(i): [p.Serialize() for p in garden.slots[i]]
+             for i in changed_slots}
+    return jsonify(dict(error=None, slots=slots,
+                        warnings=_NeighbourWarnings(garden, changed_slots))), 200
+
+@app.route('/api/garden/<string:name>/companions', methods=['GET'])
+@login_required
+def get_garden_companions(name):
+    """Find plants growing next to plants they are incompatible with."""
+    from companions import FindNeighbourConflicts, NeighbourConflictMessage
+
+    garden = GetGardenStore().Load(user, name)
+    if garden is None:
+        return jsonify(dict(error="Unknown garden %s" % name)), 404
+
+    conflicts = FindNeighbourConflicts(garden, GetCatalog().companions)
+    return jsonify(dict(error=None, conflicts=[dict(
+        slot=conflict.slot_idx,
+        plant=conflict.plant.Serialize(),
+        neighbour_slot=conflict.neighbour_idx,
+        neighbour=conflict.neighbour.Serialize(),
+        message=NeighbourConflictMessage(conflict, garden.width))
+        for conflict in conflicts]))
+
+
+@app.route('/api/garden/<string:name>/plan', methods=['POST'])
+@login_required
+def plan_garden(name):
+    """Automatically schedule plantings to fill the free space in a garden.
+
+    The request looks like:
+        {"plants": ["Beans", {"name": "Carrot", "count": 10}, ...],
+         "start": "2017-09-01", "end": 730, "save": false}
+
+    Plants without a count are planted as many times as will fit. start and end
+    are dates or days from today (see ics_feed.ParseWindowDate), and default to
+    today and a year from today. If save is true, the new plantings are added to
+    the garden; otherwise they are only returned.
+    """
+    from planner import Plan, PlanRequest
+
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or not isinstance(body.get('plants'), list):
+        return jsonify(dict(error="Missing fields from request (plants)")), 400
+
+    requests = []
+    for plant in body['plants']:
+        if not isinstance(plant, dict):
+            plant = dict(name=plant)
+        count = plant.get('count')
+        if count is not None and (not isinstance(count, int) or count < 1):
+            return jsonify(dict(error="Invalid count for %s" % (
+                plant.get('name'),))), 400
+        requests.append(PlanRequest(plant.get('name'), count))
+
+    today = datetime.date.today()
+    try:
+        start = ParseWindowDate(body.get('start', 0), today)
+        end = ParseWindowDate(body.get('end', 365), today)
+    except (TypeError, ValueError) as e:
+        return jsonify(dict(error="Invalid dates (%s)" % e)), 400
+
+    store = GetGardenStore()
+    garden = store.Load(user, name)
+    if garden is None:
+        return jsonify(dict(error="Unknown garden %s" % name)), 404
+
+    try:
+        plantings, unplaced = Plan(
+            garden, GetCatalog().plants, requests, start, end)
+    except ValueError as e:
+        return jsonify(dict(error=str(e))), 400
+
+    if body.get('save'):
+        for slot_idx, plant in plantings:
+            garden.slots[slot_idx].Insert(plant)
+        changed_slots = {slot_idx for slot_idx, _ in plantings}
+        conflicts = garden.Conflicts(sorted(changed_slots))
+        if conflicts:
+            return _ConflictsResponse(conflicts)
+        store.SaveSlots(user, garden, changed_slots)
+
+    return jsonify(dict(error=None, unplaced=unplaced, plantings=[
+        dict(plant.Serialize(), slot=slot_idx)
+        for slot_idx, plant in plantings])), 200
+
 
 @app.route('/api/garden/<string:name>', methods=['DELETE'])
 @login_required
 def delete_garden(name):
-    if name in user.custom_data['gardens']:
-        del user.custom_data['gardens'][name]
-        user.save()
+    GetGardenStore().Delete(user, name)
 
     return jsonify(dict(error=None)), 200
 
 
+@app.route('/api/gardens/export', methods=['GET'])
+@login_required
+def export_gardens():
+    """Stream all of the user's gardens as NDJSON, one garden per line.
+
+    Gardens are plain JSON, or in the compact encoding with ?compact=1.
+    """
+    compact = request.args.get('compact', '0') not in ('0', 'false')
+    response = Response(
+        stream_with_context(ExportGardens(GetGardenStore(), user, compact)),
+        mimetype=NDJSON_MIMETYPE)
+    response.headers['Content-Disposition'] = (
+        'attachment; filename=gardens.ndjson')
+    return response
+
+
+@app.route('/api/gardens/import', methods=['POST'])
+@login_required
+def import_gardens():
+    """Import gardens from an NDJSON body, one garden per line.
+
+    Gardens may be in either encoding, and replace any existing gardens with
+    the same names. Valid gardens are saved even if other lines aren't valid;
+    the response has the number of gardens imported and failed, and the errors
+    (with line numbers). Gardens larger than the IMPORT_MAX_GARDEN_SLOTS and
+    IMPORT_MAX_GARDEN_PLANTINGS config options are rejected.
+    """
+    result = ImportGardens(
+        GetGardenStore(), user, request.stream,
+        max_slots=app.config.get('IMPORT_MAX_GARDEN_SLOTS'),
+        max_plantings=app.config.get('IMPORT_MAX_GARDEN_PLANTINGS'))
+    error = None
+    if result.failed:
+        error = "%d lines could not be imported" % result.failed
+    return jsonify(dict(result.Serialize(), error=error)), 200
+
+
+def _ParseDayRange(date):
+    """Parse the date in an /at/ URL, and the optional to query parameter.
+
+    Returns:
+        (datetime.date, datetime.date), The first and last day of the range.
+
+    Raises:
+        ValueError: if either date couldn't be parsed.
+    """
+    today = datetime.date.today()
+    start = ParseWindowDate(date, today)
+    end = start
+    if 'to' in request.args:
+        end = ParseWindowDate(request.args['to'], today)
+    if end < start:
+        raise ValueError('to is before the date')
+    return start, end
+
+
+def _DayPlantingsJson(index, start, end, catalog_plants):
+    """Describe the plantings in the ground between two days.
+
+    Each planting has a status: "sowing" if it is planted within the range,
+    otherwise "harvestable" if the range reaches its harvest period (which
+    starts harvest_start days after planting, for plants in the catalog),
+    otherwise "growing".
+    """
+    start, end = start.toordinal(), end.toordinal()
+    plantings = []
+    for slot_idx, plant in index.BetweenOrdinals(start, end):
+        harvest_from = plant.harvest_ordinal
+        plant_info = catalog_plants.get(plant.name)
+        if plant_info is not None:
+            harvest_from = min(
+                harvest_from, plant.plant_ordinal + plant_info['harvest_start'])
+
+        if start <= plant.plant_ordinal:
+            status = 'sowing'
+        elif harvest_from <= end:
+            status = 'harvestable'
+        else:
+            status = 'growing'
+        plantings.append(dict(plant.Serialize(), slot=slot_idx, status=status))
+    return plantings
+
+
+@app.route('/api/garden/<string:name>/at/<string:date>', methods=['GET'])
+@login_required
+def get_garden_at(name, date):
+    """Get the plantings in a garden on a day (or, with ?to=, a range of days).
+
+    Dates are either YYYY-MM-DD or a number of days from today.
+    """
+    try:
+        start, end = _ParseDayRange(date)
+    except ValueError as e:
+        return jsonify(dict(error="Invalid date (%s)" % e)), 400
+
+    index = GetDayIndex(GetGardenStore(), user, name)
+    if index is None:
+        return jsonify(dict(error="Unknown garden %s" % name)), 404
+
+    return jsonify(dict(
+        start=start.isoformat(), end=end.isoformat(),
+        plantings=_DayPlantingsJson(index, start, end, GetCatalog().plants)))
+
+
+@app.route('/api/gardens/at/<string:date>', methods=['GET'])
+@login_required
+def get_gardens_at(date):
+    """Get the plantings in all of the user's gardens on a day (or range).
+
+    See get_garden_at().
+    """
+    try:
+        start, end = _ParseDayRange(date)
+    except ValueError as e:
+        return jsonify(dict(error="Invalid date (%s)" % e)), 400
+
+    store = GetGardenStore()
+    catalog_plants = GetCatalog().plants
+    gardens = {}
+    for name in store.List(user):
+        index = GetDayIndex(store, user, name)
+        if index is not None:
+            gardens[name] = _DayPlantingsJson(
+                index, start, end, catalog_plants)
+
+    return jsonify(dict(
+        start=start.isoformat(), end=end.isoformat(), gardens=gardens))
+
+
 @app.route('/api/gardens/ics/<string:id>', methods=['GET'])
 def get_gardens_ics_for_user(id):
+    """Get the calendar feed for all of an account's gardens.
+
+    The optional from and to query parameters limit the feed to a window of
+    dates; see ics_feed.ParseWindowDate() for their format.
+    """
+    today = datetime.date.today()
+    try:
+        start = end = None
+        if 'from' in request.args:
+            start = ParseWindowDate(request.args['from'], today)
+        if 'to' in request.args:
+            end = ParseWindowDate(request.args['to'], today)
+    except ValueError as e:
+        return jsonify(dict(error="Invalid date window (%s)" % e)), 400
+
+    feed = GetCachedFeed(id, start, end)
+    if feed is not None:
+        response = Response(feed.body, mimetype='text/calendar')
+        response.set_etag(feed.etag)
+        response.last_modified = feed.last_modified
+        return response.make_conditional(request)
+
+    token = CacheToken()
     base = 'https://api.stormpath.com/v1/accounts/%s'
     user = StormpathManager.load_user(base % id)
     if not user:
         abort(404)
 
-    gardens_raw = user.custom_data.get('gardens', {})
-    ics = Calendar()
-    for garden_raw in gardens_raw.itervalues():
-        Garden.Load(garden_raw).AddEvents(ics)
-
-    return ics.to_ical()
+    # Load the gardens one at a time, as the feed is streamed.
+    store = GetGardenStore()
+    gardens = (store.Load(user, name) for name in store.List(user))
+    return Response(StreamFeed(id, gardens, start, end, token),
+                    mimetype='text/calendar')
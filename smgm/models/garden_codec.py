@@ -0,0 +1,164 @@
+"""A compact, columnar encoding of gardens.
+
+The plain JSON encoding (Garden.Serialize()) repeats the keys and full date
+strings of every planting. The compact encoding is still JSON, so it can be
+stored in Stormpath custom data, but looks like:
+
+    {"format": "compact", "version": 1,
+     "name": "Veggies", "width": 2, "height": 1,
+     "names": ["Carrot", "Beans - dwarf"],
+     "base": 736330,
+     "slots": [[[0, 1, 0], [0, 60, 45], [60, 40, 60]], []]}
+
+names interns each plant name once. Each non-empty slot is three parallel
+arrays, in plant date order: the index into names, the number of days since
+the previous plant in the slot was planted (since base, the first plant date
+in the garden, for the first plant), and the number of days until harvest.
+
+Date strings which are just the ISO 8601 date (e.g. "2017-01-01") are rebuilt
+from the ordinals. Slots with any other date strings (with a time and zone, or
+in another format) have a fourth array, which keeps them as they were given:
+for each plant, null if both of its dates are plain, otherwise
+[plant_date, harvest_date] with null for a plain date. So gardens decode to
+exactly what was encoded.
+"""
+
+
+## The value of the format field of compact gardens.
+FORMAT = 'compact'
+
+## The version of the compact encoding which is written. Version 1 never has
+## the array of original date strings.
+VERSION = 2
+
+## The versions of the compact encoding which can be read.
+_READABLE_VERSIONS = (1, 2)
+
+## The media type of compact gardens, for content negotiation.
+MIMETYPE = 'application/vnd.smgm.garden-compact+json'
+
+
+def IsCompact(garden_json):
+    """Check whether some garden JSON is in the compact encoding."""
+    return garden_json.get('format') == FORMAT
+
+
+def _EncodeSlot(slot, base, names, name_ids):
+    """Encode the plants in a slot, adding any new plant names to names."""
+    if not len(slot):
+        return []
+
+    plant_names = []
+    starts = []
+    growths = []
+    dates = []
+    previous = base
+    for plant in slot:
+        name_id = name_ids.get(plant.name)
+        if name_id is None:
+            name_id = name_ids[plant.name] = len(names)
+            names.append(plant.name)
+        plant_names.append(name_id)
+        starts.append(plant.plant_ordinal - previous)
+        growths.append(plant.harvest_ordinal - plant.plant_ordinal)
+        previous = plant.plant_ordinal
+
+        original_dates = plant.OriginalDates()
+        dates.append(None if original_dates == (None, None)
+                     else list(original_dates))
+
+    if any(dates):
+        return [plant_names, starts, growths, dates]
+    return [plant_names, starts, growths]
+
+
+def Encode(garden):
+    """Encode a garden in the compact encoding.
+
+    Args:
+        garden: Garden, The garden.
+
+    Returns:
+        dict, The compact garden JSON.
+    """
+    base = min([slot[0].plant_ordinal for slot in garden.slots if len(slot)] or
+               [0])
+    names = []
+    name_ids = {}
+    slots = [_EncodeSlot(slot, base, names, name_ids) for slot in garden.slots]
+    return dict(format=FORMAT, version=VERSION, name=garden.name,
+                width=garden.width, height=garden.height, names=names,
+                base=base, slots=slots)
+
+
+def EncodeSlots(garden_json, garden, slot_indices):
+    """Re-encode some of the slots of an already encoded garden.
+
+    The rest of the encoded garden is assumed to be unchanged.
+
+    Args:
+        garden_json: dict, The compact garden JSON. This isn't modified.
+        garden: Garden, The garden.
+        slot_indices: iterable of int, The indices of the changed slots.
+
+    Returns:
+        dict, The new compact garden JSON.
+    """
+    names = list(garden_json['names'])
+    name_ids = {name: i for i, name in enumerate(names)}
+    slots = list(garden_json['slots'])
+    for slot_idx in slot_indices:
+        slots[slot_idx] = _EncodeSlot(
+            garden.slots[slot_idx], garden_json['base'], names, name_ids)
+    return dict(garden_json, version=VERSION, names=names, slots=slots)
+
+
+def IterPlantings(garden_json, slot_indices=None):
+    """Decode the plantings of a compact garden.
+
+    Each slot is encoded separately, so some slots can be decoded without
+    touching the rest.
+
+    Args:
+        garden_json: dict, The compact garden JSON.
+        slot_indices: iterable of int, If given, only decode these slots.
+
+    Yields:
+        (int, str, int, int, str, str), The slot index, plant name, plant date
+        ordinal, harvest date ordinal, and original plant and harvest date
+        strings (or None if they are plain ISO 8601 dates) of each planting,
+        in slot and then plant date order.
+
+    Raises:
+        ValueError: if the garden is in an unknown version of the encoding, or
+                    is malformed.
+    """
+    if garden_json.get('version') not in _READABLE_VERSIONS:
+        raise ValueError('Unsupported compact garden version %s' % (
+            garden_json.get('version'),))
+
+    names = garden_json['names']
+    base = garden_json['base']
+    slots = garden_json['slots']
+    if slot_indices is None:
+        slot_indices = xrange(len(slots))
+    for slot_idx in slot_indices:
+        slot_json = slots[slot_idx]
+        if not slot_json:
+            continue
+        if len(slot_json) == 3:
+            plant_names, starts, growths = slot_json
+            dates = [None] * len(plant_names)
+        else:
+            plant_names, starts, growths, dates = slot_json
+        if not len(plant_names) == len(starts) == len(growths) == len(dates):
+            raise ValueError('Slot %d has columns of different lengths' % (
+                slot_idx,))
+
+        plant_ordinal = base
+        for name_id, start, growth, original_dates in zip(
+                plant_names, starts, growths, dates):
+            plant_ordinal += start
+            plant_date, harvest_date = original_dates or (None, None)
+            yield (slot_idx, names[name_id], plant_ordinal,
+                   plant_ordinal + growth, plant_date, harvest_date)
@@ -0,0 +1,105 @@
+"""A set of tests for the compact garden encoding."""
+
+import datetime
+import json
+import random
+import unittest
+
+import garden
+import garden_codec
+
+
+def _RandomGarden(seed, width, height, plantings):
+    rand = random.Random(seed)
+    names = ['Beans - dwarf', 'Beetroot', 'Cabbage', 'Carrot', 'Tomato']
+    g = garden.Garden('test', width, height)
+    for slot in g.slots:
+        date = datetime.date(2017, 1, 1)
+        for _ in xrange(rand.randint(0, plantings)):
+            date += datetime.timedelta(days=rand.randint(0, 30))
+            growth = rand.randint(1, 120)
+            slot.Insert(garden.Plant(rand.choice(names), date, growth))
+            date += datetime.timedelta(days=growth)
+    return g
+
+
+class TestGardenCodec(unittest.TestCase):
+
+    def testEncode(self):
+        g = garden.Garden('test', 2, 2)
+        g.AddPlant(1, 0, garden.Plant('Carrot', '2017-01-11', '2017-03-01'))
+        g.AddPlant(1, 0, garden.Plant('Beans', '2017-03-01', '2017-05-01'))
+        g.AddPlant(0, 1, garden.Plant('Carrot', '2017-01-01', '2017-02-01'))
+        base = datetime.date(2017, 1, 1).toordinal()
+        self.assertEqual(dict(
+            format='compact', version=2, name='test', width=2, height=2,
+            names=['Carrot', 'Beans'], base=base,
+            slots=[[], [[0, 1], [10, 49], [49, 61]], [[0], [0], [31]], []]),
+            g.SerializeCompact())
+
+    def testRoundTrip(self):
+        for seed in xrange(5):
+            g = _RandomGarden(seed, 4, 3, 10)
+            compact = json.loads(json.dumps(g.SerializeCompact()))
+            self.assertEqual(g.Serialize(), garden.Garden.Load(
+                compact).Serialize())
+
+    def testRoundTripEmptyGarden(self):
+        g = garden.Garden('empty', 3, 1)
+        self.assertEqual(g.Serialize(), garden.Garden.Load(
+            g.SerializeCompact()).Serialize())
+
+    def testEncodeSlots(self):
+        g = _RandomGarden(0, 3, 3, 5)
+        compact = g.SerializeCompact()
+        g.slots[4].Insert(garden.Plant('Taro', '2016-01-01', '2016-06-01'))
+        g.slots[7].Pop(0)
+        updated = garden_codec.EncodeSlots(compact, g, [4, 7])
+
+        self.assertNotIn('Taro', compact['names'])
+        self.assertEqual(g.Serialize(), garden.Garden.Load(updated).Serialize())
+
+    def testRoundTripOriginalDates(self):
+        g = garden.Garden('test', 2, 1)
+        g.AddPlant(0, 0, garden.Plant('Carrot', '2017-01-01T00:00:00+11:00',
+                                      '2017-03-01'))
+        g.AddPlant(0, 0, garden.Plant('Beans', '2017-03-01', '2017-05-01'))
+        g.AddPlant(1, 0, garden.Plant('Carrot', '2017-01-01', '2017-02-01'))
+        compact = json.loads(json.dumps(g.SerializeCompact()))
+
+        self.assertEqual([[u'2017-01-01T00:00:00+11:00', None], None],
+                         compact['slots'][0][3])
+        self.assertEqual(3, len(compact['slots'][1]))
+        self.assertEqual(g.Serialize(), garden.Garden.Load(
+            compact).Serialize())
+
+    def testLoadVersion1(self):
+        base = datetime.date(2017, 1, 1).toordinal()
+        compact = dict(format='compact', version=1, name='test', width=1,
+                       height=1, names=['Carrot'], base=base,
+                       slots=[[[0], [0], [31]]])
+        self.assertEqual([[dict(name='Carrot', plant_date='2017-01-01',
+                                harvest_date='2017-02-01')]],
+                         garden.Garden.Load(compact).Serialize()['slots'])
+
+    def testUnknownVersion(self):
+        compact = _RandomGarden(0, 2, 2, 3).SerializeCompact()
+        compact['version'] = 3
+        self.assertRaises(ValueError, garden.Garden.Load, compact)
+
+    def testMalformedSlot(self):
+        g = garden.Garden('test', 1, 1)
+        g.AddPlant(0, 0, garden.Plant('Carrot', '2017-01-01', '2017-02-01'))
+        compact = g.SerializeCompact()
+        compact['slots'][0][1].append(1)
+        self.assertRaises(ValueError, garden.Garden.Load, compact)
+
+    def testLargeGardensShrink(self):
+        g = _RandomGarden(2, 16, 4, 40)
+        plain = json.dumps(g.Serialize(), separators=(',', ':'))
+        compact = json.dumps(g.SerializeCompact(), separators=(',', ':'))
+        self.assertGreater(len(plain), 5 * len(compact))
+
+
+if __name__ == '__main__':
+    unittest.main()
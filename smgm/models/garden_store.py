@@ -0,0 +1,416 @@
+"""Storage backends for users' gardens.
+
+Gardens are stored per-account and keyed by name, so that listing, loading and
+saving a single garden only has to touch that garden. The store used by the app
+is picked by the GARDEN_STORE_URI config option: either 'stormpath' (the
+default; gardens live in the account's custom data) or an SQLAlchemy database
+URI such as 'sqlite:///gardens.db' (see sql_garden_store).
+
+Stormpath custom data is fetched over the network, so each account's gardens
+can also be cached in memory for a short time (see CachedStormpathGardenStore).
+This is on by default, which is only safe while a single process serves the
+app: every save rewrites all of an account's gardens, so a process saving from
+a stale cache would undo changes made by other processes. Set GARDEN_CACHE_TTL
+to 0 to turn it off; run.py does this when it serves from several workers.
+"""
+
+import functools
+import logging
+import threading
+
+from flask import current_app
+from flask.signals import Namespace
+from garden import Garden
+from garden_codec import EncodeSlots, IsCompact
+from garden_summary import GardenHandle, GardenSummary
+from lru_cache import LruCache
+from metrics import STORMPATH_TIME
+
+
+## The default number of seconds an account's gardens are cached for; 0 means
+## they aren't cached. Changes made through other processes can be this stale,
+## and saves from a stale cache overwrite them, so this must be 0 whenever more
+## than one process serves the app.
+_DEFAULT_CACHE_TTL = 30
+
+## The default maximum number of accounts whose gardens are cached.
+_DEFAULT_CACHE_MAX_ACCOUNTS = 1000
+
+_signals = Namespace()
+
+## Sent after any of an account's gardens are saved or deleted. Receivers are
+## called with the store as the sender and the account as `account`.
+gardens_changed = _signals.signal('gardens-changed')
+
+
+def _Unproxied(account):
+    """Get the account behind a context local proxy, if it is one.
+
+    The app passes flask_stormpath's user, which is a proxy for the account of
+    the current request; it can't be used once that request has finished.
+    """
+    get_current_object = getattr(account, '_get_current_object', None)
+    if get_current_object is None:
+        return account
+    return get_current_object()
+
+
+class GardenStore(object):
+    """The interface for storing gardens.
+
+    Every method takes the account which owns the gardens; this is the Stormpath
+    account (or something which looks like one).
+    """
+
+    def _Changed(self, account):
+        """Notify listeners that some of account's gardens have changed."""
+        gardens_changed.send(self, account=account)
+
+    def List(self, account):
+        """Get the sorted list of names of the account's gardens."""
+        raise NotImplementedError()
+
+    def Load(self, account, name):
+        """Load a single garden, returning None if it doesn't exist."""
+        raise NotImplementedError()
+
+    def LoadSlots(self, account, name, slot_indices):
+        """Load only the plants in some of the slots of a garden.
+
+        The other slots of the returned garden may be empty. Stores which can't
+        do better than loading the whole garden don't need to override this.
+
+        Args:
+            account: The account which owns the garden.
+            name: str, The name of the garden.
+            slot_indices: iterable of int, The indices of the slots to load.
+                          Indices outside the garden are ignored.
+
+        Returns:
+            Garden, or None if the garden doesn't exist.
+        """
+        return self.Load(account, name)
+
+    def LoadAll(self, account):
+        """Load all of the account's gardens as a dict of name --> Garden."""
+        return {name: self.Load(account, name) for name in self.List(account)}
+
+    def Handles(self, account):
+        """Get a GardenHandle for each of the account's gardens, sorted by name.
+
+        Gardens are only loaded when the handle's garden is used.
+        """
+        return [GardenHandle(name, functools.partial(self.Load, account, name))
+                for name in self.List(account)]
+
+    def Summaries(self, account):
+        """Get the GardenSummary of each of the account's gardens, by name."""
+        return [handle.summary for handle in self.Handles(account)]
+
+    def Exists(self, account, name):
+        """Check whether the account has a garden with the given name."""
+        return name in self.List(account)
+
+    def Save(self, account, garden):
+        """Save a garden, replacing any existing garden with the same name."""
+        raise NotImplementedError()
+
+    def SaveSlots(self, account, garden, slot_indices):
+        """Save only some of the slots of a garden.
+
+        The rest of the stored garden is assumed to be unchanged. Stores which
+        can't do better than saving the whole garden don't need to override
+        this.
+
+        Args:
+            account: The account which owns the garden.
+            garden: Garden, The garden to save.
+            slot_indices: iterable of int, The indices of the changed slots.
+        """
+        self.Save(account, garden)
+
+    def SaveMany(self, account, gardens):
+        """Save several gardens at once, replacing any with the same names.
+
+        Stores which can save them together (in a single save or transaction)
+        should override this.
+
+        Args:
+            account: The account which owns the gardens.
+            gardens: list of Garden, The gardens to save.
+        """
+        for garden in gardens:
+            self.Save(account, garden)
+
+    def Delete(self, account, name):
+        """Delete a garden. Does nothing if the garden doesn't exist."""
+        raise NotImplementedError()
+
+
+class StormpathGardenStore(GardenStore):
+    """Stores gardens as JSON within the account's Stormpath custom data.
+
+    Stormpath custom data is a single document, so every save still sends all
+    of the account's gardens, so gardens are stored in the compact encoding
+    (see garden_codec) to stay well under the custom data size limit. Gardens
+    saved in the plain encoding are converted the next time they are saved
+    whole. The summary of each garden is stored alongside them (under
+    garden_summaries), so gardens can be listed without decoding them.
+    """
+
+    def _Stored(self, account):
+        """Get the account's gardens and their summaries.
+
+        The results must not be modified; changes are made by passing new
+        dicts to _SaveGardens().
+
+        Returns:
+            (dict, dict), The account's gardens as name --> garden JSON, and
+            name --> summary JSON. Gardens saved before summaries were kept
+            don't have one.
+        """
+        # The custom data is fetched from Stormpath the first time it is used.
+        with STORMPATH_TIME.Time(operation='custom_data'):
+            custom_data = account.custom_data
+            return (custom_data.get('gardens', {}),
+                    custom_data.get('garden_summaries', {}))
+
+    def _Gardens(self, account):
+        """Get the account's gardens, as a dict of name --> garden JSON."""
+        return self._Stored(account)[0]
+
+    def _SaveGarden(self, account, garden, garden_json):
+        """Replace one garden (as garden_json), and update its summary."""
+        self._SaveGardenJsons(account, [(garden, garden_json)])
+
+    def _SaveGardenJsons(self, account, gardens_and_jsons):
+        """Replace some gardens, and update their summaries, in one save.
+
+        Args:
+            account: The account which owns the gardens.
+            gardens_and_jsons: list of (Garden, dict), Each garden and the JSON
+                               to store for it.
+        """
+        gardens, summaries = self._Stored(account)
+        gardens = dict(gardens)
+        summaries = dict(summaries)
+        for garden, garden_json in gardens_and_jsons:
+            gardens[garden.name] = garden_json
+            summaries[garden.name] = (
+                GardenSummary.FromGarden(garden).Serialize())
+        self._SaveGardens(account, gardens, summaries)
+
+    def _SaveGardens(self, account, gardens, summaries):
+        """Replace all of the account's gardens and their summaries."""
+        self._WriteAccount(account, gardens, summaries)
+        self._Changed(account)
+
+    def _WriteAccount(self, account, gardens, summaries):
+        """Set the account's gardens, and save the account to Stormpath."""
+        account.custom_data['gardens'] = gardens
+        account.custom_data['garden_summaries'] = summaries
+        with STORMPATH_TIME.Time(operation='save'):
+            account.save()
+
+    def List(self, account):
+        return sorted(self._Gardens(account))
+
+    def Load(self, account, name):
+        garden_json = self._Gardens(account).get(name)
+        if garden_json is None:
+            return None
+        return Garden.Load(garden_json)
+
+    def LoadSlots(self, account, name, slot_indices):
+        garden_json = self._Gardens(account).get(name)
+        if garden_json is None:
+            return None
+        return Garden.Load(garden_json, slot_indices)
+
+    def LoadAll(self, account):
+        return {name: Garden.Load(garden_json)
+                for name, garden_json in self._Gardens(account).iteritems()}
+
+    def Handles(self, account):
+        gardens, summaries = self._Stored(account)
+        handles = []
+        for name in sorted(gardens):
+            summary = summaries.get(name)
+            if summary is not None:
+                summary = GardenSummary.Load(summary)
+            handles.append(GardenHandle(
+                name, functools.partial(Garden.Load, gardens[name]), summary,
+                gardens[name]))
+        return handles
+
+    def Exists(self, account, name):
+        return name in self._Gardens(account)
+
+    def Save(self, account, garden):
+        self._SaveGarden(account, garden, garden.SerializeCompact())
+
+    def SaveMany(self, account, gardens):
+        if gardens:
+            self._SaveGardenJsons(account, [
+                (garden, garden.SerializeCompact()) for garden in gardens])
+
+    def SaveSlots(self, account, garden, slot_indices):
+        garden_json = self._Gardens(account).get(garden.name)
+        if garden_json is None:
+            return self.Save(account, garden)
+        if IsCompact(garden_json):
+            return self._SaveGarden(account, garden, EncodeSlots(
+                garden_json, garden, slot_indices))
+
+        slots = list(garden_json['slots'])
+        for slot_idx in slot_indices:
+            slots[slot_idx] = [
+                plant.Serialize() for plant in garden.slots[slot_idx]]
+        self._SaveGarden(account, garden, dict(garden_json, slots=slots))
+
+    def Delete(self, account, name):
+        gardens, summaries = self._Stored(account)
+        if name in gardens:
+            gardens = dict(gardens)
+            del gardens[name]
+            summaries = dict(summaries)
+            summaries.pop(name, None)
+            self._SaveGardens(account, gardens, summaries)
+
+
+class CachedStormpathGardenStore(StormpathGardenStore):
+    """A StormpathGardenStore which keeps each account's gardens in memory.
+
+    The gardens read from an account's custom data are shared by every request
+    for that account until they expire or are evicted, and concurrent requests
+    which miss the cache only fetch the custom data once. Saves update the
+    cache, then save the account either straight away or, in write-behind mode,
+    after a short delay, so that several rapid edits are sent as a single save.
+
+    Changes made by other processes are only seen once the cached gardens
+    expire, and saves made from the cache overwrite them. This store should
+    only be used when a single process serves the app.
+    """
+
+    def __init__(self, ttl=None, max_accounts=None, write_behind_delay=None):
+        """Create a new store.
+
+        Args:
+            ttl: float, How long gardens are cached for, in seconds (or None).
+            max_accounts: int, The maximum number of accounts to cache the
+                          gardens of (or None).
+            write_behind_delay: float, If given, the number of seconds to wait
+                                after a change before saving the account.
+        """
+        self.write_behind_delay = write_behind_delay
+        self._cache = LruCache(max_entries=max_accounts, ttl=ttl)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # href --> (account, gardens, summaries) waiting to be saved.
+        self._pending = {}
+
+    def _Stored(self, account):
+        with self._lock:
+            pending = self._pending.get(account.href)
+        if pending is not None:
+            return pending[1:]
+
+        return self._cache.GetOrLoad(
+            account.href,
+            lambda: super(CachedStormpathGardenStore, self)._Stored(account))
+
+    def _SaveGardens(self, account, gardens, summaries):
+        # Invalidating first stops any concurrent fetch from caching what was
+        # there before.
+        self._cache.Invalidate(account.href)
+        self._cache.Put(account.href, (gardens, summaries))
+
+        if self.write_behind_delay is None:
+            try:
+                self._WriteAccount(account, gardens, summaries)
+            except Exception:
+                self._cache.Invalidate(account.href)
+                raise
+        else:
+            # The account is saved after the request has finished.
+            account = _Unproxied(account)
+            with self._lock:
+                schedule = account.href not in self._pending
+                self._pending[account.href] = (account, gardens, summaries)
+            if schedule:
+                # Not a daemon thread, so pending saves are made before exit.
+                timer = threading.Timer(self.write_behind_delay, self._Flush,
+                                        [account.href])
+                timer.start()
+
+        self._Changed(account)
+
+    def _Flush(self, href):
+        """Save the pending changes to an account, if there are any."""
+        # Saves are made one at a time, so they reach Stormpath in order.
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending.pop(href, None)
+            if pending is None:
+                return
+
+            account, gardens, summaries = pending
+            try:
+                self._WriteAccount(account, gardens, summaries)
+            except Exception:
+                logging.exception('Failed to save the gardens of %s', href)
+                self._cache.Invalidate(href)
+
+    def Flush(self):
+        """Save all pending changes now, rather than waiting for the delay."""
+        with self._lock:
+            hrefs = list(self._pending)
+        for href in hrefs:
+            self._Flush(href)
+
+
+def MakeGardenStore(uri, cache_ttl=None, cache_max_accounts=None,
+                    write_behind_delay=None):
+    """Make a garden store from a GARDEN_STORE_URI value.
+
+    Args:
+        uri: str, Either 'stormpath' or an SQLAlchemy database URI.
+        cache_ttl: float, For Stormpath, how long to cache each account's
+                   gardens for, in seconds. If not given, gardens aren't
+                   cached (unless write_behind_delay is given).
+        cache_max_accounts: int, For Stormpath, the maximum number of accounts
+                            to cache the gardens of.
+        write_behind_delay: float, For Stormpath, if given, the number of
+                            seconds to wait after a change before saving.
+
+    Returns:
+        GardenStore
+    """
+    if uri == 'stormpath':
+        if cache_ttl or write_behind_delay:
+            return CachedStormpathGardenStore(
+                cache_ttl, cache_max_accounts, write_behind_delay)
+        return StormpathGardenStore()
+
+    # SQLAlchemy is slow to import, so is only loaded when it is used.
+    from sql_garden_store import SqlGardenStore
+    return SqlGardenStore(uri)
+
+
+def GetGardenStore():
+    """Get the garden store for the current app.
+
+    The store is configured by the GARDEN_STORE_URI, GARDEN_CACHE_TTL,
+    GARDEN_CACHE_MAX_ACCOUNTS and GARDEN_WRITE_BEHIND_DELAY config options (see
+    MakeGardenStore()).
+    """
+    store = current_app.extensions.get('garden_store')
+    if store is None:
+        config = current_app.config
+        store = current_app.extensions['garden_store'] = MakeGardenStore(
+            config.get('GARDEN_STORE_URI', 'stormpath'),
+            cache_ttl=config.get('GARDEN_CACHE_TTL', _DEFAULT_CACHE_TTL),
+            cache_max_accounts=config.get('GARDEN_CACHE_MAX_ACCOUNTS',
+                                          _DEFAULT_CACHE_MAX_ACCOUNTS),
+            write_behind_delay=config.get('GARDEN_WRITE_BEHIND_DELAY'))
+    return store
@@ -0,0 +1,358 @@
+"""A set of tests for the garden stores."""
+
+import datetime
+import threading
+import unittest
+
+import flask
+import garden
+import garden_store
+import local_account
+import sql_garden_store
+
+from werkzeug.local import LocalProxy
+
+
+class GardenStoreTestMixin(object):
+    """Tests which every garden store should pass."""
+
+    def setUp(self):
+        self.store = self.MakeStore()
+        self.directory = local_account.LocalAccountDirectory()
+        self.account = self.directory.Get('accounts/1')
+
+    def _MakeGarden(self, name):
+        return garden.Garden.Load(dict(name=name, width=2, height=1, slots=[
+            [dict(name='Carrot', plant_date='2017-01-01T00:00:00+11:00',
+                  harvest_date='2017-03-01T00:00:00+11:00'),
+             dict(name='Beetroot', plant_date='2017-03-01T00:00:00+11:00',
+                  harvest_date='2017-05-01T00:00:00+11:00')],
+            [],
+        ]))
+
+    def testStoreSaveAndLoad(self):
+        g = self._MakeGarden(u'veggies')
+        self.store.Save(self.account, g)
+
+        self.assertEqual([u'veggies'], self.store.List(self.account))
+        self.assertTrue(self.store.Exists(self.account, u'veggies'))
+        self.assertEqual(g.Serialize(),
+                         self.store.Load(self.account, u'veggies').Serialize())
+
+    def testStoreLoadSlots(self):
+        g = garden.Garden(u'veggies', 3, 2)
+        for slot_idx in xrange(6):
+            g.slots[slot_idx].Insert(garden.Plant(
+                'Carrot', '2017-01-0%d' % (slot_idx + 1), '2017-03-01'))
+        self.store.Save(self.account, g)
+
+        loaded = self.store.LoadSlots(self.account, u'veggies', xrange(2, 8))
+        self.assertEqual((3, 2), loaded.size)
+        for slot_idx in xrange(2, 6):
+            self.assertEqual(
+                [plant.Serialize() for plant in g.slots[slot_idx]],
+                [plant.Serialize() for plant in loaded.slots[slot_idx]])
+        self.assertIsNone(self.store.LoadSlots(self.account, u'fruit', [0]))
+
+    def testStoreSaveReplacesGarden(self):
+        self.store.Save(self.account, self._MakeGarden(u'veggies'))
+        g = garden.Garden(u'veggies', 3, 3)
+        self.store.Save(self.account, g)
+
+        self.assertEqual(g.Serialize(),
+                         self.store.Load(self.account, u'veggies').Serialize())
+
+    def testStoreSaveSlots(self):
+        g = self._MakeGarden(u'veggies')
+        self.store.Save(self.account, g)
+
+        g.ApplyEdit(0, dict(op='move', to=1, plant=dict(
+            name='Carrot', plant_date='2017-01-01T00:00:00+11:00')))
+        self.store.SaveSlots(self.account, g, [0, 1])
+
+        self.assertEqual(g.Serialize(),
+                         self.store.Load(self.account, u'veggies').Serialize())
+
+    def testStoreSaveMany(self):
+        self.store.Save(self.account, garden.Garden(u'veggies', 3, 3))
+        gardens = [self._MakeGarden(u'veggies'), self._MakeGarden(u'herbs')]
+        self.store.SaveMany(self.account, gardens)
+
+        self.assertEqual([u'herbs', u'veggies'], self.store.List(self.account))
+        for g in gardens:
+            self.assertEqual(g.Serialize(),
+                             self.store.Load(self.account, g.name).Serialize())
+        self.assertEqual([2, 2], [summary.plantings for summary in
+                                  self.store.Summaries(self.account)])
+
+    def testStoreMissingGarden(self):
+        self.assertEqual([], self.store.List(self.account))
+        self.assertFalse(self.store.Exists(self.account, u'veggies'))
+        self.assertIsNone(self.store.Load(self.account, u'veggies'))
+        self.store.Delete(self.account, u'veggies')
+
+    def testStoreDelete(self):
+        self.store.Save(self.account, self._MakeGarden(u'veggies'))
+        self.store.Save(self.account, self._MakeGarden(u'herbs'))
+        self.store.Delete(self.account, u'veggies')
+
+        self.assertEqual([u'herbs'], self.store.List(self.account))
+        self.assertEqual([u'herbs'], self.store.LoadAll(self.account).keys())
+
+    def testStoreSummaries(self):
+        today = datetime.date.today()
+        g = garden.Garden(u'veggies', 2, 1)
+        g.AddPlant(0, 0, garden.Plant(
+            'Carrot', today - datetime.timedelta(days=10),
+            today + datetime.timedelta(days=20)))
+        g.AddPlant(1, 0, garden.Plant(
+            'Beans', today + datetime.timedelta(days=5),
+            today + datetime.timedelta(days=60)))
+        self.store.Save(self.account, g)
+        self.store.Save(self.account, garden.Garden(u'herbs', 3, 1))
+
+        summaries = self.store.Summaries(self.account)
+        self.assertEqual([u'herbs', u'veggies'],
+                         [summary.name for summary in summaries])
+        self.assertEqual([(3, 1), (2, 1)],
+                         [summary.size for summary in summaries])
+        self.assertEqual([0, 2], [summary.plantings for summary in summaries])
+        self.assertEqual([None, today + datetime.timedelta(days=5)],
+                         [summary.NextEvent() for summary in summaries])
+
+        g.slots[1].Pop(0)
+        self.store.SaveSlots(self.account, g, [1])
+        self.assertEqual(today + datetime.timedelta(days=20),
+                         self.store.Summaries(self.account)[1].NextEvent())
+
+    def testStoreHandles(self):
+        g = self._MakeGarden(u'veggies')
+        self.store.Save(self.account, g)
+        self.store.Save(self.account, self._MakeGarden(u'herbs'))
+
+        handles = self.store.Handles(self.account)
+        self.assertEqual([u'herbs', u'veggies'],
+                         [handle.name for handle in handles])
+        self.assertEqual(2, handles[1].summary.plantings)
+        self.assertEqual(g.Serialize(), handles[1].garden.Serialize())
+        self.assertEqual(handles[1].garden.Serialize(), handles[1].Serialize())
+
+    def testStoreSeparatesAccounts(self):
+        other_account = self.directory.Get('accounts/2')
+        self.store.Save(self.account, self._MakeGarden(u'veggies'))
+        self.store.Save(other_account, self._MakeGarden(u'herbs'))
+
+        self.assertEqual([u'veggies'], self.store.List(self.account))
+        self.assertEqual([u'herbs'], self.store.List(other_account))
+        self.assertIsNone(self.store.Load(other_account, u'veggies'))
+
+
+class TestStormpathGardenStore(GardenStoreTestMixin, unittest.TestCase):
+
+    def MakeStore(self):
+        return garden_store.StormpathGardenStore()
+
+    def testStormpathStoreSavesAccount(self):
+        self.store.Save(self.account, self._MakeGarden(u'veggies'))
+        self.assertEqual(1, self.directory.saves)
+        self.assertIn(u'veggies', self.account.custom_data['gardens'])
+        self.assertEqual(
+            2, self.account.custom_data['garden_summaries'][u'veggies'][
+                'plantings'])
+
+    def testStormpathStoreSaveManySavesAccountOnce(self):
+        self.store.SaveMany(self.account, [self._MakeGarden(u'veggies'),
+                                           self._MakeGarden(u'herbs')])
+        self.assertEqual(1, self.directory.saves)
+
+    def testDefaultStoreCaches(self):
+        directory = local_account.LocalAccountDirectory()
+        with flask.Flask(__name__).app_context():
+            store = garden_store.GetGardenStore()
+        store.Save(directory.Get('accounts/1'), self._MakeGarden(u'veggies'))
+
+        fetches = directory.fetches
+        for _ in xrange(3):
+            self.assertEqual([u'veggies'],
+                             store.List(directory.Get('accounts/1')))
+        self.assertEqual(fetches, directory.fetches)
+
+    def testStormpathStoresInSeveralProcesses(self):
+        # Each process has its own app and store, and each request its own
+        # account. With several processes, the cache must be off.
+        directory = local_account.LocalAccountDirectory()
+        stores = []
+        for _ in xrange(2):
+            app = flask.Flask(__name__)
+            app.config['GARDEN_CACHE_TTL'] = 0
+            with app.app_context():
+                stores.append(garden_store.GetGardenStore())
+
+        for i, store in enumerate(stores):
+            store.List(directory.Get('accounts/1'))
+            store.Save(directory.Get('accounts/1'),
+                       self._MakeGarden(u'garden %d' % i))
+        for store in stores:
+            self.assertEqual([u'garden 0', u'garden 1'],
+                             store.List(directory.Get('accounts/1')))
+
+    def testStormpathStoreHandlesDontLoadGardens(self):
+        self.store.Save(self.account, self._MakeGarden(u'veggies'))
+        garden_json = self.account.custom_data['gardens'][u'veggies']
+        handle = self.store.Handles(self.account)[0]
+        self.assertIs(garden_json, handle.Serialize(compact=True))
+        self.assertEqual(2, handle.summary.plantings)
+        self.assertIsNone(handle._garden)
+
+    def testStormpathStoreUsesCompactEncoding(self):
+        self.store.Save(self.account, self._MakeGarden(u'veggies'))
+        self.assertEqual(
+            'compact', self.account.custom_data['gardens'][u'veggies']['format'])
+
+    def testStormpathStoreSaveSlotsOfPlainGarden(self):
+        g = self._MakeGarden(u'veggies')
+        self.account.custom_data['gardens'] = {u'veggies': g.Serialize()}
+
+        g.ApplyEdit(0, dict(op='move', to=1, plant=dict(
+            name='Carrot', plant_date='2017-01-01T00:00:00+11:00')))
+        self.store.SaveSlots(self.account, g, [0, 1])
+        self.assertEqual(g.Serialize(),
+                         self.account.custom_data['gardens'][u'veggies'])
+
+    def testStormpathStoreSummarisesOldGardens(self):
+        self.store.Save(self.account, self._MakeGarden(u'veggies'))
+        del self.account.custom_data['garden_summaries']
+        self.assertEqual([2], [summary.plantings for summary in
+                               self.store.Summaries(self.account)])
+
+
+class TestCachedStormpathGardenStore(GardenStoreTestMixin, unittest.TestCase):
+
+    def MakeStore(self):
+        return garden_store.CachedStormpathGardenStore(ttl=60)
+
+    def testCachedStoreOnlyFetchesCustomDataOnce(self):
+        directory = local_account.LocalAccountDirectory()
+        self.store.Save(directory.Get('accounts/1'),
+                        self._MakeGarden(u'veggies'))
+
+        # Each request gets a new account object.
+        for _ in xrange(3):
+            account = directory.Get('accounts/1')
+            self.assertEqual([u'veggies'], self.store.List(account))
+            self.assertIsNotNone(self.store.Load(account, u'veggies'))
+        self.assertEqual(1, directory.fetches)
+        self.assertEqual(1, directory.saves)
+
+    def testCachedStoreCoalescesConcurrentMisses(self):
+        directory = local_account.LocalAccountDirectory(latency=0.05)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            self.store.List(directory.Get('accounts/1'))))
+                   for _ in xrange(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([[]] * 5, results)
+        self.assertEqual(1, directory.fetches)
+
+    def testCachedStoreExpires(self):
+        self.store = garden_store.CachedStormpathGardenStore(ttl=0.01)
+        directory = local_account.LocalAccountDirectory()
+        self.assertEqual([], self.store.List(directory.Get('accounts/1')))
+
+        # Changed by another process.
+        other_store = garden_store.StormpathGardenStore()
+        other_store.Save(directory.Get('accounts/1'),
+                         self._MakeGarden(u'veggies'))
+
+        threading.Event().wait(0.02)
+        self.assertEqual([u'veggies'],
+                         self.store.List(directory.Get('accounts/1')))
+
+    def testCachedStoreWriteBehind(self):
+        self.store = garden_store.CachedStormpathGardenStore(
+            ttl=60, write_behind_delay=60)
+        directory = local_account.LocalAccountDirectory()
+
+        g = self._MakeGarden(u'veggies')
+        self.store.Save(directory.Get('accounts/1'), g)
+        for i in xrange(3):
+            g.ApplyEdit(1, dict(op='add', plant=dict(
+                name='Carrot', plant_date='2018-0%d-01' % (i + 1),
+                harvest_date='2018-0%d-15' % (i + 1))))
+            self.store.SaveSlots(directory.Get('accounts/1'), g, [1])
+
+        # Nothing has been saved yet, but the changes can be read.
+        self.assertEqual(0, directory.saves)
+        self.assertEqual(g.Serialize(), self.store.Load(
+            directory.Get('accounts/1'), u'veggies').Serialize())
+
+        self.store.Flush()
+        self.assertEqual(1, directory.saves)
+        other_store = garden_store.StormpathGardenStore()
+        self.assertEqual(g.Serialize(), other_store.Load(
+            directory.Get('accounts/1'), u'veggies').Serialize())
+
+    def testCachedStoreWriteBehindSavesAfterDelay(self):
+        self.store = garden_store.CachedStormpathGardenStore(
+            ttl=60, write_behind_delay=0.01)
+        directory = local_account.LocalAccountDirectory()
+        self.store.Save(directory.Get('accounts/1'),
+                        self._MakeGarden(u'veggies'))
+
+        for _ in xrange(100):
+            if directory.saves:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(1, directory.saves)
+
+
+    def testCachedStoreWriteBehindThroughApp(self):
+        self.store = garden_store.CachedStormpathGardenStore(
+            ttl=60, write_behind_delay=0.01)
+        directory = local_account.LocalAccountDirectory()
+
+        # Like flask_stormpath's user, this proxy is only the account during
+        # a request.
+        app = flask.Flask(__name__)
+        user = LocalProxy(lambda: getattr(flask.g, 'user', None))
+
+        @app.route('/save')
+        def Save():
+            flask.g.user = directory.Get('accounts/1')
+            self.store.Save(user, self._MakeGarden(u'veggies'))
+            return ''
+
+        self.assertEqual(200, app.test_client().get('/save').status_code)
+        for _ in xrange(100):
+            if directory.saves:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(1, directory.saves)
+        self.assertEqual([u'veggies'], garden_store.StormpathGardenStore().List(
+            directory.Get('accounts/1')))
+
+
+class TestSqlGardenStore(GardenStoreTestMixin, unittest.TestCase):
+
+    def MakeStore(self):
+        return sql_garden_store.SqlGardenStore('sqlite://')
+
+    def testSqlStoreSummariesWithAnyDateFormat(self):
+        today = datetime.date.today()
+        harvest = today + datetime.timedelta(days=40)
+        g = garden.Garden(u'veggies', 1, 1)
+        g.AddPlant(0, 0, garden.Plant(
+            'Carrot', (today - datetime.timedelta(days=10)).isoformat(),
+            harvest.strftime('%b %d %Y')))
+        self.store.Save(self.account, g)
+
+        self.assertEqual(harvest,
+                         self.store.Summaries(self.account)[0].NextEvent())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+"""Summaries of gardens, and handles which only load a garden when needed.
+
+Pages which list gardens only need a few facts about each one, so stores keep a
+small summary of each garden up to date when it is saved, rather than decoding
+every garden to find them.
+"""
+
+import bisect
+import datetime
+
+from garden_codec import IsCompact
+
+
+## The number of upcoming event dates kept in a summary. Once they have all
+## passed, the summary has to be recomputed from the garden.
+_MAX_EVENTS = 8
+
+
+def _Today():
+    return datetime.date.today()
+
+
+class GardenSummary(object):
+    """The name, size, number of plantings and upcoming events of a garden.
+
+    The upcoming events are the dates on which something is planted or
+    harvested, on or after the day the summary was made.
+    """
+
+    def __init__(self, name, width, height, plantings, events, complete):
+        """Create a new summary.
+
+        Args:
+            name: str, The name of the garden.
+            width: int, The width of the garden.
+            height: int, The height of the garden.
+            plantings: int, The number of plantings in the garden.
+            events: list of int, The ordinals of the first few upcoming event
+                    dates, sorted.
+            complete: bool, Whether events includes every upcoming event.
+        """
+        self.name = name
+        self.width = width
+        self.height = height
+        self.plantings = plantings
+        self.events = events
+        self.complete = complete
+
+    @classmethod
+    def FromGarden(cls, garden, today=None):
+        """Summarise a garden.
+
+        Args:
+            garden: Garden, The garden.
+            today: datetime.date, The first day events are kept from (defaults
+                   to today).
+        """
+        today = (today or _Today()).toordinal()
+        plantings = 0
+        events = set()
+        for slot in garden.slots:
+            plantings += len(slot)
+            for plant in slot:
+                if plant.plant_ordinal >= today:
+                    events.add(plant.plant_ordinal)
+                if plant.harvest_ordinal >= today:
+                    events.add(plant.harvest_ordinal)
+
+        events = sorted(events)
+        return cls(garden.name, garden.width, garden.height, plantings,
+                   events[:_MAX_EVENTS], len(events) <= _MAX_EVENTS)
+
+    @property
+    def size(self):
+        """tuple of (width, height), The size of the garden."""
+        return self.width, self.height
+
+    def IsStale(self, today=None):
+        """Check whether the next event is no longer known, as of today."""
+        today = (today or _Today()).toordinal()
+        return not self.complete and (not self.events or
+                                      self.events[-1] < today)
+
+    def NextEvent(self, today=None):
+        """Get the date of the next event on or after today (or None).
+
+        Raises:
+            ValueError: if the summary is stale (see IsStale()).
+        """
+        if self.IsStale(today):
+            raise ValueError('The summary of %s is stale' % self.name)
+        today = (today or _Today()).toordinal()
+        i = bisect.bisect_left(self.events, today)
+        if i == len(self.events):
+            return None
+        return datetime.date.fromordinal(self.events[i])
+
+    def Serialize(self):
+        """Serialize this object into a JSON dictionary."""
+        return dict(
+            name=self.name, width=self.width, height=self.height,
+            plantings=self.plantings, complete=self.complete,
+            events=[datetime.date.fromordinal(event).isoformat()
+                    for event in self.events])
+
+    @classmethod
+    def Load(cls, json):
+        """Load this object from a JSON dictionary."""
+        events = [
+            datetime.datetime.strptime(event, '%Y-%m-%d').toordinal()
+            for event in json['events']]
+        return cls(json['name'], json['width'], json['height'],
+                   json['plantings'], events, json['complete'])
+
+
+class GardenHandle(object):
+    """A garden which is only loaded when it is first used."""
+
+    def __init__(self, name, load, summary=None, garden_json=None):
+        """Create a new handle.
+
+        Args:
+            name: str, The name of the garden.
+            load: callable, Loads the Garden.
+            summary: GardenSummary, The summary of the garden, if known.
+                     Otherwise it is made from the garden.
+            garden_json: dict, The serialized garden, if known.
+        """
+        self.name = name
+        self._load = load
+        self._summary = summary
+        self._garden_json = garden_json
+        self._garden = None
+
+    @property
+    def garden(self):
+        """Garden, The garden (loaded the first time this is used)."""
+        if self._garden is None:
+            self._garden = self._load()
+        return self._garden
+
+    @property
+    def summary(self):
+        """GardenSummary, The summary of the garden."""
+        if self._summary is None or self._summary.IsStale():
+            self._summary = GardenSummary.FromGarden(self.garden)
+        return self._summary
+
+    def Serialize(self, compact=False):
+        """Serialize the garden, without loading it if it is already JSON.
+
+        Args:
+            compact: bool, Whether to use the compact encoding (see
+                     garden_codec).
+        """
+        if (self._garden_json is not None and self._garden is None and
+                IsCompact(self._garden_json) == compact):
+            return self._garden_json
+        if compact:
+            return self.garden.SerializeCompact()
+        return self.garden.Serialize()
@@ -0,0 +1,76 @@
+"""A set of tests for garden summaries and handles."""
+
+import datetime
+import unittest
+
+import garden
+import garden_summary
+
+
+def _Date(date):
+    return datetime.datetime.strptime(date, '%Y-%m-%d').date()
+
+
+class TestGardenSummary(unittest.TestCase):
+
+    def setUp(self):
+        self.garden = garden.Garden('test', 2, 1)
+        for month in xrange(1, 11):
+            self.garden.slots[0].Insert(garden.Plant(
+                'Radish', datetime.date(2017, month, 1),
+                datetime.date(2017, month, 20)))
+
+    def testFromGarden(self):
+        summary = garden_summary.GardenSummary.FromGarden(
+            self.garden, _Date('2017-03-10'))
+        self.assertEqual(('test', (2, 1), 10),
+                         (summary.name, summary.size, summary.plantings))
+        self.assertEqual(garden_summary._MAX_EVENTS, len(summary.events))
+        self.assertFalse(summary.complete)
+        self.assertEqual(_Date('2017-03-20'),
+                         summary.NextEvent(_Date('2017-03-10')))
+        self.assertEqual(_Date('2017-04-01'),
+                         summary.NextEvent(_Date('2017-03-21')))
+
+    def testStaleSummary(self):
+        summary = garden_summary.GardenSummary.FromGarden(
+            self.garden, _Date('2017-03-10'))
+        self.assertFalse(summary.IsStale(_Date('2017-07-01')))
+        self.assertTrue(summary.IsStale(_Date('2017-07-02')))
+        self.assertRaises(ValueError, summary.NextEvent, _Date('2017-07-02'))
+
+        summary = garden_summary.GardenSummary.FromGarden(
+            self.garden, _Date('2017-08-01'))
+        self.assertTrue(summary.complete)
+        self.assertIsNone(summary.NextEvent(_Date('2017-11-01')))
+
+    def testSerialize(self):
+        summary = garden_summary.GardenSummary.FromGarden(
+            self.garden, _Date('2017-09-01'))
+        self.assertEqual(dict(
+            name='test', width=2, height=1, plantings=10, complete=True,
+            events=['2017-09-01', '2017-09-20', '2017-10-01', '2017-10-20']),
+            summary.Serialize())
+        self.assertEqual(
+            summary.Serialize(),
+            garden_summary.GardenSummary.Load(summary.Serialize()).Serialize())
+
+
+class TestGardenHandle(unittest.TestCase):
+
+    def testHandleLoadsOnce(self):
+        loads = []
+        def Load():
+            loads.append(1)
+            return garden.Garden('test', 1, 1)
+
+        handle = garden_summary.GardenHandle('test', Load)
+        self.assertEqual([], loads)
+        self.assertEqual(0, handle.summary.plantings)
+        self.assertEqual(dict(name='test', width=1, height=1, slots=[[]]),
+                         handle.Serialize())
+        self.assertEqual([1], loads)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,6 +22,14 @@ class TestGarden(unittest.TestCase):
         self.assertEqual(plant.plant_date, plant2.plant_date)
         self.assertEqual(plant.harvest_date, plant2.harvest_date)
 
+    def testPlantSerializeKeepsOriginalDateStrings(self):
+        json = dict(name="test", plant_date="2017-01-20T00:00:00+11:00",
+                    harvest_date="Mar 3 2017")
+        plant = garden.Plant.Load(json)
+        self.assertEqual(datetime.date(2017, 1, 20), plant.plant_date)
+        self.assertEqual(datetime.date(2017, 3, 3), plant.harvest_date)
+        self.assertEqual(json, plant.Serialize())
+
     def testGardenGetSlotWorksForVariousSizes(self):
         g = garden.Garden("test", 10, 10)
         self.assertIsNotNone(g._GetSlot(0, 0))
@@ -54,6 +62,37 @@ class TestGarden(unittest.TestCase):
         self.assertIs(plant1, g.slots[0][0])
         self.assertIs(plant3, g.slots[0][1])
 
+    def testSlotStaysSortedWhenInsertedOutOfOrder(self):
+        slot = garden.Slot([
+            garden.Plant("plant3", datetime.date(2000, 1, 20), 10),
+            garden.Plant("plant1", datetime.date(2000, 1, 1), 5),
+            garden.Plant("plant2", datetime.date(2000, 1, 10), 5),
+        ])
+        self.assertEqual(["plant1", "plant2", "plant3"],
+                         [p.name for p in slot])
+        self.assertEqual(1, slot.Find("plant2", slot[1].plant_ordinal))
+        self.assertEqual(-1, slot.Find("plant1", slot[1].plant_ordinal))
+
+    def testSlotBetween(self):
+        slot = garden.Slot([
+            garden.Plant("plant1", datetime.date(2000, 1, 1), 100),
+            garden.Plant("plant2", datetime.date(2000, 5, 1), 5),
+            garden.Plant("plant3", datetime.date(2000, 6, 1), 10),
+        ])
+
+        def Between(start, end):
+            return [p.name for p in slot.Between(start, end)]
+
+        self.assertEqual(["plant1"], Between(datetime.date(2000, 3, 1),
+                                             datetime.date(2000, 3, 2)))
+        self.assertEqual(["plant2", "plant3"],
+                         Between(datetime.date(2000, 5, 6),
+                                 datetime.date(2000, 6, 1)))
+        self.assertEqual([], Between(datetime.date(2000, 5, 7),
+                                     datetime.date(2000, 5, 31)))
+        self.assertEqual([], Between(datetime.date(1999, 1, 1),
+                                     datetime.date(1999, 12, 31)))
+
     def testGardenSerialize(self):
         plant000 = garden.Plant("plant1", datetime.date(2000, 1, 1), 2)
         plant001 = garden.Plant("plant3", datetime.date(2000, 1, 3), 10)
@@ -71,6 +110,107 @@ class TestGarden(unittest.TestCase):
         self.assertEqual(g1.slots[0][1].name, g2.slots[0][1].name)
         self.assertEqual(g1.slots[1][0].name, g2.slots[1][0].name)
 
+        for garden_json in (g1.Serialize(), g1.SerializeCompact()):
+            g3 = garden.Garden.Load(garden_json, slot_indices=[1, 2])
+            self.assertEqual(0, len(g3.slots[0]))
+            self.assertEqual("plant2", g3.slots[1][0].name)
+
+    def testGardenApplyEdit(self):
+        g = garden.Garden("test", 2, 1)
+        carrot = dict(name="Carrot", plant_date="2000-03-01",
+                      harvest_date="2000-05-01")
+        pea = dict(name="Pea", plant_date="2000-01-01",
+                   harvest_date="2000-03-01")
+
+        self.assertEqual({0}, g.ApplyEdit(0, dict(op="add", plant=carrot)))
+        self.assertEqual({0}, g.ApplyEdit(0, dict(op="add", plant=pea)))
+        self.assertEqual(["Pea", "Carrot"], [p.name for p in g.slots[0]])
+
+        self.assertEqual({0, 1}, g.ApplyEdit(
+            0, dict(op="move", plant=carrot, to=1)))
+        self.assertEqual(["Pea"], [p.name for p in g.slots[0]])
+        self.assertEqual(["Carrot"], [p.name for p in g.slots[1]])
+
+        self.assertEqual({1}, g.ApplyEdit(1, dict(op="remove", plant=carrot)))
+        self.assertEqual(0, len(g.slots[1]))
+
+    def testGardenApplyEditFailsWithBadEdits(self):
+        g = garden.Garden("test", 2, 1)
+        carrot = dict(name="Carrot", plant_date="2000-03-01",
+                      harvest_date="2000-05-01")
+        with self.assertRaises(ValueError):
+            g.ApplyEdit(2, dict(op="add", plant=carrot))
+        with self.assertRaises(ValueError):
+            g.ApplyEdit(0, dict(op="remove", plant=carrot))
+        with self.assertRaises(ValueError):
+            g.ApplyEdit(0, dict(op="add", plant=dict(name="Carrot")))
+        with self.assertRaises(ValueError):
+            g.ApplyEdit(0, dict(op="plough"))
+
+    def testGardenNotValidReasonOnlyChecksGivenSlots(self):
+        g = garden.Garden("test", 2, 1)
+        g.ApplyEdit(1, dict(op="add", plant=dict(
+            name="Carrot", plant_date="2000-03-01", harvest_date="2000-05-01")))
+        g.ApplyEdit(1, dict(op="add", plant=dict(
+            name="Pea", plant_date="2000-04-01", harvest_date="2000-06-01")))
+
+        self.assertIsNone(g.NotValidReason([0]))
+        self.assertIsNotNone(g.NotValidReason([1]))
+        self.assertIsNotNone(g.NotValidReason())
+
+    def testGardenIterEvents(self):
+        g = garden.Garden("test", 2, 1)
+        g.AddPlant(0, 0, garden.Plant("plant1", datetime.date(2000, 1, 1), 10))
+        g.AddPlant(1, 0, garden.Plant("plant2", datetime.date(2000, 1, 1), 20))
+
+        events = list(g.IterEvents(uid_prefix="owner"))
+        self.assertEqual(["Sow plant1,plant2", "Harvest plant1",
+                          "Harvest plant2"],
+                         [e['summary'] for e in events])
+        self.assertEqual(3, len(set(e['uid'] for e in events)))
+
+        # Events outside of the window are skipped, and UIDs don't change.
+        windowed = list(g.IterEvents(datetime.date(2000, 1, 2),
+                                     datetime.date(2000, 1, 11),
+                                     uid_prefix="owner"))
+        self.assertEqual(["Harvest plant1"], [e['summary'] for e in windowed])
+        self.assertEqual(events[1]['uid'], windowed[0]['uid'])
+
+    def testGardenLayoutMatchesProgressFor(self):
+        g = garden.Garden.Load(dict(name="test", width=2, height=1, slots=[
+            [dict(name="plant1", plant_date="2000-01-01",
+                  harvest_date="2000-03-01"),
+             dict(name="plant2", plant_date="2000-03-10",
+                  harvest_date="2000-09-01"),
+             dict(name="plant3", plant_date="2000-09-01",
+                  harvest_date="2001-01-01")],
+            [dict(name="plant4", plant_date="1999-12-01",
+                  harvest_date="2000-02-01")],
+        ]))
+
+        start = datetime.date(2000, 1, 15)
+        end = datetime.date(2000, 7, 13)
+        layout = g.Layout(start, end)
+        self.assertEqual(2, len(layout))
+        self.assertEqual(3, len(layout[0]))
+        self.assertEqual(1, len(layout[1]))
+
+        # Plants are measured from their plant date, and the total
+        # width of a slot is clamped to 100%.
+        self.assertEqual((0, 60 / 180.0 * 100), layout[0][0])
+        self.assertEqual(100, sum(sum(p) for p in layout[0]))
+        self.assertEqual((0, 0), layout[0][2])
+        self.assertEqual((0, 62 / 180.0 * 100), layout[1][0])
+
+        # The default window should match ProgressFor.
+        layout = g.Layout()
+        for slot_idx, slot in enumerate(g.slots):
+            for plant_idx in range(len(slot)):
+                self.assertEqual(g.ProgressFor(slot_idx, plant_idx),
+                                 layout[slot_idx][plant_idx])
+
+        # Some slots can be laid out on their own.
+        self.assertEqual([layout[1]], g.Layout(slot_indices=[1]))
         
 
 
@@ -0,0 +1,212 @@
+"""Bulk import and export of gardens, as newline-delimited JSON (NDJSON).
+
+Each line holds one garden, in either encoding (see garden_codec). Both
+directions are streamed: exports are generated a garden at a time, and imports
+read a line at a time and save the gardens in batches, with a single save per
+batch. Neither holds more than a batch of gardens in memory.
+"""
+
+import json
+
+from garden import Garden
+from garden_codec import IsCompact
+from garden_validator import ConflictMessage
+
+
+MIMETYPE = 'application/x-ndjson'
+
+## The number of gardens saved together when importing.
+_BATCH_SIZE = 50
+
+## The longest line accepted when importing, in bytes (including the newline).
+_MAX_LINE_SIZE = 8 * 1024 * 1024
+
+## The most errors an import reports individually. The rest are only counted.
+_MAX_ERRORS = 100
+
+## The largest garden accepted when importing, in slots (width * height), and
+## the most plantings it may have (see the IMPORT_MAX_GARDEN_SLOTS and
+## IMPORT_MAX_GARDEN_PLANTINGS config options). Gardens are checked against
+## these before they are built.
+_MAX_SLOTS = 10000
+_MAX_PLANTINGS = 100000
+
+
+def ExportGardens(store, account, compact=False):
+    """Generate the NDJSON lines of all of an account's gardens.
+
+    Args:
+        store: GardenStore, The store the gardens are in.
+        account: The account which owns the gardens.
+        compact: bool, Whether to use the compact encoding.
+
+    Yields:
+        str, Each garden, as a line of JSON.
+    """
+    for handle in store.Handles(account):
+        yield json.dumps(handle.Serialize(compact),
+                         separators=(',', ':')) + '\n'
+
+
+class ImportResult(object):
+    """What happened to the lines of an import."""
+
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        # list of (line number, list of message), for the first _MAX_ERRORS
+        # failures.
+        self.errors = []
+
+    def AddError(self, line_number, *messages):
+        """Record a line which failed, with every reason it failed."""
+        self.failed += 1
+        if len(self.errors) < _MAX_ERRORS:
+            self.errors.append((line_number, list(messages)))
+
+    def Serialize(self):
+        """Serialize this object into a JSON dictionary.
+
+        Like the garden API's errors, each line's error is its first message,
+        and errors lists all of them.
+        """
+        return dict(imported=self.imported, failed=self.failed, errors=[
+            dict(line=line_number, error=messages[0], errors=messages)
+            for line_number, messages in self.errors])
+
+
+def _ReadLines(stream, max_size):
+    """Read the lines of a stream, without reading any long line whole.
+
+    Yields:
+        (int, str), The number of each line (starting at 1) and the line, or
+        None if the line is longer than max_size.
+    """
+    line_number = 0
+    while True:
+        line = stream.readline(max_size + 1)
+        if not line:
+            return
+        line_number += 1
+        if len(line) <= max_size:
+            yield line_number, line
+            continue
+
+        # Skip the rest of the line.
+        while line and not line.endswith('\n'):
+            line = stream.readline(max_size)
+        yield line_number, None
+
+
+def _CheckSize(garden_json, max_slots, max_plantings):
+    """Check that a garden isn't too big to import, without building it.
+
+    Raises:
+        ValueError: if the garden is too big, or its size isn't valid.
+    """
+    for field in ('width', 'height'):
+        if field not in garden_json:
+            raise ValueError('Missing field %s' % field)
+        size = garden_json[field]
+        if (not isinstance(size, (int, long)) or isinstance(size, bool) or
+                size < 0):
+            raise ValueError('Invalid %s %r' % (field, size))
+    if garden_json['width'] * garden_json['height'] > max_slots:
+        raise ValueError('Garden is larger than %d slots' % max_slots)
+
+    slots = garden_json.get('slots')
+    if not isinstance(slots, list):
+        return
+    if IsCompact(garden_json):
+        # Each slot's first column has an entry per planting.
+        slots = [slot[0] for slot in slots if isinstance(slot, list) and slot]
+    plantings = sum(len(slot) for slot in slots if isinstance(slot, list))
+    if plantings > max_plantings:
+        raise ValueError('Garden has more than %d plantings' % max_plantings)
+
+
+def _LoadLine(line, max_slots, max_plantings):
+    """Load and validate the garden on a line.
+
+    Raises:
+        ValueError: if the line isn't a valid garden. Its arguments are the
+                    reasons why, e.g. every conflict in the garden.
+    """
+    try:
+        garden_json = json.loads(line)
+    except ValueError:
+        raise ValueError('Invalid JSON')
+    if not isinstance(garden_json, dict):
+        raise ValueError('Not a garden')
+    _CheckSize(garden_json, max_slots, max_plantings)
+
+    try:
+        garden = Garden.Load(garden_json)
+    except KeyError as e:
+        raise ValueError('Missing field %s' % e.args[0])
+    except (IndexError, TypeError) as e:
+        raise ValueError('Invalid garden (%s)' % e)
+    if not garden.name:
+        raise ValueError('Missing field name')
+
+    conflicts = garden.Conflicts()
+    if conflicts:
+        raise ValueError(*[ConflictMessage(conflict) for conflict in conflicts])
+    return garden
+
+
+def ImportGardens(store, account, stream, batch_size=_BATCH_SIZE,
+                  max_line_size=_MAX_LINE_SIZE, max_slots=None,
+                  max_plantings=None):
+    """Import gardens from an NDJSON stream.
+
+    Gardens replace any existing gardens with the same name. Blank lines are
+    skipped, and lines which aren't valid gardens are reported rather than
+    stopping the import. If saving a batch fails, the batches before it stay
+    saved.
+
+    Args:
+        store: GardenStore, The store to save the gardens in.
+        account: The account which owns the gardens.
+        stream: file-like, The NDJSON to read.
+        batch_size: int, The number of gardens to save at once.
+        max_line_size: int, The longest line accepted, in bytes.
+        max_slots: int, The largest garden accepted, in slots (default
+                   _MAX_SLOTS).
+        max_plantings: int, The most plantings a garden may have (default
+                       _MAX_PLANTINGS).
+
+    Returns:
+        ImportResult
+    """
+    if max_slots is None:
+        max_slots = _MAX_SLOTS
+    if max_plantings is None:
+        max_plantings = _MAX_PLANTINGS
+
+    result = ImportResult()
+    batch = []
+    for line_number, line in _ReadLines(stream, max_line_size):
+        if line is None:
+            result.AddError(line_number, 'Line is longer than %d bytes' % (
+                max_line_size,))
+            continue
+        if not line.strip():
+            continue
+
+        try:
+            batch.append(_LoadLine(line, max_slots, max_plantings))
+        except ValueError as e:
+            messages = [unicode(message) for message in e.args]
+            result.AddError(line_number, *(messages or [unicode(e)]))
+            continue
+
+        if len(batch) >= batch_size:
+            store.SaveMany(account, batch)
+            result.imported += len(batch)
+            batch = []
+
+    if batch:
+        store.SaveMany(account, batch)
+        result.imported += len(batch)
+    return result
@@ -0,0 +1,134 @@
+"""A set of tests for importing and exporting gardens."""
+
+import json
+import StringIO
+import unittest
+
+import garden
+import garden_store
+import garden_transfer
+import local_account
+
+
+def _GardenLine(name, slots=None):
+    return json.dumps(dict(name=name, width=2, height=1,
+                           slots=slots or [[], []])) + '\n'
+
+
+class TestGardenTransfer(unittest.TestCase):
+
+    def setUp(self):
+        self.store = garden_store.StormpathGardenStore()
+        self.directory = local_account.LocalAccountDirectory()
+        self.account = self.directory.Get('accounts/1')
+
+    def _Import(self, body, **kwargs):
+        return garden_transfer.ImportGardens(
+            self.store, self.account, StringIO.StringIO(body), **kwargs)
+
+    def testImport(self):
+        result = self._Import(_GardenLine('veggies') + '\n' +
+                              _GardenLine('herbs'))
+        self.assertEqual(dict(imported=2, failed=0, errors=[]),
+                         result.Serialize())
+        self.assertEqual([u'herbs', u'veggies'], self.store.List(self.account))
+        self.assertEqual(1, self.directory.saves)
+
+    def testImportSavesInBatches(self):
+        body = ''.join(_GardenLine('garden %d' % i) for i in xrange(5))
+        result = self._Import(body, batch_size=2)
+        self.assertEqual(5, result.imported)
+        self.assertEqual(3, self.directory.saves)
+        self.assertEqual(5, len(self.store.List(self.account)))
+
+    def testImportReportsErrorsPerLine(self):
+        overlapping = [[dict(name='Carrot', plant_date='2017-01-01',
+                             harvest_date='2017-03-01'),
+                        dict(name='Beans', plant_date='2017-02-01',
+                             harvest_date='2017-04-01')], []]
+        body = ''.join([
+            _GardenLine('veggies'),
+            '{not json\n',
+            '[1, 2]\n',
+            json.dumps(dict(name='herbs', width=2)) + '\n',
+            _GardenLine('overlapping', overlapping),
+            'x' * 100 + '\n',
+            _GardenLine('flowers'),
+        ])
+        result = self._Import(body, max_line_size=90)
+
+        self.assertEqual(2, result.imported)
+        self.assertEqual(5, result.failed)
+        self.assertEqual([2, 3, 4, 5, 6],
+                         [line for line, _ in result.errors])
+        self.assertEqual(['Invalid JSON'], result.errors[0][1])
+        self.assertEqual(['Missing field height'], result.errors[2][1])
+        self.assertEqual(['Line is longer than 90 bytes'], result.errors[4][1])
+        self.assertEqual([u'flowers', u'veggies'],
+                         self.store.List(self.account))
+
+    def testImportReportsEveryConflict(self):
+        overlapping = [[dict(name='Carrot', plant_date='2017-01-01',
+                             harvest_date='2017-03-01'),
+                        dict(name='Beans', plant_date='2017-02-01',
+                             harvest_date='2017-04-01')],
+                       [dict(name='Leek', plant_date='2017-01-01',
+                             harvest_date='2017-06-01'),
+                        dict(name='Kale', plant_date='2017-05-01',
+                             harvest_date='2017-07-01')]]
+        result = self._Import(_GardenLine('overlapping', overlapping))
+
+        error = result.Serialize()['errors'][0]
+        self.assertEqual(2, len(error['errors']))
+        self.assertEqual(error['errors'][0], error['error'])
+        self.assertIn('"Carrot"', error['errors'][0])
+        self.assertIn('"Leek"', error['errors'][1])
+
+    def testImportRejectsLargeGardens(self):
+        plants = [dict(name='Carrot', plant_date='2017-%02d-01' % month,
+                       harvest_date='2017-%02d-01' % (month + 1))
+                  for month in xrange(1, 6)]
+        body = ''.join([
+            json.dumps(dict(name='wide', width=5, height=3)) + '\n',
+            _GardenLine('busy', [plants, []]),
+            json.dumps(dict(name='bad', width='2', height=1)) + '\n',
+            _GardenLine('fine', [plants[:4], []]),
+        ])
+        result = self._Import(body, max_slots=10, max_plantings=4)
+
+        self.assertEqual(1, result.imported)
+        self.assertEqual([
+            (1, ['Garden is larger than 10 slots']),
+            (2, ['Garden has more than 4 plantings']),
+            (3, ["Invalid width u'2'"]),
+        ], result.errors)
+        self.assertEqual([u'fine'], self.store.List(self.account))
+
+    def testImportLimitsReportedErrors(self):
+        result = self._Import('{}\n' * (garden_transfer._MAX_ERRORS + 5))
+        self.assertEqual(garden_transfer._MAX_ERRORS + 5, result.failed)
+        self.assertEqual(garden_transfer._MAX_ERRORS, len(result.errors))
+
+    def testExportThenImport(self):
+        g = garden.Garden(u'veggies', 2, 1)
+        g.AddPlant(0, 0, garden.Plant('Carrot', '2017-01-01', '2017-03-01'))
+        self.store.Save(self.account, g)
+        self.store.Save(self.account, garden.Garden(u'herbs', 1, 1))
+
+        for compact in (False, True):
+            lines = list(garden_transfer.ExportGardens(
+                self.store, self.account, compact))
+            self.assertEqual(2, len(lines))
+            self.assertTrue(all(line.endswith('\n') for line in lines))
+
+            other_account = self.directory.Get('accounts/2')
+            result = garden_transfer.ImportGardens(
+                self.store, other_account, StringIO.StringIO(''.join(lines)))
+            self.assertEqual(2, result.imported)
+            self.assertEqual(
+                g.Serialize(),
+                self.store.Load(other_account, u'veggies').Serialize())
+
+
+if __name__ == '__main__':
+    unittest.main()
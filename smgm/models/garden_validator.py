@@ -0,0 +1,116 @@
+"""Validation of gardens, which finds every pair of overlapping plants.
+
+Each slot is checked with a sweep line over the plants in plant date order. The
+sweep keeps a heap of the plants which are still in the ground, keyed by their
+harvest date. Plants planted on the same day don't overlap, so they only join
+the heap once the sweep reaches a later date; then every plant in the heap
+overlaps the plant being checked, and a slot of n plants with k overlapping
+pairs is checked in O(n log n + k) time.
+"""
+
+import collections
+import heapq
+
+
+## A pair of plants within the same slot which would be in the ground at the
+## same time. first was planted on or before second.
+Conflict = collections.namedtuple('Conflict', ['slot_idx', 'first', 'second'])
+
+
+def Overlaps(p1, p2):
+    """Check whether two plants would be in the ground at the same time.
+
+    Plants may be planted on the same day that another is harvested.
+    """
+    return (p1.plant_ordinal < p2.harvest_ordinal and
+            p1.harvest_ordinal > p2.plant_ordinal and
+            p1.plant_ordinal != p2.plant_ordinal)
+
+
+def ConflictMessage(conflict):
+    """Get a human readable description of a conflict."""
+    return ('Plant "%s" (planted on %s) would overlap with "%s" '
+            '(planted on %s).') % (conflict.first.name,
+                                   conflict.first.plant_date,
+                                   conflict.second.name,
+                                   conflict.second.plant_date)
+
+
+def FindSlotConflicts(slot_idx, slot, first_only=False):
+    """Find all pairs of overlapping plants within a single slot.
+
+    Args:
+        slot_idx: int, The index of the slot (used in the returned conflicts).
+        slot: iterable of Plant, The plants in the slot, sorted by plant date.
+        first_only: bool, If True, stop after finding the first conflict.
+
+    Returns:
+        list of Conflict, in the order they were found.
+    """
+    conflicts = []
+    active = []  # Heap of (harvest_ordinal, i, plant).
+    same_day = []  # The (harvest_ordinal, i, plant) planted on this plant date.
+    for i, plant in enumerate(slot):
+        if same_day and same_day[0][2].plant_ordinal != plant.plant_ordinal:
+            for entry in same_day:
+                heapq.heappush(active, entry)
+            same_day = []
+
+        # Anything harvested on or before this plant date can't overlap with
+        # this plant, or any of the plants after it.
+        while active and active[0][0] <= plant.plant_ordinal:
+            heapq.heappop(active)
+
+        # Everything left was planted earlier and is harvested later, so
+        # overlaps this plant.
+        for _, _, other in active:
+            conflicts.append(Conflict(slot_idx, other, plant))
+            if first_only:
+                return conflicts
+
+        same_day.append((plant.harvest_ordinal, i, plant))
+
+    return conflicts
+
+
+def FindConflicts(garden, slot_indices=None, first_only=False):
+    """Find all pairs of overlapping plants within a garden.
+
+    Args:
+        garden: Garden, The garden to check.
+        slot_indices: iterable of int, If given, only check these slots.
+        first_only: bool, If True, stop after finding the first conflict.
+
+    Returns:
+        list of Conflict, ordered by slot.
+    """
+    if slot_indices is None:
+        slot_indices = xrange(len(garden.slots))
+
+    conflicts = []
+    for slot_idx in slot_indices:
+        conflicts.extend(FindSlotConflicts(
+            slot_idx, garden.slots[slot_idx], first_only))
+        if first_only and conflicts:
+            break
+
+    return conflicts
+
+
+def ValidateGardens(gardens, first_only=False):
+    """Find the conflicts within many gardens at once.
+
+    Args:
+        gardens: iterable of Garden, The gardens to check.
+        first_only: bool, If True, only find the first conflict per garden.
+
+    Returns:
+        dict of str --> list of Conflict, The conflicts in each invalid garden,
+        keyed by garden name. Valid gardens are not included.
+    """
+    invalid = {}
+    for garden in gardens:
+        conflicts = FindConflicts(garden, first_only=first_only)
+        if conflicts:
+            invalid[garden.name] = conflicts
+    return invalid
@@ -0,0 +1,76 @@
+"""A set of tests for the garden validator."""
+
+import datetime
+import unittest
+
+import garden
+import garden_validator
+
+
+def _Plant(name, month, day, growth_time):
+    return garden.Plant(name, datetime.date(2000, month, day), growth_time)
+
+
+def _Names(conflicts):
+    return [(c.slot_idx, c.first.name, c.second.name) for c in conflicts]
+
+
+class TestGardenValidator(unittest.TestCase):
+
+    def testFindConflictsFindsNonAdjacentOverlaps(self):
+        g = garden.Garden("test", 1, 1)
+        g.slots[0].Insert(_Plant("long", 1, 1, 100))
+        g.slots[0].Insert(_Plant("short1", 2, 1, 10))
+        g.slots[0].Insert(_Plant("short2", 3, 1, 10))
+        g.slots[0].Insert(_Plant("after", 4, 10, 10))
+
+        self.assertEqual([(0, "long", "short1"), (0, "long", "short2")],
+                         _Names(garden_validator.FindConflicts(g)))
+        self.assertEqual([(0, "long", "short1")], _Names(
+            garden_validator.FindConflicts(g, first_only=True)))
+
+    def testFindConflictsAllowsTouchingPlants(self):
+        g = garden.Garden("test", 2, 1)
+        g.AddPlant(0, 0, _Plant("plant1", 1, 1, 10))
+        g.AddPlant(0, 0, _Plant("plant2", 1, 11, 10))
+        g.slots[1].Insert(_Plant("plant3", 1, 1, 10))
+        g.slots[1].Insert(_Plant("plant4", 1, 1, 20))
+
+        self.assertEqual([], garden_validator.FindConflicts(g))
+        self.assertIsNone(g.NotValidReason())
+
+    def testFindConflictsWithManyPlantsOnOneDay(self):
+        g = garden.Garden("test", 1, 1)
+        for i in xrange(5):
+            g.slots[0].Insert(_Plant("same%d" % i, 1, 1, 10 + i))
+        g.slots[0].Insert(_Plant("later", 1, 12, 10))
+
+        self.assertEqual(
+            [(0, "same%d" % i, "later") for i in (2, 3, 4)],
+            sorted(_Names(garden_validator.FindConflicts(g))))
+        for conflict in garden_validator.FindConflicts(g):
+            self.assertTrue(garden_validator.Overlaps(conflict.first,
+                                                      conflict.second))
+
+    def testFindConflictsOnlyChecksGivenSlots(self):
+        g = garden.Garden("test", 2, 1)
+        g.slots[1].Insert(_Plant("plant1", 1, 1, 10))
+        g.slots[1].Insert(_Plant("plant2", 1, 5, 10))
+
+        self.assertEqual([], garden_validator.FindConflicts(g, [0]))
+        self.assertEqual([(1, "plant1", "plant2")],
+                         _Names(garden_validator.FindConflicts(g, [0, 1])))
+
+    def testValidateGardens(self):
+        valid = garden.Garden("valid", 1, 1)
+        invalid = garden.Garden("invalid", 1, 1)
+        invalid.slots[0].Insert(_Plant("plant1", 1, 1, 10))
+        invalid.slots[0].Insert(_Plant("plant2", 1, 5, 10))
+
+        results = garden_validator.ValidateGardens([valid, invalid])
+        self.assertEqual(["invalid"], results.keys())
+        self.assertEqual([(0, "plant1", "plant2")], _Names(results["invalid"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
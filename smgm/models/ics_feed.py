@@ -0,0 +1,144 @@
+"""The calendar (ICS) feed of all of an account's gardens.
+
+Feeds are generated one event at a time, so they can be streamed to the client
+as they are rendered, and can be limited to a window of dates.
+
+Calendar clients poll the feed often, so rendered feeds are also cached per
+account and served with an ETag and Last-Modified time. An account's feeds are
+dropped from the cache whenever any of its gardens change.
+"""
+
+import collections
+import datetime
+import hashlib
+
+from garden_store import gardens_changed
+from lru_cache import LruCache
+
+
+## The maximum total size of all cached feeds, in bytes.
+_CACHE_MAX_SIZE = 32 * 1024 * 1024
+
+## The maximum size of a single cached feed, in bytes. Larger feeds are still
+## streamed, but aren't kept.
+_CACHE_MAX_FEED_SIZE = 4 * 1024 * 1024
+
+## How long a feed stays cached, in seconds. Feeds are invalidated when gardens
+## are changed through this process, but not when they are changed through
+## another one; this bounds how stale those feeds can get.
+_CACHE_TTL = 10 * 60
+
+_CALENDAR_START = ('BEGIN:VCALENDAR\r\n'
+                   'VERSION:2.0\r\n'
+                   'PRODID:-//Square Metre Garden Manager//EN\r\n')
+_CALENDAR_END = 'END:VCALENDAR\r\n'
+
+## A rendered feed, along with the values of its caching headers.
+Feed = collections.namedtuple('Feed', ['body', 'etag', 'last_modified'])
+
+## Rendered feeds, keyed by account ID. Each value is a dict of
+## (start, end) --> Feed, as an account's feed can be requested with different
+## windows.
+_cache = LruCache(max_size=_CACHE_MAX_SIZE, ttl=_CACHE_TTL)
+
+
+def AccountId(account):
+    """Get the ID of an account (the last part of its href)."""
+    return account.href.rstrip('/').rsplit('/', 1)[-1]
+
+
+def ParseWindowDate(value, today):
+    """Parse the value of a from/to query parameter.
+
+    Args:
+        value: str, Either a date (YYYY-MM-DD) or a whole number of days
+               relative to today, e.g. "-30" or "90". Relative dates let a
+               calendar subscription always cover the same window.
+        today: datetime.date, The date that relative dates are relative to.
+
+    Returns:
+        datetime.date
+
+    Raises:
+        ValueError: if the value couldn't be parsed.
+    """
+    try:
+        return today + datetime.timedelta(days=int(value))
+    except ValueError:
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def GenerateFeed(gardens, start=None, end=None, uid_prefix=''):
+    """Generate the feed for some gardens, in chunks.
+
+    Args:
+        gardens: iterable of Garden, The gardens to include. This is only
+                 iterated once, so may load gardens lazily.
+        start: datetime.date, If given, skip events before this date.
+        end: datetime.date, If given, skip events after this date.
+        uid_prefix: str, Included in the event UIDs; see Garden.IterEvents().
+
+    Yields:
+        str, Chunks of the feed.
+    """
+    yield _CALENDAR_START
+    for garden in gardens:
+        for event in garden.IterEvents(start, end, uid_prefix):
+            yield event.to_ical()
+    yield _CALENDAR_END
+
+
+def GetCachedFeed(account_id, start=None, end=None):
+    """Get a cached feed for an account (or None)."""
+    feeds = _cache.Get(account_id)
+    if feeds is None:
+        return None
+    return feeds.get((start, end))
+
+
+def CacheToken():
+    """Get a token to pass to StreamFeed(); see LruCache.Token()."""
+    return _cache.Token()
+
+
+def StreamFeed(account_id, gardens, start=None, end=None, token=None):
+    """Generate the feed for an account, caching it once it is complete.
+
+    Args:
+        account_id: str, The ID of the account.
+        gardens: iterable of Garden, The account's gardens.
+        start: datetime.date, If given, skip events before this date.
+        end: datetime.date, If given, skip events after this date.
+        token: The result of CacheToken() from before loading the gardens.
+
+    Yields:
+        str, Chunks of the feed.
+    """
+    chunks = []
+    size = 0
+    for chunk in GenerateFeed(gardens, start, end, uid_prefix=account_id):
+        if chunks is not None:
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > _CACHE_MAX_FEED_SIZE:
+                chunks = None
+        yield chunk
+
+    if chunks is not None:
+        body = ''.join(chunks)
+        feed = Feed(body=body,
+                    etag=hashlib.sha1(body).hexdigest(),
+                    last_modified=datetime.datetime.utcnow().replace(
+                        microsecond=0))
+
+        feeds = dict(_cache.Get(account_id) or {})
+        feeds[(start, end)] = feed
+        _cache.Put(account_id, feeds,
+                   size=sum(len(f.body) for f in feeds.itervalues()),
+                   token=token)
+
+
+def _InvalidateFeeds(sender, account=None, **kwargs):
+    _cache.Invalidate(AccountId(account))
+
+gardens_changed.connect(_InvalidateFeeds)
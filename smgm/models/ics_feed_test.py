@@ -0,0 +1,64 @@
+"""A set of tests for the calendar feed."""
+
+import datetime
+import unittest
+
+import garden
+import garden_store
+import ics_feed
+import local_account
+
+
+class TestIcsFeed(unittest.TestCase):
+
+    def setUp(self):
+        ics_feed._cache.Clear()
+        self.garden = garden.Garden("test", 1, 1)
+        self.garden.AddPlant(0, 0, garden.Plant(
+            "plant1", datetime.date(2000, 1, 1), 10))
+
+    def testParseWindowDate(self):
+        today = datetime.date(2000, 1, 10)
+        self.assertEqual(datetime.date(2000, 4, 9),
+                         ics_feed.ParseWindowDate("90", today))
+        self.assertEqual(datetime.date(2000, 1, 1),
+                         ics_feed.ParseWindowDate("-9", today))
+        self.assertEqual(datetime.date(2001, 2, 3),
+                         ics_feed.ParseWindowDate("2001-02-03", today))
+        with self.assertRaises(ValueError):
+            ics_feed.ParseWindowDate("tomorrow", today)
+
+    def testStreamFeedCachesCompleteFeeds(self):
+        body = ''.join(ics_feed.StreamFeed("1", [self.garden]))
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(2, body.count('BEGIN:VEVENT'))
+        self.assertEqual(body, ics_feed.GetCachedFeed("1").body)
+
+        # Windows are cached separately.
+        start = datetime.date(2000, 1, 5)
+        self.assertIsNone(ics_feed.GetCachedFeed("1", start))
+        body = ''.join(ics_feed.StreamFeed("1", [self.garden], start))
+        self.assertEqual(1, body.count('BEGIN:VEVENT'))
+        self.assertEqual(body, ics_feed.GetCachedFeed("1", start).body)
+
+    def testFeedIsInvalidatedWhenGardensChange(self):
+        account = local_account.LocalAccountDirectory().Get(
+            'https://api.stormpath.com/v1/accounts/1')
+        ''.join(ics_feed.StreamFeed("1", [self.garden]))
+
+        garden_store.StormpathGardenStore().Save(account, self.garden)
+        self.assertIsNone(ics_feed.GetCachedFeed("1"))
+
+    def testStreamFeedDoesNotCacheStaleFeeds(self):
+        account = local_account.LocalAccountDirectory().Get(
+            'https://api.stormpath.com/v1/accounts/1')
+        token = ics_feed.CacheToken()
+        garden_store.StormpathGardenStore().Save(account, self.garden)
+
+        ''.join(ics_feed.StreamFeed("1", [self.garden], token=token))
+        self.assertIsNone(ics_feed.GetCachedFeed("1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
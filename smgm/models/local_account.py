@@ -0,0 +1,82 @@
+"""A local, in-memory stand-in for Stormpath accounts.
+
+LocalAccountDirectory keeps the saved state of every account, the way Stormpath
+does, and hands out a new LocalAccount object each time an account is looked up
+(as the Stormpath SDK does for each request). Like a Stormpath account, the
+custom data of a LocalAccount is only fetched the first time it is used, and
+changes to it are only kept once the account is saved. This lets the garden
+stores, and the app, be run and tested without contacting Stormpath.
+"""
+
+import copy
+import threading
+import time
+
+
+class LocalAccountDirectory(object):
+    """The saved state of a set of accounts."""
+
+    def __init__(self, latency=0):
+        """Create a new, empty directory.
+
+        Args:
+            latency: float, The number of seconds every fetch and save takes,
+                     to simulate the round trip to Stormpath.
+        """
+        self.latency = latency
+        self.fetches = 0
+        self.saves = 0
+        self._lock = threading.Lock()
+        self._custom_data = {}  # href --> dict
+
+    def Get(self, href):
+        """Look up an account; accounts are created when they are first used.
+
+        Returns:
+            LocalAccount, A new object each time, like the Stormpath SDK.
+        """
+        return LocalAccount(self, href)
+
+    def _Fetch(self, href):
+        time.sleep(self.latency)
+        with self._lock:
+            self.fetches += 1
+            return copy.deepcopy(self._custom_data.get(href, {}))
+
+    def _Store(self, href, custom_data):
+        time.sleep(self.latency)
+        with self._lock:
+            self.saves += 1
+            self._custom_data[href] = copy.deepcopy(custom_data)
+
+
+class LocalAccount(object):
+    """An account in a LocalAccountDirectory.
+
+    This has the parts of a Stormpath account used by the app, including what
+    Flask-Login needs to treat it as the logged in user.
+    """
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, directory, href):
+        self.directory = directory
+        self.href = href
+        self._custom_data = None
+
+    def get_id(self):
+        return self.href
+
+    @property
+    def custom_data(self):
+        """dict, The account's custom data, fetched when first used."""
+        if self._custom_data is None:
+            self._custom_data = self.directory._Fetch(self.href)
+        return self._custom_data
+
+    def save(self):
+        """Store any changes to the custom data in the directory."""
+        if self._custom_data is not None:
+            self.directory._Store(self.href, self._custom_data)
@@ -0,0 +1,186 @@
+"""A thread-safe, size-bounded LRU cache with optional expiry."""
+
+import collections
+import threading
+import time
+
+
+## Returned by _GetLocked() for keys which aren't cached.
+_MISSING = object()
+
+
+class _Load(object):
+    """A value being loaded by GetOrLoad(), which other threads can wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class LruCache(object):
+    """A mapping which evicts the least recently used entries when full.
+
+    The cache can be bounded by the number of entries, by the total size of the
+    entries (as given to Put()), or both. Entries can also expire after a fixed
+    amount of time.
+    """
+
+    def __init__(self, max_entries=None, max_size=None, ttl=None,
+                 clock=time.time):
+        """Create a new cache.
+
+        Args:
+            max_entries: int, The maximum number of entries (or None).
+            max_size: int, The maximum total size of all entries (or None).
+            ttl: float, The number of seconds entries live for (or None).
+            clock: callable, Returns the current time in seconds.
+        """
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # key --> (value, size, expiry)
+        self._size = 0
+        self._generation = 0
+        self._loads = {}  # key --> _Load
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        """int, The total size of all entries in the cache."""
+        return self._size
+
+    def _GetLocked(self, key):
+        """Get the value for key, or _MISSING. The lock must be held."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return _MISSING
+
+        value, size, expiry = entry
+        if expiry is not None and expiry <= self._clock():
+            self._size -= size
+            return _MISSING
+
+        # Re-insert the entry to mark it as the most recently used.
+        self._entries[key] = entry
+        return value
+
+    def Get(self, key, default=None):
+        """Get the value for key, or default if it isn't cached."""
+        with self._lock:
+            value = self._GetLocked(key)
+        if value is _MISSING:
+            return default
+        return value
+
+    def GetOrLoad(self, key, load, size=1):
+        """Get the value for key, loading (and storing) it if it isn't cached.
+
+        If several threads miss on the same key at once, only one of them
+        calls load; the rest wait for it and get the same value (or error).
+
+        Args:
+            key: The key to look up.
+            load: callable, Called with no arguments to get the value.
+            size: int, The size of the value, counted against max_size.
+
+        Returns:
+            The cached or loaded value.
+        """
+        with self._lock:
+            value = self._GetLocked(key)
+            if value is not _MISSING:
+                return value
+
+            pending = self._loads.get(key)
+            loading = pending is None
+            if loading:
+                pending = self._loads[key] = _Load()
+            token = self._generation
+
+        if not loading:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            pending.value = load()
+        except Exception as e:
+            pending.error = e
+            raise
+        else:
+            self.Put(key, pending.value, size, token)
+        finally:
+            with self._lock:
+                del self._loads[key]
+            pending.done.set()
+
+        return pending.value
+
+    def Token(self):
+        """Get a token to pass to Put() for values computed after this call.
+
+        If the cache is invalidated between getting the token and calling Put(),
+        then the (possibly stale) value won't be stored.
+        """
+        return self._generation
+
+    def Put(self, key, value, size=1, token=None):
+        """Store a value in the cache.
+
+        Args:
+            key: The key to store the value under.
+            value: The value to store.
+            size: int, The size of the value, counted against max_size.
+            token: If given, the result of Token() from before the value was
+                   computed.
+
+        Returns:
+            bool, True if the value was stored.
+        """
+        if self.max_size is not None and size > self.max_size:
+            return False
+
+        expiry = None
+        if self.ttl is not None:
+            expiry = self._clock() + self.ttl
+
+        with self._lock:
+            if token is not None and token != self._generation:
+                return False
+
+            old_entry = self._entries.pop(key, None)
+            if old_entry is not None:
+                self._size -= old_entry[1]
+
+            self._entries[key] = (value, size, expiry)
+            self._size += size
+
+            # Evict the least recently used entries until we fit.
+            while ((self.max_entries is not None and
+                    len(self._entries) > self.max_entries) or
+                   (self.max_size is not None and self._size > self.max_size)):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+        return True
+
+    def Invalidate(self, key):
+        """Remove a key from the cache, if it is there."""
+        with self._lock:
+            self._generation += 1
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry[1]
+
+    def Clear(self):
+        """Remove everything from the cache."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._size = 0
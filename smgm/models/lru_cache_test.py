@@ -0,0 +1,116 @@
+"""A set of tests for the LRU cache."""
+
+import threading
+import unittest
+
+import lru_cache
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLruCache(unittest.TestCase):
+
+    def testCacheEvictsLeastRecentlyUsedEntry(self):
+        cache = lru_cache.LruCache(max_entries=2)
+        cache.Put('a', 1)
+        cache.Put('b', 2)
+        self.assertEqual(1, cache.Get('a'))
+
+        cache.Put('c', 3)
+        self.assertEqual(1, cache.Get('a'))
+        self.assertIsNone(cache.Get('b'))
+        self.assertEqual(3, cache.Get('c'))
+
+    def testCacheEvictsBySize(self):
+        cache = lru_cache.LruCache(max_size=10)
+        cache.Put('a', 'a', size=4)
+        cache.Put('b', 'b', size=4)
+        cache.Put('c', 'c', size=4)
+        self.assertIsNone(cache.Get('a'))
+        self.assertEqual(8, cache.size)
+
+        # Values which could never fit aren't stored at all.
+        self.assertFalse(cache.Put('d', 'd', size=11))
+        self.assertEqual('b', cache.Get('b'))
+
+    def testCacheEntriesExpire(self):
+        clock = FakeClock()
+        cache = lru_cache.LruCache(ttl=10, clock=clock)
+        cache.Put('a', 1)
+        clock.now = 9
+        self.assertEqual(1, cache.Get('a'))
+        clock.now = 10
+        self.assertIsNone(cache.Get('a'))
+        self.assertEqual(0, len(cache))
+
+    def testCacheInvalidate(self):
+        cache = lru_cache.LruCache()
+        cache.Put('a', 1, size=5)
+        cache.Invalidate('a')
+        self.assertIsNone(cache.Get('a'))
+        self.assertEqual(0, cache.size)
+
+    def testCachePutIgnoresValuesComputedBeforeInvalidation(self):
+        cache = lru_cache.LruCache()
+        token = cache.Token()
+        cache.Invalidate('a')
+        self.assertFalse(cache.Put('a', 1, token=token))
+        self.assertIsNone(cache.Get('a'))
+
+        self.assertTrue(cache.Put('a', 2, token=cache.Token()))
+        self.assertEqual(2, cache.Get('a'))
+
+    def testGetOrLoad(self):
+        cache = lru_cache.LruCache()
+        loads = []
+        load = lambda: loads.append(1) or len(loads)
+        self.assertEqual(1, cache.GetOrLoad('a', load))
+        self.assertEqual(1, cache.GetOrLoad('a', load))
+        self.assertEqual(1, len(loads))
+
+    def testGetOrLoadCoalescesConcurrentMisses(self):
+        cache = lru_cache.LruCache()
+        started = threading.Event()
+        release = threading.Event()
+        loads = []
+
+        def Load():
+            loads.append(1)
+            started.set()
+            release.wait()
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(cache.GetOrLoad('a', Load)))
+                   for _ in xrange(5)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, len(loads))
+        self.assertEqual(['value'] * 5, results)
+
+    def testGetOrLoadDoesNotCacheErrors(self):
+        cache = lru_cache.LruCache()
+
+        def Fail():
+            raise IOError('oops')
+
+        self.assertRaises(IOError, cache.GetOrLoad, 'a', Fail)
+        self.assertEqual(2, cache.GetOrLoad('a', lambda: 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,377 @@
+"""Lightweight, always-on instrumentation, exported in Prometheus text format.
+
+Timings are recorded in histograms with a fixed set of buckets, so recording a
+value only takes a lock and a few additions. Everything recorded in this
+process can be rendered with RenderMetrics() (see metrics_api, which serves it
+at /metrics).
+
+When the app is served by several processes, each can run a MetricsWriter,
+which periodically writes what the process has recorded to a file in a shared
+directory. RenderMetrics() adds up the files in that directory, so every
+process reports the metrics of all of them (those of other processes being up
+to a write interval old).
+
+There is also an opt-in SamplingProfiler, which periodically records the stack
+of every thread and writes the counts to a file.
+"""
+
+import bisect
+import collections
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+
+## The default upper bounds of histogram buckets, in seconds.
+_DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                    1.0, 2.5, 5.0, 10.0)
+
+## The default time between samples taken by the SamplingProfiler, in seconds.
+_DEFAULT_SAMPLE_INTERVAL = 0.01
+
+## How often the SamplingProfiler rewrites its output file, in seconds.
+_PROFILE_WRITE_INTERVAL = 10.0
+
+## How often a MetricsWriter writes this process's metrics, in seconds.
+_METRICS_WRITE_INTERVAL = 5.0
+
+## Every metric created in this process, in the order it was created.
+_registry = []
+
+
+def _EscapeLabelValue(value):
+    return (unicode(value).replace('\\', r'\\').replace('\n', r'\n')
+            .replace('"', r'\"'))
+
+
+def _FormatLabels(names, values, extra=()):
+    labels = ['%s="%s"' % (name, _EscapeLabelValue(value))
+              for name, value in zip(names, values)]
+    labels.extend('%s="%s"' % label for label in extra)
+    if not labels:
+        return ''
+    return '{%s}' % ','.join(labels)
+
+
+def _FormatBound(bound):
+    return repr(float(bound))
+
+
+class Histogram(object):
+    """Counts observed values (usually durations) in a set of buckets.
+
+    A separate set of buckets is kept for each combination of label values.
+    """
+
+    def __init__(self, name, help, label_names=(), buckets=_DEFAULT_BUCKETS):
+        """Create a new histogram, and register it for RenderMetrics().
+
+        Args:
+            name: str, The name of the metric.
+            help: str, A description of the metric.
+            label_names: tuple of str, The names of the labels which must be
+                         given with each observation.
+            buckets: tuple of float, The upper bound of each bucket, sorted.
+        """
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {}  # label values --> [bucket counts, sum, count]
+        _registry.append(self)
+
+    def _LabelValues(self, labels):
+        if len(labels) != len(self.label_names):
+            raise ValueError('Expected labels %s, got %s' % (
+                ', '.join(self.label_names), ', '.join(sorted(labels))))
+        return tuple(labels[name] for name in self.label_names)
+
+    def Observe(self, value, **labels):
+        """Record a single value.
+
+        Args:
+            value: float, The value to record.
+            **labels: The value of each label.
+        """
+        key = self._LabelValues(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if i < len(self.buckets):
+                entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextlib.contextmanager
+    def Time(self, **labels):
+        """Record the time taken (in seconds) to run a with statement."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.Observe(time.time() - start, **labels)
+
+    def Get(self, **labels):
+        """Get the (sum, count) of everything recorded with some labels."""
+        with self._lock:
+            entry = self._values.get(self._LabelValues(labels))
+            if entry is None:
+                return 0.0, 0
+            return entry[1], entry[2]
+
+    def Snapshot(self):
+        """Get everything recorded in this process, as JSON.
+
+        Returns:
+            list of [label values, bucket counts, sum, count].
+        """
+        with self._lock:
+            return [[list(key), list(entry[0]), entry[1], entry[2]]
+                    for key, entry in self._values.iteritems()]
+
+    def Render(self, snapshots=()):
+        """Get the lines of this metric in Prometheus text format.
+
+        Args:
+            snapshots: iterable of list, Snapshot()s of this metric taken in
+                       other processes, which are added to this one's values.
+        """
+        merged = {}
+        for snapshot in [self.Snapshot()] + list(snapshots):
+            for key, bucket_counts, total, count in snapshot:
+                entry = merged.setdefault(
+                    tuple(key), [[0] * len(self.buckets), 0.0, 0])
+                entry[0] = [a + b for a, b in zip(entry[0], bucket_counts)]
+                entry[1] += total
+                entry[2] += count
+        values = sorted(merged.iteritems())
+
+        lines = ['# HELP %s %s' % (self.name, self.help),
+                 '# TYPE %s histogram' % self.name]
+        for key, (bucket_counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append('%s_bucket%s %d' % (
+                    self.name,
+                    _FormatLabels(self.label_names, key,
+                                  [('le', _FormatBound(bound))]),
+                    cumulative))
+            lines.append('%s_bucket%s %d' % (
+                self.name,
+                _FormatLabels(self.label_names, key, [('le', '+Inf')]), count))
+            labels = _FormatLabels(self.label_names, key)
+            lines.append('%s_sum%s %r' % (self.name, labels, total))
+            lines.append('%s_count%s %d' % (self.name, labels, count))
+        return lines
+
+
+def _SnapshotPath(directory, pid):
+    return os.path.join(directory, '%d.json' % pid)
+
+
+def _ReadSnapshots(directory):
+    """Read the metrics written by every other process to a directory.
+
+    Returns:
+        dict, metric name --> list of the Snapshot() of each process.
+    """
+    own_path = _SnapshotPath(directory, os.getpid())
+    snapshots = collections.defaultdict(list)
+    for file_name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, file_name)
+        if not file_name.endswith('.json') or path == own_path:
+            continue
+        try:
+            with open(path) as snapshot_file:
+                process_snapshots = json.load(snapshot_file)
+        except (IOError, ValueError):
+            continue  # It was removed, or isn't ours.
+        for name, snapshot in process_snapshots.iteritems():
+            snapshots[name].append(snapshot)
+    return snapshots
+
+
+def RenderMetrics(directory=None):
+    """Get every metric, in Prometheus text format.
+
+    Args:
+        directory: str, If given, also add up the metrics which other processes
+                   have written to this directory (see MetricsWriter).
+    """
+    snapshots = _ReadSnapshots(directory) if directory else {}
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.Render(snapshots.get(metric.name, ())))
+    return u'\n'.join(lines) + u'\n'
+
+
+class MetricsWriter(object):
+    """Periodically writes this process's metrics to a shared directory.
+
+    Each process writes its own file, named after its pid, and rewrites it
+    every interval and when it stops. Files of processes which have exited are
+    kept, so the totals rendered by RenderMetrics() never go backwards; clear
+    the directory when the server starts (see ClearMetrics()).
+    """
+
+    def __init__(self, directory, interval=_METRICS_WRITE_INTERVAL):
+        """Create a new writer; it doesn't write anything until Start().
+
+        Args:
+            directory: str, The shared directory.
+            interval: float, The time between writes, in seconds.
+        """
+        self.directory = directory
+        self.interval = interval
+        self._path = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def Write(self):
+        """Write everything recorded in this process so far."""
+        tmp_path = self._path + '.tmp'
+        with open(tmp_path, 'w') as metrics_file:
+            json.dump({metric.name: metric.Snapshot() for metric in _registry},
+                      metrics_file)
+        os.rename(tmp_path, self._path)
+
+    def _Run(self):
+        while not self._stop.wait(self.interval):
+            self.Write()
+        self.Write()
+
+    def Start(self):
+        """Start writing in a background thread."""
+        pid = os.getpid()
+        self._path = _SnapshotPath(self.directory, pid)
+        if os.path.exists(self._path):
+            # An exited process had the same pid; keep its metrics.
+            os.rename(self._path, os.path.join(
+                self.directory, '%d.%d.json' % (pid, time.time() * 1000)))
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._Run, name='MetricsWriter')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def Stop(self):
+        """Stop writing, and write the final metrics."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def ClearMetrics(directory):
+    """Remove the metrics written to a shared directory by earlier processes."""
+    for file_name in os.listdir(directory):
+        if file_name.endswith('.json'):
+            os.remove(os.path.join(directory, file_name))
+
+
+## The time taken to handle each request, by endpoint.
+REQUEST_TIME = Histogram(
+    'smgm_request_duration_seconds', 'Time taken to handle a request.',
+    ('endpoint', 'method', 'status'))
+
+## The time taken to render each template.
+TEMPLATE_TIME = Histogram(
+    'smgm_template_render_duration_seconds', 'Time taken to render a template.',
+    ('template',))
+
+## The time taken to load and serialize gardens.
+GARDEN_TIME = Histogram(
+    'smgm_garden_duration_seconds',
+    'Time taken to load (Garden.Load) or serialize (Garden.Serialize) a '
+    'garden.',
+    ('operation',))
+
+## The time taken by calls to Stormpath: reading an account's custom data, and
+## saving the account.
+STORMPATH_TIME = Histogram(
+    'smgm_stormpath_duration_seconds',
+    'Time taken to read custom data from, or save, a Stormpath account.',
+    ('operation',))
+
+
+class SamplingProfiler(object):
+    """Periodically samples the stacks of all threads.
+
+    The output file is in the "folded stacks" format, with one line per distinct
+    stack (outermost frame first) followed by the number of times it was seen,
+    e.g.:
+
+        run.py:main:51;app.py:wsgi_app:1982;garden.py:Load:428 17
+
+    This can be turned into a flame graph with flamegraph.pl, or just sorted.
+    The file is rewritten periodically while the profiler runs, and when it
+    stops.
+    """
+
+    def __init__(self, path, interval=_DEFAULT_SAMPLE_INTERVAL):
+        """Create a new profiler; it doesn't start sampling until Start().
+
+        Args:
+            path: str, The file to write the samples to.
+            interval: float, The time between samples, in seconds.
+        """
+        self.path = path
+        self.interval = interval
+        self.samples = 0
+        self._counts = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _Sample(self):
+        """Record the current stack of every thread but this one."""
+        this_thread = threading.current_thread().ident
+        for thread_id, frame in sys._current_frames().iteritems():
+            if thread_id == this_thread:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('%s:%s:%d' % (os.path.basename(code.co_filename),
+                                           code.co_name, frame.f_lineno))
+                frame = frame.f_back
+            self._counts[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def Write(self):
+        """Write the samples taken so far to the output file."""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as profile_file:
+            for stack, count in self._counts.most_common():
+                profile_file.write('%s %d\n' % (stack, count))
+        os.rename(tmp_path, self.path)
+
+    def _Run(self):
+        next_write = time.time() + _PROFILE_WRITE_INTERVAL
+        while not self._stop.wait(self.interval):
+            self._Sample()
+            if time.time() >= next_write:
+                self.Write()
+                next_write = time.time() + _PROFILE_WRITE_INTERVAL
+        self.Write()
+
+    def Start(self):
+        """Start sampling in a background thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._Run,
+                                        name='SamplingProfiler')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def Stop(self):
+        """Stop sampling, and write the output file."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
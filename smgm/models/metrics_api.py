@@ -0,0 +1,52 @@
+"""Records request and template timings, and serves all metrics at /metrics.
+
+Metrics are kept per process. With pre-forked workers, run.py sets the
+METRICS_DIR config option to a directory which every worker writes its metrics
+to (see metrics.MetricsWriter), and /metrics adds them all up.
+"""
+
+import time
+
+from metrics import REQUEST_TIME, TEMPLATE_TIME, RenderMetrics
+from smgm import app
+from flask import Response, g, request
+from flask.signals import before_render_template, template_rendered
+
+
+@app.before_request
+def _StartRequestTimer():
+    g.request_start_time = time.time()
+
+
+@app.after_request
+def _RecordRequestTime(response):
+    # Streamed responses are only timed until the first byte is ready.
+    start = g.get('request_start_time')
+    if start is not None:
+        REQUEST_TIME.Observe(time.time() - start,
+                             endpoint=request.endpoint or 'unknown',
+                             method=request.method,
+                             status=response.status_code)
+    return response
+
+
+def _StartTemplateTimer(sender, template, context, **extra):
+    # Templates can be rendered from within other templates, so keep a stack.
+    g.setdefault('template_start_times', []).append(time.time())
+
+
+def _RecordTemplateTime(sender, template, context, **extra):
+    starts = g.get('template_start_times')
+    if starts:
+        TEMPLATE_TIME.Observe(time.time() - starts.pop(),
+                              template=template.name or 'unknown')
+
+
+before_render_template.connect(_StartTemplateTimer, app)
+template_rendered.connect(_RecordTemplateTime, app)
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(RenderMetrics(app.config.get('METRICS_DIR')),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,142 @@
+"""A set of tests for the metrics."""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import metrics
+
+
+class TestHistogram(unittest.TestCase):
+
+    def setUp(self):
+        self.histogram = metrics.Histogram(
+            'test_seconds', 'A test.', ('endpoint',), buckets=(0.1, 1.0))
+        self.addCleanup(metrics._registry.remove, self.histogram)
+
+    def testObserve(self):
+        self.histogram.Observe(0.05, endpoint='a')
+        self.histogram.Observe(0.5, endpoint='a')
+        self.histogram.Observe(2.0, endpoint='b')
+
+        self.assertEqual((0.55, 2), self.histogram.Get(endpoint='a'))
+        self.assertEqual((2.0, 1), self.histogram.Get(endpoint='b'))
+        self.assertEqual((0.0, 0), self.histogram.Get(endpoint='c'))
+
+    def testObserveWithWrongLabels(self):
+        self.assertRaises(ValueError, self.histogram.Observe, 1.0)
+        self.assertRaises(ValueError, self.histogram.Observe, 1.0,
+                          endpoint='a', method='GET')
+
+    def testTime(self):
+        with self.histogram.Time(endpoint='a'):
+            pass
+        self.assertEqual(1, self.histogram.Get(endpoint='a')[1])
+
+    def testRender(self):
+        self.histogram.Observe(0.1, endpoint='a')
+        self.histogram.Observe(0.5, endpoint='a')
+        self.histogram.Observe(1.5, endpoint='say "hi"')
+
+        self.assertEqual([
+            '# HELP test_seconds A test.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{endpoint="a",le="0.1"} 1',
+            'test_seconds_bucket{endpoint="a",le="1.0"} 2',
+            'test_seconds_bucket{endpoint="a",le="+Inf"} 2',
+            'test_seconds_sum{endpoint="a"} 0.6',
+            'test_seconds_count{endpoint="a"} 2',
+            'test_seconds_bucket{endpoint="say \\"hi\\"",le="0.1"} 0',
+            'test_seconds_bucket{endpoint="say \\"hi\\"",le="1.0"} 0',
+            'test_seconds_bucket{endpoint="say \\"hi\\"",le="+Inf"} 1',
+            'test_seconds_sum{endpoint="say \\"hi\\""} 1.5',
+            'test_seconds_count{endpoint="say \\"hi\\""} 1',
+        ], self.histogram.Render())
+
+    def testRenderAddsSnapshots(self):
+        self.histogram.Observe(0.05, endpoint='a')
+        other = [[['a'], [1, 1], 0.75, 3], [['b'], [0, 1], 0.5, 1]]
+
+        self.assertEqual([
+            'test_seconds_bucket{endpoint="a",le="0.1"} 2',
+            'test_seconds_bucket{endpoint="a",le="1.0"} 3',
+            'test_seconds_bucket{endpoint="a",le="+Inf"} 4',
+            'test_seconds_sum{endpoint="a"} 0.8',
+            'test_seconds_count{endpoint="a"} 4',
+            'test_seconds_bucket{endpoint="b",le="0.1"} 0',
+            'test_seconds_bucket{endpoint="b",le="1.0"} 1',
+            'test_seconds_bucket{endpoint="b",le="+Inf"} 1',
+            'test_seconds_sum{endpoint="b"} 0.5',
+            'test_seconds_count{endpoint="b"} 1',
+        ], self.histogram.Render([other])[2:])
+
+    def testRenderMetricsIncludesEveryMetric(self):
+        rendered = metrics.RenderMetrics()
+        self.assertIn('# TYPE test_seconds histogram', rendered)
+        self.assertIn('# TYPE smgm_request_duration_seconds histogram',
+                      rendered)
+
+
+class TestMetricsWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.histogram = metrics.Histogram('shared_seconds', 'A test.')
+        self.addCleanup(metrics._registry.remove, self.histogram)
+
+    def testRenderMetricsAddsOtherProcesses(self):
+        self.histogram.Observe(0.5)
+        # Another process, which has exited.
+        with open(os.path.join(self.tmp_dir, '1.json'), 'w') as other_file:
+            json.dump({'shared_seconds': self.histogram.Snapshot()},
+                      other_file)
+
+        writer = metrics.MetricsWriter(self.tmp_dir, interval=60)
+        writer.Start()
+        writer.Stop()
+        self.assertEqual(['1.json', '%d.json' % os.getpid()],
+                         sorted(os.listdir(self.tmp_dir)))
+
+        # This process's own file isn't counted twice.
+        self.assertIn('shared_seconds_count 2',
+                      metrics.RenderMetrics(self.tmp_dir))
+        self.assertIn('shared_seconds_count 1', metrics.RenderMetrics())
+
+        metrics.ClearMetrics(self.tmp_dir)
+        self.assertEqual([], os.listdir(self.tmp_dir))
+
+
+class TestSamplingProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def testProfilerWritesSamples(self):
+        path = os.path.join(self.tmp_dir, 'profile.txt')
+        profiler = metrics.SamplingProfiler(path, interval=0.001)
+        profiler.Start()
+        stop = time.time() + 0.1
+        while time.time() < stop or profiler.samples < 5:
+            pass
+        profiler.Stop()
+
+        with open(path) as profile_file:
+            lines = profile_file.read().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(any('testProfilerWritesSamples' in line
+                            for line in lines))
+
+        # The profiler shouldn't sample itself.
+        self.assertFalse(any('_Run' in line for line in lines))
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertGreater(int(count), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
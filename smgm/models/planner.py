@@ -0,0 +1,191 @@
+"""Automatically schedules plantings to fill a garden.
+
+The garden is modelled as a day x slot occupancy matrix over the planning
+horizon. Its cumulative sum down each slot gives the number of occupied days
+in any window with a single subtraction, so whether a plant fits in every slot
+starting on every day is checked at once.
+
+Plants are placed greedily, one planting at a time in round-robin order, each
+at the earliest day (then lowest slot) where it fits. After a placement only
+the column of the slot it was placed in needs to be updated.
+"""
+
+import collections
+import datetime
+
+import numpy
+
+from garden import Plant
+
+
+## The calendar codes of months in which a plant can go into the ground: 'P'
+## (plant seeds directly) or 'T' (transplant seedlings). 'S' (sow in trays)
+## doesn't use a slot.
+_PLANTABLE_CODES = frozenset(['P', 'T'])
+
+## The longest planning horizon allowed, in days.
+MAX_HORIZON_DAYS = 5 * 366
+
+## A request to plant something. count is None to plant as many as will fit.
+PlanRequest = collections.namedtuple('PlanRequest', ['name', 'count'])
+
+
+def GrowthDays(plant_info):
+    """Get the number of days a plant from the catalog occupies a slot for."""
+    return max(plant_info['harvest_end'], plant_info['harvest_start'], 1)
+
+
+class _PlantSchedule(object):
+    """Where a single plant could start, per day and slot."""
+
+    def __init__(self, request, plant_info, months, occupied_before):
+        """Create a new schedule.
+
+        Args:
+            request: PlanRequest, The plant to schedule.
+            plant_info: dict, The plant's entry in the catalog.
+            months: numpy array of int, The month (0-11) of each day.
+            occupied_before: numpy array, See UpdateSlots().
+        """
+        self.name = request.name
+        self.remaining = request.count
+        self.growth_days = GrowthDays(plant_info)
+
+        plantable = numpy.array(
+            [code in _PLANTABLE_CODES for code in plant_info['calendar']])
+        self.plantable = plantable[months]
+
+        # The earliest day each slot could take this plant (-1 for never).
+        self.first_day = numpy.empty(occupied_before.shape[1],
+                                     dtype=numpy.int64)
+        self.UpdateSlots(occupied_before, slice(None))
+
+    def UpdateSlots(self, occupied_before, slot_indices):
+        """Recompute the earliest start day for some slots.
+
+        Args:
+            occupied_before: numpy array of (days + 1) x slots, The number of
+                             occupied days before each day in each slot.
+            slot_indices: index into the slot axis, The slots to update.
+        """
+        g = self.growth_days
+        days = occupied_before.shape[0] - 1
+        if g > days:
+            self.first_day[slot_indices] = -1
+            return
+
+        columns = occupied_before[:, slot_indices]
+        free = (columns[g:] - columns[:-g]) == 0
+        free &= self.plantable[:days - g + 1, numpy.newaxis]
+        first = free.argmax(axis=0)
+        first[~free[first, numpy.arange(free.shape[1])]] = -1
+        self.first_day[slot_indices] = first
+
+    def Best(self):
+        """Get the (day, slot) where this plant fits earliest, or None."""
+        days = numpy.where(self.first_day < 0, numpy.iinfo(numpy.int64).max,
+                           self.first_day)
+        slot_idx = int(days.argmin())
+        if self.first_day[slot_idx] < 0:
+            return None
+        return int(self.first_day[slot_idx]), slot_idx
+
+
+def Plan(garden, catalog_plants, requests, start, end):
+    """Schedule plantings to fill a garden, without any overlaps.
+
+    Plantings already in the garden are kept, and new plantings are fitted
+    around them. Plants are only planted in months where their calendar allows
+    it, and stay in the ground until the end of their harvest period (which
+    must be on or before end).
+
+    Args:
+        garden: Garden, The garden to plan; it isn't modified.
+        catalog_plants: dict of str --> dict, The plant catalog.
+        requests: list of PlanRequest, The plants to place. Each turn, one of
+                  each plant is placed (in order) until each has reached its
+                  count, or doesn't fit anywhere.
+        start: datetime.date, The first day a plant can be planted.
+        end: datetime.date, The last day a plant can be harvested.
+
+    Returns:
+        (list of (int, Plant), dict of str --> int), The new plantings as
+        (slot index, plant) in the order they were placed, and the number of
+        each requested plant which couldn't be placed (for requests with a
+        count).
+
+    Raises:
+        ValueError: if a plant isn't in the catalog, or the dates are invalid.
+    """
+    days = (end - start).days
+    if days <= 0:
+        raise ValueError('The plan must end after it starts')
+    if days > MAX_HORIZON_DAYS:
+        raise ValueError('The plan can be at most %d days long' %
+                         MAX_HORIZON_DAYS)
+
+    # Mark where each existing planting starts and ends within the plan, then
+    # accumulate to get the occupancy matrix.
+    num_slots = len(garden.slots)
+    start_ordinal = start.toordinal()
+    changes = numpy.zeros((days + 1, num_slots), dtype=numpy.int32)
+    for slot_idx, slot in enumerate(garden.slots):
+        for plant in slot.BetweenOrdinals(start_ordinal, start_ordinal + days):
+            first = max(plant.plant_ordinal - start_ordinal, 0)
+            last = min(plant.harvest_ordinal - start_ordinal, days)
+            if first < last:
+                changes[first, slot_idx] += 1
+                changes[last, slot_idx] -= 1
+    occupied = changes[:days].cumsum(axis=0) > 0
+
+    # occupied_before[d, s] is the number of occupied days in slot s before
+    # day d of the plan.
+    occupied_before = numpy.zeros((days + 1, num_slots), dtype=numpy.int32)
+    occupied.cumsum(axis=0, out=occupied_before[1:])
+
+    months = numpy.array([
+        datetime.date.fromordinal(start_ordinal + d).month - 1
+        for d in xrange(days)])
+
+    all_schedules = []
+    for request in requests:
+        plant_info = catalog_plants.get(request.name)
+        if plant_info is None:
+            raise ValueError('Unknown plant %s' % request.name)
+        all_schedules.append(
+            _PlantSchedule(request, plant_info, months, occupied_before))
+    schedules = list(all_schedules)
+
+    plantings = []
+    while schedules:
+        for schedule in list(schedules):
+            best = schedule.Best()
+            if best is None:
+                schedules.remove(schedule)
+                continue
+
+            day, slot_idx = best
+            g = schedule.growth_days
+            plantings.append((slot_idx, Plant(
+                schedule.name, datetime.date.fromordinal(start_ordinal + day),
+                g)))
+
+            # The slot is occupied from day to day + g, so every later count
+            # goes up.
+            column = occupied_before[:, slot_idx]
+            column[day + 1:day + g + 1] += numpy.arange(
+                1, g + 1, dtype=column.dtype)
+            column[day + g + 1:] += g
+            for other in schedules:
+                other.UpdateSlots(occupied_before, [slot_idx])
+
+            if schedule.remaining is not None:
+                schedule.remaining -= 1
+                if schedule.remaining <= 0:
+                    schedules.remove(schedule)
+
+    unplaced = collections.Counter()
+    for schedule in all_schedules:
+        if schedule.remaining:
+            unplaced[schedule.name] += schedule.remaining
+    return plantings, dict(unplaced)
@@ -0,0 +1,114 @@
+"""A set of tests for the automatic planner."""
+
+import datetime
+import unittest
+
+import garden
+import garden_validator
+import planner
+
+
+def _Calendar(codes):
+    """Make a calendar from a 12 character string, e.g. 'PP  TT      '."""
+    return [code.strip() for code in codes]
+
+
+_CATALOG = {
+    'Beans': dict(name='Beans', calendar=_Calendar('PPPPPPPPPPPP'),
+                  harvest_start=50, harvest_end=60),
+    'Carrot': dict(name='Carrot', calendar=_Calendar('SSSTTT      '),
+                   harvest_start=70, harvest_end=80),
+    'Garlic': dict(name='Garlic', calendar=_Calendar('S           '),
+                   harvest_start=100, harvest_end=120),
+}
+
+
+class TestPlanner(unittest.TestCase):
+
+    def setUp(self):
+        self.garden = garden.Garden('test', 2, 1)
+        self.start = datetime.date(2017, 1, 1)
+        self.end = datetime.date(2017, 12, 31)
+
+    def _Plan(self, requests):
+        return planner.Plan(self.garden, _CATALOG, requests, self.start,
+                            self.end)
+
+    def _Apply(self, plantings):
+        for slot_idx, plant in plantings:
+            self.garden.slots[slot_idx].Insert(plant)
+
+    def testPlanFillsGarden(self):
+        plantings, unplaced = self._Plan([planner.PlanRequest('Beans', None)])
+
+        # 60 days each, so 6 fit back-to-back in each slot.
+        self.assertEqual(12, len(plantings))
+        self.assertEqual({}, unplaced)
+        self._Apply(plantings)
+        self.assertEqual([], self.garden.Conflicts())
+        for _, plant in plantings:
+            self.assertLessEqual(plant.harvest_date, self.end)
+            self.assertEqual(60, (plant.harvest_date - plant.plant_date).days)
+
+    def testPlanPlacesEarliestFirst(self):
+        plantings, _ = self._Plan([planner.PlanRequest('Beans', 3)])
+        self.assertEqual([
+            (0, datetime.date(2017, 1, 1)),
+            (1, datetime.date(2017, 1, 1)),
+            (0, datetime.date(2017, 3, 2)),
+        ], [(slot_idx, plant.plant_date) for slot_idx, plant in plantings])
+
+    def testPlanOnlyPlantsInPlantableMonths(self):
+        plantings, unplaced = self._Plan([planner.PlanRequest('Carrot', 2)])
+        self.assertEqual({}, unplaced)
+        for _, plant in plantings:
+            self.assertEqual(datetime.date(2017, 4, 1), plant.plant_date)
+
+        # Garlic is only ever sown in trays, so never fits.
+        plantings, unplaced = self._Plan([planner.PlanRequest('Garlic', 2)])
+        self.assertEqual([], plantings)
+        self.assertEqual({'Garlic': 2}, unplaced)
+
+    def testPlanAvoidsExistingPlantings(self):
+        self.garden.AddPlant(0, 0, garden.Plant(
+            'Carrot', datetime.date(2017, 1, 10), datetime.date(2017, 6, 1)))
+        plantings, _ = self._Plan([planner.PlanRequest('Beans', None)])
+
+        self._Apply(plantings)
+        self.assertEqual([], self.garden.Conflicts())
+        self.assertEqual(datetime.date(2017, 6, 1), min(
+            plant.plant_date for slot_idx, plant in plantings
+            if slot_idx == 0))
+
+    def testPlanRoundRobin(self):
+        plantings, unplaced = self._Plan([
+            planner.PlanRequest('Beans', None),
+            planner.PlanRequest('Carrot', 1)])
+        self.assertEqual({}, unplaced)
+        self.assertEqual(['Beans', 'Carrot', 'Beans'],
+                         [plant.name for _, plant in plantings[:3]])
+        self._Apply(plantings)
+        self.assertEqual([], self.garden.Conflicts())
+
+    def testPlanUnknownPlant(self):
+        self.assertRaises(ValueError, self._Plan,
+                          [planner.PlanRequest('Triffid', 1)])
+
+    def testPlanInvalidDates(self):
+        self.assertRaises(ValueError, planner.Plan, self.garden, _CATALOG, [],
+                          self.end, self.start)
+
+    def testPlanLargeGarden(self):
+        self.garden = garden.Garden('big', 20, 20)
+        self.end = datetime.date(2018, 12, 31)
+        plantings, _ = self._Plan([planner.PlanRequest('Beans', None),
+                                   planner.PlanRequest('Carrot', None)])
+
+        self._Apply(plantings)
+        self.assertEqual(
+            {}, garden_validator.ValidateGardens([self.garden]))
+        self.assertGreater(len(plantings), 400 * 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
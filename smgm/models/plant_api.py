@@ -0,0 +1,148 @@
+"""An API which allows querying the plant catalog."""
+
+import datetime
+
+from garden_store import GetGardenStore
+from plant_catalog import GetCatalog
+from sowing_index import ACTIONS, FreeWindow
+from smgm import app
+from flask import Response, jsonify, redirect, request, url_for
+from flask_stormpath import user
+
+
+## How long browsers may cache a versioned copy of the catalog (1 year).
+_VERSIONED_MAX_AGE = 365 * 24 * 60 * 60
+
+
+@app.route('/api/plants', methods=['GET'])
+def get_plants():
+    return Response(GetCatalog().json, mimetype='application/json')
+
+
+@app.route('/api/plants/<string:version>.json', methods=['GET'])
+def get_plants_version(version):
+    """Get a specific version of the catalog.
+
+    The URL changes whenever the catalog does, so the response can be cached
+    forever. Old versions are redirected to the current one.
+    """
+    catalog = GetCatalog().Snapshot()
+    if version != catalog.version:
+        response = redirect(url_for('get_plants_version',
+                                    version=catalog.version))
+        response.cache_control.no_cache = True
+        return response
+
+    # Each encoding is a different representation, so needs its own ETag.
+    if 'gzip' in request.accept_encodings:
+        response = Response(catalog.gzip, mimetype='application/json')
+        response.content_encoding = 'gzip'
+        response.set_etag('%s-gzip' % catalog.version)
+    else:
+        response = Response(catalog.json, mimetype='application/json')
+        response.set_etag(catalog.version)
+
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = (
+        'public, max-age=%d, immutable' % _VERSIONED_MAX_AGE)
+    return response.make_conditional(request)
+
+
+@app.route('/api/plants/search', methods=['GET'])
+def search_plants():
+    prefix = request.args.get('q', '')
+    limit = request.args.get('limit', 10, type=int)
+    return jsonify(dict(plants=GetCatalog().Search(prefix, limit)))
+
+
+def _SowingStart(month, year):
+    """Get the first day of the month to sow in.
+
+    Without a year this is the next time the month comes around, and from
+    today rather than the 1st if it is the current month.
+    """
+    today = datetime.date.today()
+    if year is not None:
+        return datetime.date(year, month, 1)
+    if month == today.month:
+        return today
+    if month < today.month:
+        return datetime.date(today.year + 1, month, 1)
+    return datetime.date(today.year, month, 1)
+
+
+def _NextFirstOf(date, month):
+    """Get the next 1st of some month (1-12) after date."""
+    year = date.year if month > date.month else date.year + 1
+    return datetime.date(year, month, 1)
+
+
+@app.route('/api/plants/sowable', methods=['GET'])
+def get_sowable_plants():
+    """Find the plants which can be sown in a month.
+
+    Query parameters (all optional):
+        month: int, 1-12, defaults to the current month.
+        year: int, defaults to the next time the month comes around.
+        action: str, The calendar codes to include (some of "PST"). Defaults
+                to all of them, or "PT" (those which use a slot) with slot.
+        harvest_before: int, 1-12, Only plants which can start being harvested
+                        before the next 1st of this month.
+        garden, slot: Only plants which fit in the free window of a slot of one
+                      of the user's gardens (which needs a login), starting in
+                      the month.
+    """
+    today = datetime.date.today()
+    month = request.args.get('month', today.month, type=int)
+    year = request.args.get('year', None, type=int)
+    harvest_before = request.args.get('harvest_before', None, type=int)
+    garden_name = request.args.get('garden')
+    slot_idx = request.args.get('slot', None, type=int)
+    actions = request.args.get('action', 'PT' if slot_idx is not None
+                               else ACTIONS).upper()
+
+    if not 1 <= month <= 12 or (harvest_before is not None and
+                                not 1 <= harvest_before <= 12):
+        return jsonify(dict(error="Months must be from 1 to 12")), 400
+    if not actions or set(actions) - set(ACTIONS):
+        return jsonify(dict(error="Unknown action %s" % actions)), 400
+    if (garden_name is None) != (slot_idx is None):
+        return jsonify(dict(
+            error="garden and slot must be given together")), 400
+
+    try:
+        start = _SowingStart(month, year)
+    except ValueError as e:
+        return jsonify(dict(error="Invalid year (%s)" % e)), 400
+    month_end = (_NextFirstOf(start, month % 12 + 1) -
+                 datetime.timedelta(days=1))
+
+    sowing = GetCatalog().sowing
+    mask = sowing.InMonth(month, actions)
+    result = dict(error=None, month=month, start=start.isoformat())
+
+    if garden_name is not None:
+        if not user.is_authenticated:
+            return app.login_manager.unauthorized()
+        garden = GetGardenStore().Load(user, garden_name)
+        if garden is None:
+            return jsonify(dict(error="Unknown garden %s" % garden_name)), 404
+        if not 0 <= slot_idx < len(garden.slots):
+            return jsonify(dict(error="Unknown slot %d" % slot_idx)), 400
+
+        window = FreeWindow(garden.slots[slot_idx], start.toordinal(),
+                            month_end.toordinal())
+        if window is None:
+            return jsonify(dict(
+                result, free_from=None, free_days=0, plants=[]))
+        first_day, free_days = window
+        start = datetime.date.fromordinal(first_day)
+        result.update(free_from=start.isoformat(), free_days=free_days)
+        if free_days is not None:
+            mask &= sowing.GrowsWithin(free_days)
+
+    if harvest_before is not None:
+        days = (_NextFirstOf(start, harvest_before) - start).days - 1
+        mask &= sowing.HarvestableWithin(days)
+
+    return jsonify(dict(result, plants=sowing.Names(mask)))
@@ -0,0 +1,175 @@
+"""An in-process cache of the plant catalog (plants.json).
+
+The catalog is loaded once and kept in memory, along with a few indexes which
+are useful for serving it. It is only re-read from disk when the modification
+time of the file changes.
+"""
+
+import bisect
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+from cStringIO import StringIO
+from sowing_index import SowingIndex
+
+
+## The default location of the plant catalog, at the root of the repository.
+DEFAULT_PATH = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir,
+    'plants.json'))
+
+## The number of hex digits of the content hash used as the catalog version.
+_VERSION_LENGTH = 16
+
+## The default number of results returned by PlantCatalog.Search().
+_DEFAULT_SEARCH_LIMIT = 10
+
+
+class _CatalogData(object):
+    """An immutable snapshot of the catalog, as loaded from a single file."""
+
+    def __init__(self, plants, mtime):
+        self.mtime = mtime
+        self.plants = plants
+        self.names = sorted(plants)
+
+        # The typeahead index is a sorted list of lowercase names; all names
+        # starting with some prefix form a contiguous run in this list.
+        index = sorted((name.lower(), name) for name in plants)
+        self.lower_names = [lower for lower, _ in index]
+        self.lower_index = [name for _, name in index]
+
+        self._companions = None
+        self._companions_lock = threading.Lock()
+        self.sowing = SowingIndex(plants, self.names)
+
+        self.json = json.dumps(plants, sort_keys=True, separators=(',', ':'))
+        self.version = hashlib.sha1(self.json).hexdigest()[:_VERSION_LENGTH]
+
+        # Compress the catalog up-front, so it never has to be done while
+        # serving a request. The mtime is fixed so the output is reproducible.
+        gzip_buffer = StringIO()
+        gzip_file = gzip.GzipFile(
+            fileobj=gzip_buffer, mode='wb', compresslevel=9, mtime=0)
+        gzip_file.write(self.json)
+        gzip_file.close()
+        self.gzip = gzip_buffer.getvalue()
+
+    @property
+    def companions(self):
+        """Companions, built when first used (NumPy is slow to import)."""
+        with self._companions_lock:
+            if self._companions is None:
+                from companions import Companions
+                self._companions = Companions(self.plants, self.names)
+            return self._companions
+
+
+class PlantCatalog(object):
+    """The set of plants which can be planted in a garden.
+
+    All accessors check the modification time of the underlying file, and will
+    reload it if it has changed since it was last read.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        """Create a new catalog.
+
+        Args:
+            path: str, The path to the catalog JSON file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = None
+
+    def Snapshot(self):
+        """Get the current snapshot of the catalog, reloading if required.
+
+        Everything read from a single snapshot is consistent, even if the file
+        is reloaded in the meantime.
+        """
+        mtime = os.stat(self.path).st_mtime
+        data = self._data
+        if data is not None and data.mtime == mtime:
+            return data
+
+        with self._lock:
+            # Another thread might have reloaded the file while we waited.
+            if self._data is None or self._data.mtime != mtime:
+                with open(self.path, 'rU') as catalog_file:
+                    self._data = _CatalogData(json.load(catalog_file), mtime)
+            return self._data
+
+    @property
+    def plants(self):
+        """dict of str --> dict, Information about each plant, keyed by name."""
+        return self.Snapshot().plants
+
+    @property
+    def names(self):
+        """list of str, The names of all plants, sorted."""
+        return self.Snapshot().names
+
+    @property
+    def companions(self):
+        """Companions, The compatibility of each pair of plants."""
+        return self.Snapshot().companions
+
+    @property
+    def sowing(self):
+        """SowingIndex, When each plant can be sown, as bitmasks."""
+        return self.Snapshot().sowing
+
+    @property
+    def json(self):
+        """str, The whole catalog as a JSON object."""
+        return self.Snapshot().json
+
+    @property
+    def gzip(self):
+        """str, The gzip compressed version of json."""
+        return self.Snapshot().gzip
+
+    @property
+    def version(self):
+        """str, A hash of the contents of the catalog."""
+        return self.Snapshot().version
+
+    def Get(self, name):
+        """Get information about the plant called name (or None)."""
+        return self.Snapshot().plants.get(name)
+
+    def Search(self, prefix, limit=_DEFAULT_SEARCH_LIMIT):
+        """Find plants whose name starts with prefix (case insensitive).
+
+        Args:
+            prefix: str, The start of the plant name.
+            limit: int, The maximum number of names to return.
+
+        Returns:
+            list of str, The names of up to limit matching plants, sorted.
+        """
+        data = self.Snapshot()
+        prefix = prefix.lower()
+        results = []
+        i = bisect.bisect_left(data.lower_names, prefix)
+        while (i < len(data.lower_names) and len(results) < limit and
+               data.lower_names[i].startswith(prefix)):
+            results.append(data.lower_index[i])
+            i += 1
+        return results
+
+
+## The catalog shared by the whole process.
+_catalog = None
+
+
+def GetCatalog():
+    """Get the process-wide plant catalog."""
+    global _catalog
+    if _catalog is None:
+        _catalog = PlantCatalog()
+    return _catalog
@@ -0,0 +1,75 @@
+"""A set of tests for the plant catalog."""
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from cStringIO import StringIO
+
+import plant_catalog
+
+
+class TestPlantCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'plants.json')
+        self._WritePlants(['Carrot', 'Cabbage', 'Beans (Climbing)'], mtime=1)
+        self.catalog = plant_catalog.PlantCatalog(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _WritePlants(self, names, mtime):
+        with open(self.path, 'w') as catalog_file:
+            json.dump({name: dict(name=name) for name in names}, catalog_file)
+        os.utime(self.path, (mtime, mtime))
+
+    def testCatalogLoadsPlants(self):
+        self.assertEqual(['Beans (Climbing)', 'Cabbage', 'Carrot'],
+                         self.catalog.names)
+        self.assertEqual(dict(name='Carrot'), self.catalog.Get('Carrot'))
+        self.assertIsNone(self.catalog.Get('Potato'))
+        self.assertEqual(self.catalog.plants, json.loads(self.catalog.json))
+
+    def testCatalogOnlyReloadsWhenModified(self):
+        plants = self.catalog.plants
+        self.assertIs(plants, self.catalog.plants)
+
+        self._WritePlants(['Potato'], mtime=2)
+        self.assertEqual(['Potato'], self.catalog.names)
+
+    def testCatalogVersionChangesWithContents(self):
+        version = self.catalog.version
+        self.assertEqual(
+            self.catalog.json, gzip.GzipFile(
+                fileobj=StringIO(self.catalog.gzip)).read())
+
+        self._WritePlants(['Carrot', 'Cabbage', 'Beans (Climbing)'], mtime=2)
+        self.assertEqual(version, self.catalog.version)
+
+        self._WritePlants(['Potato'], mtime=3)
+        self.assertNotEqual(version, self.catalog.version)
+
+    def testCatalogSearchIsCaseInsensitive(self):
+        self.assertEqual(['Cabbage', 'Carrot'], self.catalog.Search('c'))
+        self.assertEqual(['Cabbage', 'Carrot'], self.catalog.Search('CA'))
+        self.assertEqual(['Cabbage'], self.catalog.Search('c', limit=1))
+        self.assertEqual(['Beans (Climbing)'], self.catalog.Search('beans ('))
+        self.assertEqual([], self.catalog.Search('z'))
+
+    def testCatalogSowingIndexFollowsReloads(self):
+        sowing = self.catalog.sowing
+        self.assertEqual(self.catalog.names, sowing.Names(sowing.all))
+        self.assertEqual([], sowing.Names(sowing.InMonth(3)))
+
+        self._WritePlants(['Potato'], mtime=2)
+        self.assertEqual(['Potato'],
+                         self.catalog.sowing.Names(self.catalog.sowing.all))
+
+
+if __name__ == '__main__':
+    unittest.main()
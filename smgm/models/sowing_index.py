@@ -0,0 +1,132 @@
+"""Bitmask indexes for finding plants by when they can be sown and grown.
+
+Each set of plants is an int used as a bitmask, where bit i is set if the plant
+with id i (its position in the sorted list of names) is in the set. Queries
+like "can be planted in March, and is ready to harvest within 90 days" are then
+just the intersection of a few precomputed masks.
+"""
+
+import bisect
+
+
+## The action codes used in the catalog calendars: P (plant seeds directly),
+## S (sow in trays) and T (transplant seedlings).
+ACTIONS = 'PST'
+
+
+def _Mask(ids):
+    mask = 0
+    for i in ids:
+        mask |= 1 << i
+    return mask
+
+
+class _GrowthIndex(object):
+    """Finds the plants which take at most some number of days."""
+
+    def __init__(self, days_by_id):
+        order = sorted(xrange(len(days_by_id)), key=days_by_id.__getitem__)
+        self._days = [days_by_id[i] for i in order]
+
+        # _masks[k] is the set of the k plants which take the fewest days.
+        self._masks = [0]
+        for i in order:
+            self._masks.append(self._masks[-1] | (1 << i))
+
+    def AtMost(self, days):
+        """Get the mask of plants which take at most days days."""
+        return self._masks[bisect.bisect_right(self._days, days)]
+
+
+class SowingIndex(object):
+    """When each plant in the catalog can be sown, and how long it takes."""
+
+    def __init__(self, plants, names):
+        """Build the indexes.
+
+        Args:
+            plants: dict of str --> dict, The plant catalog.
+            names: list of str, The sorted plant names; plant ids are indices
+                   into this list.
+        """
+        self.names = names
+
+        # _months[action][m] is the mask of plants with that action in month m
+        # (0 is January).
+        self._months = {action: [0] * 12 for action in ACTIONS}
+        harvest_start = []
+        growth = []
+        for i, name in enumerate(names):
+            plant = plants[name]
+            for month, code in enumerate(plant.get('calendar', [])):
+                if code in self._months:
+                    self._months[code][month] |= 1 << i
+            harvest_start.append(plant.get('harvest_start', 0))
+            growth.append(max(plant.get('harvest_end', 0),
+                              plant.get('harvest_start', 0), 1))
+
+        self.all = _Mask(xrange(len(names)))
+        self._harvest_start = _GrowthIndex(harvest_start)
+        self._growth = _GrowthIndex(growth)
+
+    def InMonth(self, month, actions=ACTIONS):
+        """Get the mask of plants which can be sown in a month.
+
+        Args:
+            month: int, The month, from 1 (January) to 12.
+            actions: str, The calendar codes to include.
+        """
+        mask = 0
+        for action in actions:
+            mask |= self._months[action][month - 1]
+        return mask
+
+    def HarvestableWithin(self, days):
+        """Get the mask of plants which can start being harvested in days."""
+        return self._harvest_start.AtMost(days)
+
+    def GrowsWithin(self, days):
+        """Get the mask of plants which occupy a slot for at most days days.
+
+        This matches planner.GrowthDays().
+        """
+        return self._growth.AtMost(days)
+
+    def Names(self, mask):
+        """Get the sorted names of the plants in a mask."""
+        names = []
+        i = 0
+        while mask:
+            if mask & 1:
+                names.append(self.names[i])
+            mask >>= 1
+            i += 1
+        return names
+
+
+def FreeWindow(slot, start, end):
+    """Find the first stretch of a slot which is free from some day in a range.
+
+    A plant can go in on the day another is harvested.
+
+    Args:
+        slot: Slot, The slot.
+        start: int, The ordinal of the first day the stretch may start on.
+        end: int, The ordinal of the last day the stretch may start on.
+
+    Returns:
+        (int, int), The ordinal of the first free day and the number of days
+        until the next planting (None if there are none), or None if the slot
+        is never free in the range.
+    """
+    day = start
+    for plant in slot:
+        if plant.harvest_ordinal <= day:
+            continue
+        if plant.plant_ordinal <= day:
+            day = plant.harvest_ordinal
+            if day > end:
+                return None
+            continue
+        return day, plant.plant_ordinal - day
+    return day, None
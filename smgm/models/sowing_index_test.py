@@ -0,0 +1,84 @@
+"""A set of tests for the sowing calendar index."""
+
+import datetime
+import unittest
+
+import garden
+import sowing_index
+
+
+def _Calendar(**months):
+    """Make a calendar from month numbers (1-12) --> action code."""
+    calendar = [''] * 12
+    for month, code in months.iteritems():
+        calendar[int(month[1:]) - 1] = code
+    return calendar
+
+
+_PLANTS = {
+    'Beans': dict(calendar=_Calendar(m3='P', m4='P'), harvest_start=56,
+                  harvest_end=84),
+    'Cabbage': dict(calendar=_Calendar(m2='S', m3='T'), harvest_start=98,
+                    harvest_end=112),
+    'Carrot': dict(calendar=_Calendar(m3='P', m9='P'), harvest_start=70,
+                   harvest_end=70),
+    'Radish': dict(calendar=['P'] * 12, harvest_start=35, harvest_end=42),
+    'Triffid': dict(),
+}
+
+
+def _Ordinal(date):
+    return datetime.datetime.strptime(date, '%Y-%m-%d').toordinal()
+
+
+class TestSowingIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = sowing_index.SowingIndex(_PLANTS, sorted(_PLANTS))
+
+    def testInMonth(self):
+        index = self.index
+        self.assertEqual(['Beans', 'Cabbage', 'Carrot', 'Radish'],
+                         index.Names(index.InMonth(3)))
+        self.assertEqual(['Beans', 'Carrot', 'Radish'],
+                         index.Names(index.InMonth(3, 'P')))
+        self.assertEqual(['Cabbage'], index.Names(index.InMonth(2, 'ST')))
+        self.assertEqual(['Radish'], index.Names(index.InMonth(12)))
+
+    def testGrowthMasksIntersect(self):
+        index = self.index
+        march = index.InMonth(3)
+        self.assertEqual(['Beans', 'Carrot', 'Radish'], index.Names(
+            march & index.HarvestableWithin(70)))
+        self.assertEqual(['Beans', 'Radish'], index.Names(
+            march & index.HarvestableWithin(69)))
+        self.assertEqual(['Radish', 'Triffid'], index.Names(
+            index.GrowsWithin(42)))
+        self.assertEqual(['Beans', 'Carrot', 'Radish', 'Triffid'],
+                         index.Names(index.GrowsWithin(84)))
+        self.assertEqual(sorted(_PLANTS), index.Names(index.all))
+        self.assertEqual([], index.Names(index.GrowsWithin(0)))
+
+    def testFreeWindow(self):
+        slot = garden.Slot([
+            garden.Plant('Carrot', '2017-01-01', '2017-03-10'),
+            garden.Plant('Beans', '2017-03-10', '2017-03-20'),
+            garden.Plant('Radish', '2017-05-01', '2017-06-01'),
+        ])
+        def Window(start, end):
+            window = sowing_index.FreeWindow(
+                slot, _Ordinal(start), _Ordinal(end))
+            if window is None:
+                return None
+            day, days = window
+            return datetime.date.fromordinal(day).isoformat(), days
+
+        self.assertEqual(('2017-03-20', 42), Window('2017-03-01', '2017-03-31'))
+        self.assertEqual(None, Window('2017-03-01', '2017-03-15'))
+        self.assertEqual(('2017-04-10', 21), Window('2017-04-10', '2017-04-30'))
+        self.assertEqual(('2017-06-01', None),
+                         Window('2017-05-10', '2017-06-30'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,218 @@
+"""Storing gardens in a SQL database.
+
+This is separate from the other garden stores so that SQLAlchemy is only
+imported by apps which use it.
+"""
+
+import datetime
+
+from garden import Garden, Plant
+from garden_store import GardenStore
+from garden_summary import GardenSummary
+from sqlalchemy import (Column, ForeignKey, Index, Integer, MetaData, Table,
+                        String, UniqueConstraint, and_, case, create_engine,
+                        func, select)
+
+
+class SqlGardenStore(GardenStore):
+    """Stores gardens in a SQL database, with one row per planting.
+
+    Accounts are identified by their href.
+    """
+
+    def __init__(self, uri):
+        """Create a new store.
+
+        Args:
+            uri: str, The SQLAlchemy database URI, e.g. 'sqlite:///gardens.db'.
+                 Tables are created if they don't exist.
+        """
+        self._engine = create_engine(uri)
+
+        metadata = MetaData()
+        self._gardens = Table(
+            'gardens', metadata,
+            Column('id', Integer, primary_key=True),
+            Column('owner', String(255), nullable=False),
+            Column('name', String(255), nullable=False),
+            Column('width', Integer, nullable=False),
+            Column('height', Integer, nullable=False),
+            UniqueConstraint('owner', 'name'))
+
+        self._plantings = Table(
+            'plantings', metadata,
+            Column('id', Integer, primary_key=True),
+            Column('garden_id', Integer, ForeignKey('gardens.id'),
+                   nullable=False),
+            Column('slot', Integer, nullable=False),
+            Column('name', String(255), nullable=False),
+            Column('plant_date', String(64), nullable=False),
+            Column('harvest_date', String(64), nullable=False),
+            Column('plant_ordinal', Integer, nullable=False),
+            Column('harvest_ordinal', Integer, nullable=False),
+            Index('plantings_by_slot', 'garden_id', 'slot', 'plant_ordinal'))
+
+        metadata.create_all(self._engine)
+
+    def _GardenRow(self, conn, account, name):
+        """Get the row for the named garden, or None."""
+        gardens = self._gardens
+        return conn.execute(select([gardens]).where(and_(
+            gardens.c.owner == account.href,
+            gardens.c.name == name))).first()
+
+    def List(self, account):
+        gardens = self._gardens
+        query = (select([gardens.c.name])
+                 .where(gardens.c.owner == account.href)
+                 .order_by(gardens.c.name))
+        with self._engine.connect() as conn:
+            return [row.name for row in conn.execute(query)]
+
+    def Load(self, account, name):
+        return self.LoadSlots(account, name, None)
+
+    def LoadSlots(self, account, name, slot_indices):
+        """Load some slots of a garden, only querying the plantings in them.
+
+        Args:
+            slot_indices: iterable of int, The slots to load, or None for all
+                          of them.
+        """
+        plantings = self._plantings
+        with self._engine.connect() as conn:
+            garden_row = self._GardenRow(conn, account, name)
+            if garden_row is None:
+                return None
+
+            garden = Garden(garden_row.name, garden_row.width,
+                            garden_row.height)
+            where = plantings.c.garden_id == garden_row.id
+            if slot_indices is not None:
+                slot_indices = set(slot_indices)
+                if not slot_indices:
+                    return garden
+                # The plantings_by_slot index covers the range; slots in it
+                # which weren't asked for are skipped below.
+                where = and_(where, plantings.c.slot.between(
+                    min(slot_indices), max(slot_indices)))
+            query = (select([plantings]).where(where)
+                     .order_by(plantings.c.slot, plantings.c.plant_ordinal))
+            for row in conn.execute(query):
+                if slot_indices is None or row.slot in slot_indices:
+                    # The stored ordinals save parsing the date strings.
+                    garden.slots[row.slot].Insert(Plant.FromOrdinals(
+                        row.name, row.plant_ordinal, row.harvest_ordinal,
+                        row.plant_date, row.harvest_date))
+
+        return garden
+
+    def Summaries(self, account):
+        """Summarise every garden with a single query."""
+        today = datetime.date.today().toordinal()
+        gardens = self._gardens
+        plantings = self._plantings
+        query = (select([
+            gardens.c.name, gardens.c.width, gardens.c.height,
+            func.count(plantings.c.id).label('plantings'),
+            func.min(case([(plantings.c.plant_ordinal >= today,
+                            plantings.c.plant_ordinal)])).label('next_plant'),
+            func.min(case([(plantings.c.harvest_ordinal >= today,
+                            plantings.c.harvest_ordinal)]))
+            .label('next_harvest')])
+            .select_from(gardens.outerjoin(plantings))
+            .where(gardens.c.owner == account.href)
+            .group_by(gardens.c.id, gardens.c.name, gardens.c.width,
+                      gardens.c.height)
+            .order_by(gardens.c.name))
+
+        summaries = []
+        with self._engine.connect() as conn:
+            for row in conn.execute(query):
+                events = []
+                if row.next_plant is not None:
+                    events.append(row.next_plant)
+                if row.next_harvest is not None:
+                    events.append(row.next_harvest)
+                summaries.append(GardenSummary(
+                    row.name, row.width, row.height, row.plantings,
+                    sorted(events)[:1], True))
+        return summaries
+
+    def Exists(self, account, name):
+        with self._engine.connect() as conn:
+            return self._GardenRow(conn, account, name) is not None
+
+    def Save(self, account, garden):
+        self.SaveMany(account, [garden])
+
+    def SaveMany(self, account, gardens):
+        """Save the gardens in a single transaction."""
+        with self._engine.begin() as conn:
+            for garden in gardens:
+                self._Replace(conn, account, garden)
+        self._Changed(account)
+
+    def _Replace(self, conn, account, garden):
+        """Replace (or add) a whole garden."""
+        gardens = self._gardens
+        plantings = self._plantings
+        garden_row = self._GardenRow(conn, account, garden.name)
+        if garden_row is None:
+            garden_id = conn.execute(gardens.insert().values(
+                owner=account.href, name=garden.name, width=garden.width,
+                height=garden.height)).inserted_primary_key[0]
+        else:
+            garden_id = garden_row.id
+            conn.execute(gardens.update()
+                         .where(gardens.c.id == garden_id)
+                         .values(width=garden.width, height=garden.height))
+            conn.execute(plantings.delete()
+                         .where(plantings.c.garden_id == garden_id))
+
+        self._InsertPlantings(
+            conn, garden_id, garden, xrange(len(garden.slots)))
+
+    def SaveSlots(self, account, garden, slot_indices):
+        plantings = self._plantings
+        slot_indices = sorted(set(slot_indices))
+        with self._engine.begin() as conn:
+            garden_row = self._GardenRow(conn, account, garden.name)
+            if garden_row is not None:
+                conn.execute(plantings.delete().where(and_(
+                    plantings.c.garden_id == garden_row.id,
+                    plantings.c.slot.in_(slot_indices))))
+                self._InsertPlantings(
+                    conn, garden_row.id, garden, slot_indices)
+
+        if garden_row is None:
+            return self.Save(account, garden)
+        self._Changed(account)
+
+    def _InsertPlantings(self, conn, garden_id, garden, slot_indices):
+        """Insert rows for all plants in the given slots of a garden."""
+        rows = []
+        for slot_idx in slot_indices:
+            for plant in garden.slots[slot_idx]:
+                plant_json = plant.Serialize()
+                rows.append(dict(
+                    garden_id=garden_id, slot=slot_idx,
+                    name=plant_json['name'],
+                    plant_date=plant_json['plant_date'],
+                    harvest_date=plant_json['harvest_date'],
+                    plant_ordinal=plant.plant_ordinal,
+                    harvest_ordinal=plant.harvest_ordinal))
+        if rows:
+            conn.execute(self._plantings.insert(), rows)
+
+    def Delete(self, account, name):
+        gardens = self._gardens
+        plantings = self._plantings
+        with self._engine.begin() as conn:
+            garden_row = self._GardenRow(conn, account, name)
+            if garden_row is not None:
+                conn.execute(plantings.delete()
+                             .where(plantings.c.garden_id == garden_row.id))
+                conn.execute(gardens.delete()
+                             .where(gardens.c.id == garden_row.id))
+        self._Changed(account)
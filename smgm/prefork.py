@@ -0,0 +1,241 @@
+"""A pre-forking WSGI server, for running the app in production.
+
+The master process binds the listening socket, runs a preload function (which
+should load everything the workers can share, such as the plant catalog and
+compiled templates), then forks the workers. Memory written before the fork is
+shared by the workers until they change it, so extra workers are cheap. Each
+worker accepts connections itself, and serves them with a fixed pool of
+threads.
+
+Workers are recycled: once a worker has served max_requests requests (plus
+some jitter, so they don't all restart at once), it stops accepting
+connections, finishes the requests it has already accepted, and exits. The
+master forks a replacement for any worker which exits.
+
+Anything a worker changes after the fork is its own. Each worker has its own
+caches (the garden cache, ICS feeds and day indexes), so a cached garden can be
+stale in one worker after another saves it. Only run more than one worker with
+the garden cache off (run.py sets GARDEN_CACHE_TTL to 0 unless it is
+configured). Each worker also records its own metrics; run.py has them shared
+through a directory, so /metrics reports every worker.
+
+The master handles these signals:
+    SIGTERM, SIGINT: Stop. Workers finish their requests first, for up to
+                     graceful_timeout seconds.
+    SIGHUP: Recycle every worker, gracefully.
+"""
+
+import logging
+import os
+import Queue
+import random
+import signal
+import sys
+import threading
+import time
+
+from werkzeug.serving import BaseWSGIServer, make_server
+
+
+## How often the master checks on its workers, and workers check whether they
+## should stop, in seconds.
+_POLL_INTERVAL = 0.5
+
+## The most extra requests (as a fraction of max_requests) a worker serves
+## before it is recycled. This spreads out the workers' restarts.
+_MAX_REQUESTS_JITTER = 0.1
+
+
+class _PooledWSGIServer(BaseWSGIServer):
+    """A WSGI server which serves requests with a fixed pool of threads.
+
+    When every thread is busy, the accepting thread waits rather than accepting
+    more connections, which leaves them to other workers.
+    """
+
+    multiprocess = True
+
+    def __init__(self, host, port, app, threads, fd):
+        super(_PooledWSGIServer, self).__init__(host, port, app, fd=fd)
+        self.multithread = threads > 1
+        self.requests_served = 0
+        self._served_lock = threading.Lock()
+        self._queue = Queue.Queue(maxsize=threads)
+        self._threads = [threading.Thread(target=self._Work)
+                         for _ in xrange(threads)]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def process_request(self, request, client_address):
+        self._queue.put((request, client_address))
+
+    def _Work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                with self._served_lock:
+                    self.requests_served += 1
+
+    def Close(self):
+        """Finish the requests which have been accepted, then stop."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self.server_close()
+
+
+class PreforkServer(object):
+    """Serves an app from several pre-forked worker processes."""
+
+    def __init__(self, app, host, port, workers, threads=1, max_requests=0,
+                 graceful_timeout=30, preload=None, post_fork=None):
+        """Create a new server.
+
+        Args:
+            app: The WSGI app.
+            host: str, The host to listen on.
+            port: int, The port to listen on.
+            workers: int, The number of worker processes.
+            threads: int, The number of threads in each worker.
+            max_requests: int, If non-zero, recycle each worker after it has
+                          served about this many requests.
+            graceful_timeout: float, How long workers get to finish their
+                              requests when stopping, in seconds.
+            preload: callable, Called in the master before forking.
+            post_fork: callable, Called in each worker after it is forked.
+        """
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.threads = threads
+        self.max_requests = max_requests
+        self.graceful_timeout = graceful_timeout
+        self.preload = preload
+        self.post_fork = post_fork
+
+        self._listener = None
+        self._worker_pids = set()
+        self._stopping = False
+        self._recycle = False
+
+    def Serve(self):
+        """Serve until stopped with SIGTERM or SIGINT."""
+        self._listener = make_server(self.host, self.port, self.app)
+        # Every worker waits for connections on the same socket, so one which
+        # loses the race to accept a connection mustn't block.
+        self._listener.socket.setblocking(0)
+        if self.preload is not None:
+            self.preload()
+
+        master_pid = os.getpid()
+        signal.signal(signal.SIGTERM, self._Stop)
+        signal.signal(signal.SIGINT, self._Stop)
+        signal.signal(signal.SIGHUP, self._Recycle)
+        logging.info('Serving on %s:%d with %d workers of %d threads',
+                     self.host, self._listener.server_address[1],
+                     self.workers, self.threads)
+
+        try:
+            while not self._stopping:
+                self._ReapWorkers()
+                if self._recycle:
+                    self._recycle = False
+                    self._SignalWorkers(signal.SIGTERM)
+                while len(self._worker_pids) < self.workers:
+                    self._SpawnWorker()
+                time.sleep(_POLL_INTERVAL)
+        finally:
+            # Workers leave this method by exiting, and mustn't clean up.
+            if os.getpid() == master_pid:
+                self._StopWorkers()
+                self._listener.server_close()
+
+    def _Stop(self, signum, frame):
+        self._stopping = True
+
+    def _Recycle(self, signum, frame):
+        self._recycle = True
+
+    def _SignalWorkers(self, signum):
+        for pid in self._worker_pids:
+            try:
+                os.kill(pid, signum)
+            except OSError:
+                pass  # It has already exited.
+
+    def _ReapWorkers(self):
+        """Forget about workers which have exited."""
+        while self._worker_pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError:
+                return
+            if pid == 0:
+                return
+            self._worker_pids.discard(pid)
+            if status and not self._stopping:
+                logging.warning('Worker %d exited with status %d', pid, status)
+
+    def _StopWorkers(self):
+        """Stop every worker, gracefully if they stop in time."""
+        self._SignalWorkers(signal.SIGTERM)
+        deadline = time.time() + self.graceful_timeout
+        while self._worker_pids and time.time() < deadline:
+            self._ReapWorkers()
+            time.sleep(0.05)
+
+        self._SignalWorkers(signal.SIGKILL)
+        while self._worker_pids:
+            pid, _ = os.waitpid(-1, 0)
+            self._worker_pids.discard(pid)
+
+    def _SpawnWorker(self):
+        pid = os.fork()
+        if pid:
+            self._worker_pids.add(pid)
+            return
+
+        status = 0
+        try:
+            self._RunWorker()
+        except Exception:
+            logging.exception('Worker %d failed', os.getpid())
+            status = 1
+        # Exit normally (not with os._exit()), so that exit handlers run and
+        # background saves are finished.
+        sys.exit(status)
+
+    def _RunWorker(self):
+        """Serve requests until told to stop, or until it's time to recycle."""
+        self._worker_pids = set()
+        signal.signal(signal.SIGTERM, self._Stop)
+        signal.signal(signal.SIGINT, self._Stop)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        random.seed()
+        if self.post_fork is not None:
+            self.post_fork()
+
+        max_requests = self.max_requests
+        if max_requests:
+            max_requests += random.randint(
+                0, int(max_requests * _MAX_REQUESTS_JITTER))
+
+        server = _PooledWSGIServer(self.host, self.port, self.app,
+                                   self.threads, self._listener.fileno())
+        server.timeout = _POLL_INTERVAL
+        while not self._stopping and (
+                not max_requests or server.requests_served < max_requests):
+            server.handle_request()
+        server.Close()
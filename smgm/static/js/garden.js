@@ -6,14 +6,33 @@
  */
 var _VIEW_DATE = moment().startOf('day');
 
+/**
+ * The plant catalog, keyed by plant name. This is loaded from _PLANTS_URL when
+ * the page is set up; the URL is versioned, so it is usually in the browser
+ * cache already.
+ *
+ * @type       {Object}
+ */
+var _PLANTS = {};
+
+/**
+ * Convert the dates of the plants in some slots into actual dates.
+ *
+ * @class      ParseSlotDates (name)
+ * @param      {Array}  slots   The slots, as loaded from JSON.
+ */
+function ParseSlotDates(slots) {
+  $.each(slots, function(_, slot) {
+    $.each(slot, function(_, plant) {
+      plant.plant_date = StringToDate(plant.plant_date);
+      plant.harvest_date = StringToDate(plant.harvest_date);
+    });
+  });
+};
+
 // Load the _GARDEN variable; convert the dates into actual dates. This can be
 // done before the page load, so why not?
-$.each(_GARDEN.slots, function(_, slot) {
-  $.each(slot, function(_, plant) {
-    plant.plant_date = StringToDate(plant.plant_date);
-    plant.harvest_date = StringToDate(plant.harvest_date);
-  });
-});
+ParseSlotDates(_GARDEN.slots);
 
 /**
  * Utility function to convert a JS Garden object into a plain-old-data
@@ -364,9 +383,11 @@ function UpdatePlantPicker() {
 };
 
 /**
- * Setup the page.
+ * Setup the page. This should be called once the plant catalog has loaded.
+ *
+ * @class      SetupPage (name)
  */
-$(function() {
+function SetupPage() {
   ///
   /// Left navbar setup.
   ///
@@ -468,4 +489,100 @@ $(function() {
 
   // Fade out the loading splash and let the user start!
   $('#loading-splash').fadeOut('slow');
+};
+
+/**
+ * Add a chunk of slots (as returned by /api/garden/<name>/slots) to the garden,
+ * its progress bars and its grid. Chunks must be added in order, and each must
+ * hold whole rows of the garden.
+ *
+ * @class      AddSlotChunk (name)
+ * @param      {Object}  chunk   The chunk of slots, and their layout.
+ */
+function AddSlotChunk(chunk) {
+  ParseSlotDates(chunk.slots);
+
+  var slot_template = $.trim($('#slot-template').html());
+  var $slot_bars = $('#slot-bars');
+  var $garden = $('#garden');
+  var $row = null;
+  $.each(chunk.slots, function(i, slot) {
+    var slot_idx = chunk.start + i;
+    _GARDEN.slots[slot_idx] = slot;
+
+    // The progress bar for the slot, laid out by the server.
+    var $progress = $('<div />').addClass('progress');
+    $.each(slot, function(plant_idx, plant) {
+      var progress = chunk.layout[i][plant_idx];
+      $progress.append($('<div />')
+                           .addClass('padding')
+                           .addClass('progress-bar')
+                           .css('width', progress[0] + '%'));
+      var $plant_bar = $('<div />')
+                           .addClass('progress-bar')
+                           .css('width', progress[1] + '%')
+                           .text(plant.name);
+      if (plant_idx % 2 == 0) {
+        $plant_bar.addClass('progress-bar-success');
+      }
+      $progress.append($plant_bar);
+    });
+    $slot_bars.append($progress);
+
+    // The slot itself, starting a new row at each width boundary.
+    if (slot_idx % _GARDEN.width == 0) {
+      $row = $('<div />').addClass('row').appendTo($garden);
+    }
+    $(slot_template).attr('id', sprintf('slot-%d', slot_idx)).appendTo($row);
+  });
+};
+
+/**
+ * Load the slots of the garden a chunk at a time, if the page didn't include
+ * them (see _GARDEN_CHUNKS). Each chunk is shown as soon as it arrives.
+ *
+ * @class      LoadGarden (name)
+ * @return     {Object} A promise which is resolved once every slot is loaded.
+ */
+function LoadGarden() {
+  var loaded = $.Deferred();
+  if (!_GARDEN_CHUNKS) {
+    return loaded.resolve().promise();
+  }
+
+  var LoadChunk = function(start) {
+    $.getJSON(_GARDEN_CHUNKS.url, {start: start, count: _GARDEN_CHUNKS.size})
+        .done(function(chunk) {
+          AddSlotChunk(chunk);
+          UpdateSlots();
+          $('#loading-splash').fadeOut('slow');
+
+          if (chunk.end < chunk.total) {
+            LoadChunk(chunk.end);
+          } else {
+            loaded.resolve();
+          }
+        })
+        .fail(function(resp) {
+          var error = resp.responseJSON ? resp.responseJSON.error :
+                                          'Could not load the garden.';
+          $('#error').text(error).show();
+          $('#loading-splash').fadeOut('slow');
+          loaded.reject();
+        });
+  };
+
+  LoadChunk(0);
+  return loaded.promise();
+};
+
+/**
+ * Load the plant catalog and the garden, then setup the page. Plants can only
+ * be sown once the whole garden has loaded, as sowing saves the whole garden.
+ */
+$(function() {
+  $.when($.getJSON(_PLANTS_URL), LoadGarden()).done(function(plants) {
+    _PLANTS = plants[0];
+    SetupPage();
+  });
 });
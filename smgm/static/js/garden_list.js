@@ -18,6 +18,8 @@ $(function() {
         // Copy a input group.
         $new_input_group = $('.garden').first().clone();
         $new_input_group.find('.btn-success').text(name);
+        $new_input_group.find('.garden-summary').text(
+            width + 'x' + height + ', 0 plantings');
         $('#gardens').append($new_input_group);
         $('.alert-danger').hide();
       } else {
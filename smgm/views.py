@@ -1,10 +1,60 @@
 from smgm import app
-from flask import render_template, abort
+from flask import (Response, render_template, request, abort, url_for,
+                   stream_with_context)
+from flask.signals import before_render_template, template_rendered
 from flask_stormpath import login_required, user
 
-from smgm.models.garden import Garden
+from smgm.models.garden_store import GetGardenStore
+from smgm.models.plant_catalog import GetCatalog
 
-import json
+
+## Rendered pages are streamed in pieces of about this many bytes.
+_STREAM_BUFFER_SIZE = 8 * 1024
+
+## Gardens with more slots than this load their grid a chunk of about this many
+## slots at a time, after the page has loaded (see the GARDEN_PAGE_CHUNK_SLOTS
+## config option). Set to 0 to always render the whole grid into the page.
+_DEFAULT_PAGE_CHUNK_SLOTS = 100
+
+
+def _Buffered(pieces, size):
+    """Join small pieces of text into pieces of at least size characters."""
+    buffered = []
+    length = 0
+    for piece in pieces:
+        buffered.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield u''.join(buffered)
+            buffered = []
+            length = 0
+    if buffered:
+        yield u''.join(buffered)
+
+
+def _Generate(template, context):
+    """Render a template piece by piece.
+
+    This sends the same signals as render_template(), so streamed pages are
+    timed in /metrics too. Their time includes any time spent waiting to send
+    the pieces.
+    """
+    before_render_template.send(app, template=template, context=context)
+    for piece in template.generate(context):
+        yield piece
+    template_rendered.send(app, template=template, context=context)
+
+
+def _StreamTemplate(template_name, **context):
+    """Render a template as it is sent, rather than all at once.
+
+    Everything before the first expensive part of the template reaches the
+    browser straight away, and the page is never held in memory whole.
+    """
+    app.update_template_context(context)
+    template = app.jinja_env.get_template(template_name)
+    return Response(stream_with_context(
+        _Buffered(_Generate(template, context), _STREAM_BUFFER_SIZE)))
 
 
 @app.route('/')
@@ -15,25 +65,45 @@ def index():
 @app.route('/garden')
 @login_required
 def gardens():
-    gardens_json = user.custom_data.get('gardens', {})
-    gardens = [garden for garden in gardens_json.values()]
     return render_template('garden_list.html',
-                           gardens=sorted(gardens, key=lambda g: g['name']))
+                           gardens=GetGardenStore().Summaries(user))
 
 
 @app.route('/garden/<string:name>')
 @login_required
 def garden(name):
-    gardens_json = user.custom_data.get('gardens', {})
-    gardens = {name: Garden.Load(json) for name, json in gardens_json.items()}
-    if name not in gardens:
+    """The page for a single garden.
+
+    Large gardens load their grid in chunks from get_garden_slots(); ?chunked=1
+    or ?chunked=0 overrides this.
+    """
+    # Whether to chunk only depends on the size, so no plants are loaded yet.
+    garden = GetGardenStore().LoadSlots(user, name, ())
+    if garden is None:
         abort(404)
 
-    # Load the plant information.
-    plants = json.load(open('plants.json', 'rU'))
+    chunk_slots = app.config.get('GARDEN_PAGE_CHUNK_SLOTS',
+                                 _DEFAULT_PAGE_CHUNK_SLOTS)
+    chunked = bool(chunk_slots) and len(garden.slots) > chunk_slots
+    if 'chunked' in request.args:
+        chunked = request.args['chunked'] not in ('0', 'false')
+
+    chunks = None
+    if not chunked:
+        garden = GetGardenStore().Load(user, name)
+        if garden is None:
+            abort(404)
+    else:
+        # Chunks are whole rows, so each can be added to the grid as it comes.
+        chunks = dict(
+            url=url_for('get_garden_slots', name=garden.name),
+            size=max(1, (chunk_slots or _DEFAULT_PAGE_CHUNK_SLOTS) //
+                   garden.width) * garden.width)
 
-    return render_template('garden.html',
-                           garden=gardens[name],
-                           garden_json=json.dumps(gardens[name].Serialize()),
-                           plants=plants,
-                           plants_json=json.dumps(plants))
+    catalog = GetCatalog()
+    return _StreamTemplate('garden.html',
+                           garden=garden,
+                           chunks=chunks,
+                           plant_names=catalog.names,
+                           plants_url=url_for('get_plants_version',
+                                              version=catalog.version))
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for the garden model and the request paths which use it.
+
+Synthetic gardens are built with a configurable size and number of plantings
+per slot, then each operation is timed several times. The results are written
+as JSON so that runs can be compared, e.g.
+
+    python tools/benchmark.py --output before.json
+    ... make some changes ...
+    python tools/benchmark.py --compare before.json
+
+Requests are made through the Flask test client, logged in as a local account
+(see local_account) whose gardens are kept in memory.
+"""
+
+from __future__ import print_function
+
+import datetime
+import gc
+import json
+import optparse
+import os
+import platform
+import random
+import sys
+import time
+
+_ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, _ROOT_DIR)
+
+# The models are only imported through the package, as the app imports them,
+# so there is one copy of each module (and of its caches).
+from icalendar import Calendar
+from smgm.models.garden import Garden
+from smgm.models.local_account import LocalAccountDirectory
+from smgm.models.plant_catalog import GetCatalog
+from smgm.models.planner import Plan, PlanRequest
+
+
+## The first date plantings are made on.
+_START_DATE = datetime.date(2017, 1, 1)
+
+## The range of the number of days each synthetic planting is in the ground.
+_MIN_GROWTH_DAYS = 20
+_MAX_GROWTH_DAYS = 90
+
+## Plants used in synthetic gardens.
+_PLANT_NAMES = ['Beans', 'Carrot', 'Lettuce', 'Potato', 'Tomato']
+
+## Catalog plants the planner fills an empty garden with, and for how long.
+_PLAN_PLANTS = ['Beans - dwarf', 'Carrot', 'Tomato']
+_PLAN_DAYS = 2 * 365
+
+## The href of the account the request benchmarks are logged in as.
+_ACCOUNT_HREF = 'https://api.stormpath.com/v1/accounts/benchmark'
+
+## The default fraction a benchmark can slow down by before --compare fails.
+_DEFAULT_THRESHOLD = 0.2
+
+
+def MakeGardenJson(name, width, height, plantings_per_slot, seed=0):
+    """Make the JSON for a valid garden full of plants.
+
+    Each slot holds a back-to-back sequence of plantings, starting from
+    _START_DATE. The dates are written the way the web UI writes them.
+
+    Args:
+        name: str, The name of the garden.
+        width: int, The width of the garden.
+        height: int, The height of the garden.
+        plantings_per_slot: int, The number of plants in each slot.
+        seed: int, Seeds the random growth times, so gardens are repeatable.
+
+    Returns:
+        dict, The garden JSON, as accepted by Garden.Load().
+    """
+    rand = random.Random(seed)
+    slots = []
+    for _ in xrange(width * height):
+        slot = []
+        date = _START_DATE
+        for _ in xrange(plantings_per_slot):
+            harvest = date + datetime.timedelta(
+                days=rand.randint(_MIN_GROWTH_DAYS, _MAX_GROWTH_DAYS))
+            slot.append(dict(
+                name=rand.choice(_PLANT_NAMES),
+                plant_date=date.strftime('%Y-%m-%dT00:00:00+11:00'),
+                harvest_date=harvest.strftime('%Y-%m-%dT00:00:00+11:00')))
+            date = harvest
+        slots.append(slot)
+    return dict(name=name, width=width, height=height, slots=slots)
+
+
+def TimeIt(func, repeat):
+    """Time a function.
+
+    Args:
+        func: callable, The function to time; called with no arguments.
+        repeat: int, The number of times to call it.
+
+    Returns:
+        dict, The min, median and mean time per call, in milliseconds.
+    """
+    times = []
+    gc.collect()
+    for _ in xrange(repeat):
+        start = time.time()
+        func()
+        times.append((time.time() - start) * 1000)
+
+    times.sort()
+    return dict(min=times[0], median=times[len(times) // 2],
+                mean=sum(times) / len(times), repeat=repeat)
+
+
+def BenchmarkModel(garden_json, repeat):
+    """Time the operations on a single garden.
+
+    Returns:
+        dict of str --> dict, The timings of each operation (see TimeIt()).
+    """
+    garden = Garden.Load(garden_json)
+
+    def ProgressForAll():
+        # This is what rendering the garden page used to do; each call lays
+        # out the whole slot up to the plant.
+        for slot_idx, slot in enumerate(garden.slots):
+            for plant_idx in xrange(len(slot)):
+                garden.ProgressFor(slot_idx, plant_idx)
+
+    def AddEvents():
+        cal = Calendar()
+        garden.AddEvents(cal)
+        return cal.to_ical()
+
+    def PlanEmptyGarden():
+        return Plan(Garden('Plan', garden.width, garden.height),
+                    GetCatalog().plants,
+                    [PlanRequest(name, None) for name in _PLAN_PLANTS],
+                    _START_DATE,
+                    _START_DATE + datetime.timedelta(days=_PLAN_DAYS))
+
+    compact_json = garden.SerializeCompact()
+    return {
+        'garden.Load': TimeIt(lambda: Garden.Load(garden_json), repeat),
+        'garden.Load(compact)': TimeIt(lambda: Garden.Load(compact_json),
+                                       repeat),
+        'garden.Serialize': TimeIt(garden.Serialize, repeat),
+        'garden.SerializeCompact': TimeIt(garden.SerializeCompact, repeat),
+        'garden.Layout': TimeIt(garden.Layout, repeat),
+        'garden.ProgressFor': TimeIt(ProgressForAll, repeat),
+        'garden.NotValidReason': TimeIt(garden.NotValidReason, repeat),
+        'garden.AddEvents': TimeIt(AddEvents, repeat),
+        'planner.Plan': TimeIt(PlanEmptyGarden, repeat),
+    }
+
+
+def _MakeClient(account):
+    """Get a test client for the app, logged in as account.
+
+    Stormpath is never contacted: the account is set as the current user before
+    each request, and is returned whenever the app looks up an account.
+    """
+    from flask import _request_ctx_stack
+    from flask_stormpath import StormpathManager
+    from smgm import create_app
+
+    app = create_app()
+    StormpathManager.load_user = staticmethod(lambda href: account)
+
+    @app.before_request
+    def LogIn():
+        _request_ctx_stack.top.user = account
+
+    return app.test_client()
+
+
+def BenchmarkRequests(garden_json, repeat):
+    """Time the requests which load, render and save a garden.
+
+    Returns:
+        dict of str --> dict, The timings of each request (see TimeIt()).
+    """
+    from smgm.models import ics_feed
+    from smgm.models.garden_store import GetGardenStore
+    from smgm import create_app
+
+    app = create_app()
+    account = LocalAccountDirectory().Get(_ACCOUNT_HREF)
+    client = _MakeClient(account)
+    name = garden_json['name']
+    with app.app_context():
+        GetGardenStore().Save(account, Garden.Load(garden_json))
+
+    garden_body = json.dumps(garden_json)
+    slot_edit = json.dumps(dict(edits=[dict(
+        op='add', plant=dict(name='Beans', plant_date='2100-01-01',
+                             harvest_date='2100-03-01'))]))
+    account_id = _ACCOUNT_HREF.rsplit('/', 1)[1]
+
+    def Request(method, url, data=None):
+        def Do():
+            response = client.open(url, method=method, data=data,
+                                   content_type='application/json')
+            response.get_data()
+            assert response.status_code == 200, (url, response.status_code)
+        return Do
+
+    def IcsCold():
+        ics_feed._cache.Clear()
+        Request('GET', '/api/gardens/ics/%s' % account_id)()
+
+    return {
+        'views.garden': TimeIt(Request('GET', '/garden/%s' % name), repeat),
+        'views.gardens': TimeIt(Request('GET', '/garden'), repeat),
+        'garden_api.get_garden': TimeIt(
+            Request('GET', '/api/garden/%s' % name), repeat),
+        'garden_api.get_garden.all': TimeIt(
+            Request('GET', '/api/garden'), repeat),
+        'garden_api.put_garden': TimeIt(
+            Request('PUT', '/api/garden/%s' % name, garden_body), repeat),
+        # Remove the added plant again, so every run edits the same garden.
+        'garden_api.patch_garden_slots': TimeIt(lambda: (
+            Request('PATCH', '/api/garden/%s/slots/0' % name, slot_edit)(),
+            Request('PATCH', '/api/garden/%s/slots/0' % name,
+                    slot_edit.replace('"add"', '"remove"'))()), repeat),
+        'garden_api.get_gardens_ics_for_user': TimeIt(IcsCold, repeat),
+        'garden_api.get_gardens_ics_for_user.cached': TimeIt(
+            Request('GET', '/api/gardens/ics/%s' % account_id), repeat),
+    }
+
+
+def Compare(baseline, results, threshold):
+    """Compare two sets of results, printing a line per benchmark.
+
+    Args:
+        baseline: dict, The output of an earlier run.
+        results: dict, The output of this run.
+        threshold: float, The fraction a benchmark's median can slow down by
+                   before it counts as a regression.
+
+    Returns:
+        list of str, The names of the benchmarks which regressed.
+    """
+    regressions = []
+    for name, timing in sorted(results['benchmarks'].iteritems()):
+        old_timing = baseline['benchmarks'].get(name)
+        if old_timing is None:
+            print('%-48s %10.2fms (new)' % (name, timing['median']))
+            continue
+
+        ratio = timing['median'] / max(old_timing['median'], 1e-6)
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(name)
+        print('%-48s %10.2fms -> %10.2fms  x%.2f%s' % (
+            name, old_timing['median'], timing['median'], ratio,
+            '  REGRESSION' if regressed else ''))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser()
+    parser.add_option('-W', '--width', type='int', default=10,
+                      help='Width of the synthetic garden [default %default]')
+    parser.add_option('-H', '--height', type='int', default=10,
+                      help='Height of the synthetic garden [default %default]')
+    parser.add_option('-p', '--plantings', type='int', default=20,
+                      help='Plantings per slot [default %default]')
+    parser.add_option('-n', '--repeat', type='int', default=10,
+                      help='Times to run each benchmark [default %default]')
+    parser.add_option('--no-requests', action='store_true',
+                      help='Only benchmark the model, not the app')
+    parser.add_option('-o', '--output',
+                      help='Write the results to this file (default stdout)')
+    parser.add_option('-c', '--compare',
+                      help='Compare against the results in this file, and '
+                           'exit with an error if anything regressed')
+    parser.add_option('-t', '--threshold', type='float',
+                      default=_DEFAULT_THRESHOLD,
+                      help='Allowed slowdown for --compare [default %default]')
+    options, _ = parser.parse_args()
+
+    garden_json = MakeGardenJson('Benchmark', options.width, options.height,
+                                 options.plantings)
+    benchmarks = BenchmarkModel(garden_json, options.repeat)
+    if not options.no_requests:
+        benchmarks.update(BenchmarkRequests(garden_json, options.repeat))
+
+    results = dict(
+        python=platform.python_version(),
+        time=datetime.datetime.utcnow().isoformat(),
+        params=dict(width=options.width, height=options.height,
+                    plantings=options.plantings, repeat=options.repeat),
+        benchmarks=benchmarks)
+
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+    elif not options.compare:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+    if options.compare:
+        with open(options.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline['params'] != results['params']:
+            print('Warning: comparing runs with different parameters')
+        if Compare(baseline, results, options.threshold):
+            sys.exit(1)
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""Checks that the app still starts quickly.
+
+Each run starts a fresh Python process which creates the app (see
+smgm.create_app()) and makes its first request through the Flask test client,
+which is when Stormpath is set up. The fastest of several runs is compared
+against a time budget, and the check fails if
+
+  - creating the app and serving the first response took longer than the
+    budget, or
+  - creating the app imported any of the modules which should only be imported
+    when they are first used (NumPy, SQLAlchemy, icalendar and dateutil).
+
+e.g.
+
+    python tools/check_startup.py --budget-ms 750
+"""
+
+from __future__ import print_function
+
+import json
+import optparse
+import os
+import subprocess
+import sys
+
+_ROOT_DIR = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+## The default time budget for creating the app and serving the first request,
+## in milliseconds.
+_DEFAULT_BUDGET_MS = 1000
+
+## Modules which creating the app mustn't import.
+_DEFERRED_MODULES = ('numpy', 'sqlalchemy', 'icalendar', 'dateutil')
+
+## The program run in each fresh process. It prints the timings, and which of
+## the deferred modules were imported, as JSON.
+_CHILD = r'''
+import json
+import sys
+import time
+
+start = time.time()
+sys.path.insert(0, %(root)r)
+import smgm
+app = smgm.create_app()
+created = time.time()
+imported = sorted(name for name in %(deferred)r if name in sys.modules)
+
+response = app.test_client().get(%(path)r)
+first_response = time.time()
+
+print(json.dumps(dict(
+    create_ms=(created - start) * 1000,
+    first_response_ms=(first_response - start) * 1000,
+    status=response.status_code,
+    imported=imported)))
+'''
+
+
+def MeasureStartup(path):
+    """Create the app and request path in a fresh process.
+
+    Returns:
+        dict, The time taken to create the app (create_ms) and to serve the
+        first response (first_response_ms) in milliseconds, the status of the
+        response, and which deferred modules creating the app imported.
+    """
+    child = _CHILD % dict(root=_ROOT_DIR, deferred=_DEFERRED_MODULES,
+                          path=path)
+    output = subprocess.check_output([sys.executable, '-c', child])
+    return json.loads(output.splitlines()[-1])
+
+
+def CheckStartup(runs, budget_ms):
+    """Check the startup time and imports, and print the results.
+
+    Returns:
+        list of str, A description of each problem found.
+    """
+    problems = []
+    best = min(runs, key=lambda run: run['first_response_ms'])
+    print('Created the app in %.1f ms; first response (%d) after %.1f ms '
+          '(best of %d, budget %d ms)' % (
+              best['create_ms'], best['status'], best['first_response_ms'],
+              len(runs), budget_ms))
+
+    if best['first_response_ms'] > budget_ms:
+        problems.append('The first response took %.1f ms, over the budget of '
+                        '%d ms' % (best['first_response_ms'], budget_ms))
+    if best['status'] >= 500:
+        problems.append('The first response failed (%d)' % best['status'])
+    imported = sorted(set(name for run in runs for name in run['imported']))
+    if imported:
+        problems.append('Creating the app imported %s' % ', '.join(imported))
+    return problems
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser()
+    parser.add_option('-b', '--budget-ms', type='int',
+                      default=_DEFAULT_BUDGET_MS,
+                      help='Time allowed until the first response, in '
+                           'milliseconds [default %default]')
+    parser.add_option('-n', '--runs', type='int', default=5,
+                      help='Number of fresh processes to start; the fastest '
+                           'is checked [default %default]')
+    parser.add_option('--path', default='/',
+                      help='The URL of the first request [default %default]')
+    options, _ = parser.parse_args()
+
+    runs = [MeasureStartup(options.path) for run in xrange(options.runs)]
+    problems = CheckStartup(runs, options.budget_ms)
+    for problem in problems:
+        print('FAILED: %s' % problem)
+    if problems:
+        sys.exit(1)
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""Measures how throughput scales with the number of pre-forked workers.
+
+For each worker count, run.py is started in production mode (see
+smgm.prefork) on a free port, then several client processes request a page as
+fast as they can for a while. The requests per second, the speedup over the
+first worker count, and the median and 99th percentile latencies are printed,
+e.g.
+
+    python tools/loadtest.py --workers 1,2,4 --clients 16 --duration 10
+
+Only pages which don't need a login can be requested; the default is a catalog
+search, which is CPU bound and so should scale with the number of cores.
+"""
+
+from __future__ import print_function
+
+import httplib
+import multiprocessing
+import optparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+_ROOT_DIR = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+## How long to wait for the server to start, in seconds.
+_START_TIMEOUT = 30
+
+
+def _FreePort():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def _Get(port, path):
+    """Request path, and return the response status."""
+    connection = httplib.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+def StartServer(workers, threads):
+    """Start run.py with some workers, and wait until it is serving.
+
+    Returns:
+        tuple of (subprocess.Popen, int), The server and its port.
+    """
+    port = _FreePort()
+    # Logging every request would slow the server down.
+    devnull = open(os.devnull, 'w')
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(_ROOT_DIR, 'run.py'),
+         '--port', str(port), '--workers', str(workers),
+         '--threads', str(threads)],
+        cwd=_ROOT_DIR, stdout=devnull, stderr=devnull)
+
+    deadline = time.time() + _START_TIMEOUT
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError('The server exited with %d' % server.returncode)
+        try:
+            _Get(port, '/')
+            return server, port
+        except (IOError, httplib.HTTPException):
+            time.sleep(0.1)
+
+    StopServer(server)
+    raise RuntimeError('The server did not start in %ds' % _START_TIMEOUT)
+
+
+def StopServer(server):
+    """Stop the server gracefully, and wait for it to exit."""
+    server.send_signal(signal.SIGTERM)
+    server.wait()
+
+
+def _Client(args):
+    """Make requests until the time is up (in a client process).
+
+    Returns:
+        tuple of (list of float, int), The latency of each successful request
+        in milliseconds, and the number of failed requests.
+    """
+    port, path, end = args
+    latencies = []
+    errors = 0
+    while time.time() < end:
+        start = time.time()
+        try:
+            status = _Get(port, path)
+        except (IOError, httplib.HTTPException):
+            status = None
+        if status == 200:
+            latencies.append((time.time() - start) * 1000)
+        else:
+            errors += 1
+    return latencies, errors
+
+
+def _Percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def LoadTest(port, path, clients, duration):
+    """Request path from several processes at once.
+
+    Returns:
+        dict, The requests per second (rps), the median and 99th percentile
+        latencies in milliseconds (p50 and p99), and the number of failed
+        requests (errors).
+    """
+    pool = multiprocessing.Pool(clients)
+    try:
+        # The clients all stop at the same time, however long they took to
+        # start.
+        end = time.time() + 1 + duration
+        results = pool.map(_Client, [(port, path, end)] * clients)
+    finally:
+        pool.close()
+        pool.join()
+
+    latencies = sorted(latency for result in results for latency in result[0])
+    if not latencies:
+        raise RuntimeError('Every request to %s failed' % path)
+    return dict(rps=len(latencies) / float(duration),
+                p50=_Percentile(latencies, 0.5),
+                p99=_Percentile(latencies, 0.99),
+                errors=sum(result[1] for result in results))
+
+
+def _DefaultWorkers():
+    """1, 2, 4... up to the number of cores."""
+    counts = [1]
+    while counts[-1] * 2 <= multiprocessing.cpu_count():
+        counts.append(counts[-1] * 2)
+    if counts[-1] != multiprocessing.cpu_count():
+        counts.append(multiprocessing.cpu_count())
+    return ','.join(str(count) for count in counts)
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser()
+    parser.add_option('-w', '--workers', default=_DefaultWorkers(),
+                      help='Comma-separated worker counts to try '
+                           '[default %default, up to the number of cores]')
+    parser.add_option('-t', '--threads', type='int', default=4,
+                      help='Threads per worker [default %default]')
+    parser.add_option('-c', '--clients', type='int',
+                      default=4 * multiprocessing.cpu_count(),
+                      help='Number of client processes [default %default]')
+    parser.add_option('-d', '--duration', type='float', default=10,
+                      help='Seconds to run each test for [default %default]')
+    parser.add_option('--path', default='/api/plants/search?q=c',
+                      help='The URL to request [default %default]')
+    options, _ = parser.parse_args()
+
+    print('%d cores, %d clients, %s' % (
+        multiprocessing.cpu_count(), options.clients, options.path))
+    print('%8s %10s %8s %10s %10s %8s' % (
+        'workers', 'req/s', 'speedup', 'p50 ms', 'p99 ms', 'errors'))
+    baseline = None
+    for workers in [int(count) for count in options.workers.split(',')]:
+        server, port = StartServer(workers, options.threads)
+        try:
+            result = LoadTest(port, options.path, options.clients,
+                              options.duration)
+        finally:
+            StopServer(server)
+
+        baseline = baseline or result['rps']
+        print('%8d %10.1f %7.2fx %10.1f %10.1f %8d' % (
+            workers, result['rps'], result['rps'] / baseline, result['p50'],
+            result['p99'], result['errors']))
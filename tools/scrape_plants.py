@@ -3,24 +3,41 @@ from __future__ import print_function
 
 from bs4 import BeautifulSoup
 
+import hashlib
 import json
+import optparse
 import os
 import re
 import string
 import sys
 import urllib2
+import urlparse
+
+from multiprocessing.pool import ThreadPool
+
+# The catalog module has no dependencies on the rest of the app, so import it
+# directly rather than through the smgm package (which sets up the web app).
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, 'smgm', 'models'))
+from plant_catalog import PlantCatalog
 
 
 ## The root of the information source to scrape.
 _ROOT = 'http://www.gardenate.com'
 
-## The page which contains a list of plants. This can be used to find which
-## plants we can get information about.
-_LIST_PAGE = _ROOT + '/plants'
+## The path of the page which contains a list of plants. This can be used to
+## find which plants we can get information about.
+_LIST_PATH = '/plants'
 
 ## Suffix to add to the final page.
 _PAGE_ARGS = '?zone=3'
 
+## The default number of pages to fetch at once.
+_DEFAULT_THREADS = 8
+
+## The default directory to cache fetched pages in.
+_DEFAULT_CACHE_DIR = '.scrape_cache'
+
 
 def GetPlantInfo(information_div, css_class):
     """Extract the plant info from information_div with class css_class."""
@@ -38,7 +55,7 @@ def FindFirstWordInList(list, keys):
         if key in keys:
             return i, key
 
-    return -1
+    return -1, None
 
 
 def FindTimeRange(harvest_str):
@@ -96,65 +113,236 @@ def FindTimeRange(harvest_str):
     return (start, end)
 
 
-if __name__ == '__main__':
-    # Load a list of plants from the list page.
-    soup = BeautifulSoup(urllib2.urlopen(_LIST_PAGE).read(), 'html.parser')
-    plant_urls = [plant_div.find('a')
-                  for plant_div in soup.find_all('div', class_='plant')]
+class PageFetcher(object):
+    """Fetches pages over HTTP, keeping a copy of each page on disk.
+
+    Cached pages are revalidated with a conditional request (using the ETag and
+    Last-Modified headers from when they were fetched), so unchanged pages are
+    not downloaded again. In offline mode, the cache is used without making any
+    requests.
+    """
+
+    def __init__(self, cache_dir, offline=False):
+        self.cache_dir = cache_dir
+        self.offline = offline
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+    def _CachePath(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url).hexdigest())
+
+    def Fetch(self, url):
+        """Get the contents of the page at url."""
+        path = self._CachePath(url)
+        headers = {}
+        if os.path.exists(path + '.json'):
+            with open(path + '.json') as headers_file:
+                headers = json.load(headers_file)
+            if self.offline:
+                with open(path) as page_file:
+                    return page_file.read()
+        elif self.offline:
+            raise IOError('Page %s is not in the cache' % url)
+
+        request = urllib2.Request(url)
+        if headers.get('etag'):
+            request.add_header('If-None-Match', headers['etag'])
+        if headers.get('last_modified'):
+            request.add_header('If-Modified-Since', headers['last_modified'])
+
+        try:
+            response = urllib2.urlopen(request)
+        except urllib2.HTTPError as e:
+            if e.code != 304:
+                raise
+            with open(path) as page_file:
+                return page_file.read()
+
+        page = response.read()
+        with open(path, 'wb') as page_file:
+            page_file.write(page)
+        with open(path + '.json', 'w') as headers_file:
+            json.dump(dict(etag=response.info().getheader('ETag'),
+                           last_modified=response.info().getheader(
+                               'Last-Modified')), headers_file)
+        return page
+
+
+class DirectoryFetcher(object):
+    """Reads pages from a directory of saved HTML pages.
+
+    The directory mirrors the paths of the site, e.g. the page for
+    http://www.gardenate.com/plant/Taro?zone=3 is saved as plant/Taro.
+    """
+
+    def __init__(self, pages_dir):
+        self.pages_dir = pages_dir
+
+    def Fetch(self, url):
+        """Get the contents of the page at url."""
+        path = urlparse.urlparse(url).path.strip('/')
+        with open(os.path.join(self.pages_dir, *path.split('/'))) as page_file:
+            return page_file.read()
+
+
+def FindPlantUrls(list_page, root=_ROOT):
+    """Find the (name, url) of each plant linked from the plant list page."""
+    soup = BeautifulSoup(list_page, 'html.parser')
+    for plant_div in soup.find_all('div', class_='plant'):
+        plant_url = plant_div.find('a')
+        yield (plant_url.string,
+               urlparse.urljoin(root, plant_url.get('href')) + _PAGE_ARGS)
+
+
+def ParsePlantPage(page, name, url):
+    """Extract the information about a plant from its page.
+
+    Args:
+        page: str, The HTML of the plant page.
+        name: str, The name of the plant.
+        url: str, The URL the page was fetched from.
+
+    Returns:
+        dict, The catalog entry for the plant.
+    """
+    plant_soup = BeautifulSoup(page, 'html.parser')
+
+    # 1. Extract the calendar.
+    calendar_raw = plant_soup.find(
+        'div', id='calendar').table.find_all('tr')[1].find_all('td')
 
-    # Load the plants dictionary. If there is already a file on disk, then use
-    # that, otherwise just default to an empty map.
+    assert len(calendar_raw) == 12
+    calendar = [month.string.strip() for month in calendar_raw]
+
+    # 2. Extract useful information.
+    info = plant_soup.find('div', class_='info').ul
+
+    sowing = GetPlantInfo(info, 'sowing')
+    spacing = GetPlantInfo(info, 'spacing')
+    harvest = GetPlantInfo(info, 'harvest')
+    companion = GetPlantInfo(info, 'companion')
+
+    # Convert the harvest into a pair, of the max/min days before harvest.
+    harvest_start, harvest_end = FindTimeRange(harvest)
+
+    return dict(
+        name=name,
+        url=url,
+        calendar=calendar,
+        harvest_start=harvest_start,
+        harvest_end=harvest_end,
+        sowing=sowing,
+        spacing=spacing,
+        harvest=harvest,
+        companion=companion,
+    )
+
+
+def LoadPlants(output_path):
+    """Load the plants scraped so far.
+
+    This is the catalog at output_path, plus any plants in its journal (left
+    behind by a scrape which didn't finish).
+    """
     plants = {}
-    if os.path.exists('plants.json'):
-        plants = json.load(open('plants.json', 'rU'))
-
-    # For each plant...
-    for plant_url in plant_urls:
-        # Get details about the plant.
-        url = _ROOT + plant_url.get('href') + _PAGE_ARGS
-        name = plant_url.string
-
-        # If we've already looked at this plant, just skip it.
-        if name in plants:
-            print('Skipping %s' % name)
-            continue
-
-        # Load the data from the webpage.
-        print('Loading %s...' % (url))
-        sys.stdout.flush()
-        plant_soup = BeautifulSoup(urllib2.urlopen(url).read(), 'html.parser')
-
-        # 1. Extract the calendar.
-        calendar_raw = plant_soup.find(
-            'div', id='calendar').table.find_all('tr')[1].find_all('td')
-
-        assert len(calendar_raw) == 12
-        calendar = [month.string.strip() for month in calendar_raw]
-
-        # 2. Extract useful information.
-        info = plant_soup.find('div', class_='info').ul
-
-        sowing = GetPlantInfo(info, 'sowing')
-        spacing = GetPlantInfo(info, 'spacing')
-        harvest = GetPlantInfo(info, 'harvest')
-        companion = GetPlantInfo(info, 'companion')
-
-        # Convert the harvest into a pair, of the max/min days before harvest.
-        harvest_start, harvest_end = FindTimeRange(harvest)
-
-        # Save the plant.
-        plants[name] = dict(
-            name=name,
-            url=url,
-            calendar=calendar,
-            harvest_start=harvest_start,
-            harvest_end=harvest_end,
-            sowing=sowing,
-            spacing=spacing,
-            harvest=harvest,
-            companion=companion,
-        )
-
-        # Save after each plant; so we can pause and resume.
-        with open('plants.json', 'w') as output_file:
-            json.dump(plants, output_file)
+    if os.path.exists(output_path):
+        plants = dict(PlantCatalog(output_path).plants)
+
+    journal_path = output_path + '.journal'
+    if os.path.exists(journal_path):
+        with open(journal_path, 'rU') as journal_file:
+            for line in journal_file:
+                # The last line might be incomplete if we were interrupted.
+                try:
+                    plant = json.loads(line)
+                except ValueError:
+                    continue
+                plants[plant['name']] = plant
+
+    return plants
+
+
+def Scrape(fetcher, output_path, root=_ROOT, threads=_DEFAULT_THREADS,
+           refresh=False):
+    """Scrape the plant catalog.
+
+    Plants are fetched concurrently. Each plant is appended to a journal as soon
+    as it is parsed, so an interrupted scrape can be resumed; the journal is
+    compacted into the catalog once at the end.
+
+    Args:
+        fetcher: PageFetcher or DirectoryFetcher, Used to get each page.
+        output_path: str, The path to the catalog JSON file.
+        root: str, The root URL of the site to scrape.
+        threads: int, The maximum number of pages to fetch at once.
+        refresh: bool, If True, re-scrape plants which were already scraped.
+
+    Returns:
+        dict of str --> dict, The scraped catalog.
+    """
+    # Load a list of plants from the list page.
+    plant_urls = list(FindPlantUrls(fetcher.Fetch(root + _LIST_PATH), root))
+
+    # Load the plants we already know about (including from a previous scrape
+    # which was interrupted), so they can be skipped.
+    plants = LoadPlants(output_path)
+    if not refresh:
+        for name, _ in plant_urls:
+            if name in plants:
+                print('Skipping %s' % name)
+        plant_urls = [(name, url) for name, url in plant_urls
+                      if name not in plants]
+
+    def ScrapePlant(name_and_url):
+        name, url = name_and_url
+        return ParsePlantPage(fetcher.Fetch(url), name, url)
+
+    journal_path = output_path + '.journal'
+    pool = ThreadPool(threads)
+    try:
+        with open(journal_path, 'a') as journal_file:
+            for plant in pool.imap_unordered(ScrapePlant, plant_urls):
+                print('Loaded %s' % plant['name'])
+                sys.stdout.flush()
+                plants[plant['name']] = plant
+                journal_file.write(json.dumps(plant) + '\n')
+                journal_file.flush()
+    finally:
+        pool.terminate()
+
+    # Compact the journal into the catalog. The catalog is replaced atomically,
+    # so readers never see a partially written file.
+    with open(output_path + '.tmp', 'w') as output_file:
+        json.dump(plants, output_file)
+    os.rename(output_path + '.tmp', output_path)
+    os.remove(journal_path)
+
+    return plants
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser()
+    parser.add_option('-o', '--output', default='plants.json',
+                      help='Where to write the catalog [default %default]')
+    parser.add_option('-t', '--threads', type='int', default=_DEFAULT_THREADS,
+                      help='Pages to fetch at once [default %default]')
+    parser.add_option('-c', '--cache-dir', default=_DEFAULT_CACHE_DIR,
+                      help='Where to cache fetched pages [default %default]')
+    parser.add_option('--offline', action='store_true',
+                      help='Only use pages which are already cached')
+    parser.add_option('--pages',
+                      help='Read pages from this directory of saved pages '
+                           'instead of fetching them')
+    parser.add_option('--root', default=_ROOT,
+                      help='The site to scrape [default %default]')
+    parser.add_option('-r', '--refresh', action='store_true',
+                      help='Re-scrape plants which are already in the catalog')
+    options, _ = parser.parse_args()
+
+    if options.pages:
+        fetcher = DirectoryFetcher(options.pages)
+    else:
+        fetcher = PageFetcher(options.cache_dir, offline=options.offline)
+
+    Scrape(fetcher, options.output, root=options.root,
+           threads=options.threads, refresh=options.refresh)
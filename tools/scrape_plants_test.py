@@ -0,0 +1,144 @@
+"""A set of tests for the plant scraper, run against saved pages."""
+
+import json
+import os
+import shutil
+import SimpleHTTPServer
+import SocketServer
+import tempfile
+import threading
+import unittest
+
+import scrape_plants
+
+
+## Saved copies of the pages the scraper reads.
+_TESTDATA = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'testdata')
+
+
+class _QuietHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class TestParsing(unittest.TestCase):
+
+    def testFindTimeRange(self):
+        self.assertEqual((10, 12), scrape_plants.FindTimeRange(
+            'Harvest in 10-12 days.'))
+        self.assertEqual((49, 70), scrape_plants.FindTimeRange(
+            'Harvest in 7-10 weeks. Pick often.'))
+        self.assertEqual((365, 365), scrape_plants.FindTimeRange(
+            'Harvest in approximately 1 years.'))
+
+    def testFindTimeRangeWithoutUnits(self):
+        self.assertRaises(Exception, scrape_plants.FindTimeRange,
+                          'Harvest when ready.')
+
+    def testParsePlantPage(self):
+        with open(os.path.join(_TESTDATA, 'plant', 'Beans')) as page_file:
+            plant = scrape_plants.ParsePlantPage(
+                page_file.read(), 'Beans', 'http://example.com/plant/Beans')
+
+        self.assertEqual('Beans', plant['name'])
+        self.assertEqual(['P', 'P', '', '', '', '', '', '', 'S', 'S', 'P', 'P'],
+                         plant['calendar'])
+        self.assertEqual('Sow seed directly.', plant['sowing'])
+        self.assertEqual('Space plants: 5 - 15 cm apart', plant['spacing'])
+        self.assertEqual('Carrots, Cucumbers', plant['companion'])
+        self.assertEqual(49, plant['harvest_start'])
+        self.assertEqual(70, plant['harvest_end'])
+
+    def testParsePlantPageWithMissingInfo(self):
+        with open(os.path.join(_TESTDATA, 'plant', 'Taro')) as page_file:
+            plant = scrape_plants.ParsePlantPage(
+                page_file.read(), 'Taro', 'http://example.com/plant/Taro')
+
+        self.assertEqual('', plant['spacing'])
+        self.assertEqual('', plant['companion'])
+        self.assertEqual(180, plant['harvest_start'])
+
+
+class TestScrape(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.output_path = os.path.join(self.tmp_dir, 'plants.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _StartServer(self):
+        """Serve the saved pages over HTTP, returning the root URL."""
+        cwd = os.getcwd()
+        os.chdir(_TESTDATA)
+        self.addCleanup(os.chdir, cwd)
+
+        server = SocketServer.TCPServer(('127.0.0.1', 0), _QuietHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return 'http://127.0.0.1:%d' % server.server_address[1]
+
+    def testScrapeSavedPages(self):
+        plants = scrape_plants.Scrape(
+            scrape_plants.DirectoryFetcher(_TESTDATA), self.output_path,
+            root='http://example.com', threads=2)
+
+        self.assertEqual(['Beans', 'Taro'], sorted(plants))
+        self.assertEqual('http://example.com/plant/Taro?zone=3',
+                         plants['Taro']['url'])
+        with open(self.output_path) as output_file:
+            self.assertEqual(plants, json.load(output_file))
+        self.assertFalse(os.path.exists(self.output_path + '.journal'))
+
+    def testScrapeResumesFromJournal(self):
+        journal = dict(name='Beans', calendar=[], url='from journal')
+        with open(self.output_path + '.journal', 'w') as journal_file:
+            journal_file.write(json.dumps(journal) + '\n')
+            journal_file.write('{"name": "Taro", "calen')  # Interrupted.
+
+        plants = scrape_plants.Scrape(
+            scrape_plants.DirectoryFetcher(_TESTDATA), self.output_path,
+            root='http://example.com')
+
+        self.assertEqual('from journal', plants['Beans']['url'])
+        self.assertEqual(180, plants['Taro']['harvest_start'])
+
+    def testRefreshRescrapesKnownPlants(self):
+        with open(self.output_path, 'w') as output_file:
+            json.dump(dict(Beans=dict(name='Beans', url='old')), output_file)
+
+        plants = scrape_plants.Scrape(
+            scrape_plants.DirectoryFetcher(_TESTDATA), self.output_path,
+            root='http://example.com', refresh=True)
+
+        self.assertNotEqual('old', plants['Beans']['url'])
+
+    def testScrapeOverHttpThenOffline(self):
+        root = self._StartServer()
+        cache_dir = os.path.join(self.tmp_dir, 'cache')
+
+        plants = scrape_plants.Scrape(
+            scrape_plants.PageFetcher(cache_dir), self.output_path, root=root)
+        self.assertEqual(['Beans', 'Taro'], sorted(plants))
+
+        # Everything needed is now cached, so the scrape works offline.
+        os.remove(self.output_path)
+        offline_plants = scrape_plants.Scrape(
+            scrape_plants.PageFetcher(cache_dir, offline=True),
+            self.output_path, root=root)
+        self.assertEqual(plants, offline_plants)
+
+    def testOfflineFetchOfUncachedPage(self):
+        fetcher = scrape_plants.PageFetcher(
+            os.path.join(self.tmp_dir, 'cache'), offline=True)
+        self.assertRaises(IOError, fetcher.Fetch, 'http://example.com/plants')
+
+
+if __name__ == '__main__':
+    unittest.main()